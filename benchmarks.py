@@ -0,0 +1,1068 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for FontFlow.
+Every benchmark runs on synthetic data inside a temporary directory and never
+touches the real Windows Fonts directory or registry, so they also run on Linux.
+
+Usage:
+    python benchmarks.py                 # list benchmarks
+    python benchmarks.py streaming --size-mb 2048
+"""
+
+import io
+import os
+import sys
+import mmap
+import struct
+import tarfile
+import time
+import shutil
+import zipfile
+import statistics
+import subprocess
+import heapq
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from pathlib import Path
+
+from create_test_fonts import build_test_font, build_test_font_header, write_test_font
+from font_archives import (COPY_BUFFER_SIZE, FONT_EXTENSIONS, ArchiveScanner, FontSource, SuffixFilter,
+                           ZipFontArchive)
+from font_backend import DirectoryFontBackend
+from font_engine import InstallEngine
+from font_folders import FolderFeed
+from font_inventory import FontInventory, MemoryFileSystem
+from font_journal import DEFAULT_SYNC_EVERY, InstallJournal
+from font_limits import DEFAULT_LIMITS
+from font_metadata import read_font_names_from_file
+from font_pipeline import Pipeline, Stage
+from font_preview import preview_archive
+from font_progress import UiUpdateChannel, UiUpdatePump
+from font_registry import FONTS_REGISTRY_KEY, HKCU, HKLM, MemoryRegistry, RegistryWriter, WinRegistry, winreg
+from font_scan_cache import ScanCache
+from font_selection import ArchiveSelection
+from font_uninstall import RollbackEngine, installed_fonts
+from font_validation import checksum, validate_font_file
+
+
+def process_bytes_written() -> int:
+    """Bytes this process has passed to write() so far, or -1 if the OS doesn't say."""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return -1
+
+
+def make_synthetic_archive(zip_path: str, font_count: int, font_size: int):
+    """Write a ZIP of font_count synthetic fonts of font_size bytes each."""
+    # Half random, half repeated so deflate has something to do without
+    # the archive being trivially compressible
+    block = os.urandom(512 * 1024) + bytes(512 * 1024)
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        for i in range(font_count):
+            with zf.open(f"Family/SyntheticFont-{i:04d}.ttf", 'w', force_zip64=True) as member:
+                # A real table directory, so the fonts pass validation; the filler is the outline table
+                header = build_test_font_header(f"Synthetic Font {i:04d}", font_size)
+                member.write(header)
+                remaining = font_size - len(header)
+                while remaining > 0:
+                    chunk = block[:min(remaining, len(block))]
+                    member.write(chunk)
+                    remaining -= len(chunk)
+
+
+def _print_row(label, elapsed, written, counted, fonts, font_bytes):
+    if written < 0:
+        written = counted  # Fall back to our own accounting
+    print(f"  {label:<22} {elapsed:8.2f} s   {written / 1024 ** 2:10.1f} MB written   "
+          f"{written / fonts / 1024 ** 2:8.2f} MB/font   {font_bytes / elapsed / 1024 ** 2:8.1f} MB/s")
+
+
+def bench_streaming(args):
+    """Extract-then-copy (legacy) vs. streaming straight from the ZIP into the fonts dir."""
+    font_size = args.size_mb * 1024 * 1024 // args.fonts
+    with tempfile.TemporaryDirectory(dir=args.workdir) as work:
+        zip_path = os.path.join(work, 'synthetic.zip')
+        print(f"Creating {args.fonts} fonts x {font_size / 1024 ** 2:.1f} MB "
+              f"({args.size_mb} MB uncompressed)...")
+        make_synthetic_archive(zip_path, args.fonts, font_size)
+        print(f"Archive size: {os.path.getsize(zip_path) / 1024 ** 2:.1f} MB\n")
+
+        fonts_dir = os.path.join(work, 'Fonts')
+        os.makedirs(fonts_dir)
+
+        # Legacy: extract to a TemporaryDirectory, then shutil.copy2 into Fonts
+        start_written = process_bytes_written()
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory(dir=work) as temp_dir:
+            with zipfile.ZipFile(zip_path) as zip_ref:
+                for file_info in zip_ref.infolist():
+                    extracted = zip_ref.extract(file_info, temp_dir)
+                    shutil.copy2(extracted, os.path.join(fonts_dir, os.path.basename(extracted)))
+        legacy_time = time.perf_counter() - start
+        legacy_written = process_bytes_written() - start_written if start_written >= 0 else -1
+        shutil.rmtree(fonts_dir)
+        os.makedirs(fonts_dir)
+
+        # Streaming: ZipFile.open -> destination in one pass
+        backend = DirectoryFontBackend(fonts_dir)
+        counted = 0
+        start_written = process_bytes_written()
+        start = time.perf_counter()
+        with ZipFontArchive(zip_path) as archive:
+            for source in archive.fonts:
+                counted += backend.write_font(source)[1]
+        stream_time = time.perf_counter() - start
+        stream_written = process_bytes_written() - start_written if start_written >= 0 else -1
+
+        total = args.fonts * font_size
+        print(f"  {'path':<22} {'time':>10}   {'bytes written':>21}   {'per font':>13}   {'throughput':>11}")
+        _print_row('extract + copy2', legacy_time, legacy_written, 2 * total, args.fonts, total)
+        _print_row('streaming', stream_time, stream_written, counted, args.fonts, total)
+
+
+def bench_registry(args):
+    """Per-font open/SetValueEx/close vs. one RegistryWriter for the whole run."""
+    scratch_key = r"Software\FontFlowBenchmark"
+    if winreg is not None:
+        # Real registry, in a scratch key under HKCU so no admin rights are needed
+        winreg.CreateKey(winreg.HKEY_CURRENT_USER, scratch_key).Close()
+        registry = WinRegistry()
+        print(f"Using the Windows registry (HKCU\\{scratch_key})")
+    else:
+        registry = MemoryRegistry()
+        print("winreg not available - using the in-memory registry")
+    names = [(f"Synthetic Font {i} (TrueType)", f"SyntheticFont-{i}.ttf") for i in range(args.entries)]
+
+    try:
+        start = time.perf_counter()
+        for name, filename in names:
+            key = registry.open_key(HKCU, scratch_key, write=True)
+            registry.set_value(key, name, filename)
+            registry.close_key(key)
+        per_font = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with RegistryWriter(registry, HKCU, scratch_key) as writer:
+            for name, filename in names:
+                writer.queue(name, filename)
+        batched = time.perf_counter() - start
+    finally:
+        if winreg is not None:
+            winreg.DeleteKey(winreg.HKEY_CURRENT_USER, scratch_key)
+
+    print(f"\n  {args.entries} entries")
+    print(f"  per-font open/close   {per_font * 1000:9.1f} ms   {per_font / args.entries * 1e6:8.2f} us/entry")
+    print(f"  RegistryWriter        {batched * 1000:9.1f} ms   {batched / args.entries * 1e6:8.2f} us/entry")
+    print(f"  speedup               {per_font / batched:9.1f}x")
+
+
+class SlowDirectoryBackend(DirectoryFontBackend):
+    """Directory backend that takes gdi_delay seconds in AddFontResourceW, like a busy GDI."""
+
+    def __init__(self, fonts_dir, gdi_delay):
+        super().__init__(fonts_dir)
+        self.gdi_delay = gdi_delay
+
+    def add_font_resource(self, font_path):
+        time.sleep(self.gdi_delay)
+        return True
+
+
+def bench_workers(args):
+    """Install throughput of the engine from 1 to --max-workers worker threads."""
+    with tempfile.TemporaryDirectory(dir=args.workdir) as work:
+        source_dir = os.path.join(work, 'src')
+        os.makedirs(source_dir)
+        data = build_test_font('Synthetic Font', outlines=os.urandom(args.font_kb * 1024))
+        sources = []
+        for i in range(args.fonts):
+            path = os.path.join(source_dir, f"SyntheticFont-{i:04d}.ttf")
+            with open(path, 'wb') as f:
+                f.write(data)
+            sources.append(FontSource.from_path(path))
+        print(f"{args.fonts} fonts x {args.font_kb} KB, {args.gdi_ms} ms simulated AddFontResourceW\n")
+
+        baseline = None
+        workers = 1
+        while workers <= args.max_workers:
+            fonts_dir = os.path.join(work, f'Fonts-{workers}')
+            os.makedirs(fonts_dir)
+            engine = InstallEngine(SlowDirectoryBackend(fonts_dir, args.gdi_ms / 1000), workers=workers)
+            start = time.perf_counter()
+            summary = engine.run(sources)
+            elapsed = time.perf_counter() - start
+            assert summary.installed_count == args.fonts
+            baseline = baseline or elapsed
+            print(f"  {workers:3d} workers   {elapsed:7.2f} s   {args.fonts / elapsed:8.1f} fonts/s   "
+                  f"{baseline / elapsed:5.2f}x")
+            shutil.rmtree(fonts_dir)
+            workers *= 2
+
+
+def bench_pipeline(args):
+    """Staged pipeline vs. running every stage one after the other, with simulated stage costs."""
+    costs = {'extract': args.extract_ms, 'validate': args.validate_ms, 'name': args.name_ms,
+             'install': args.install_ms}
+    print(f"{args.fonts} fonts; per-font cost: " + ", ".join(f"{name} {ms} ms" for name, ms in costs.items()) + "\n")
+
+    def work(ms):
+        def func(item):
+            time.sleep(ms / 1000)  # Stands in for I/O or GDI calls, which release the GIL
+            return item
+        return func
+
+    def sequential():
+        for _ in range(args.fonts):
+            for ms in costs.values():
+                work(ms)(None)
+
+    def pipelined(install_workers):
+        pipeline = Pipeline([Stage(name, work(ms), install_workers if name == 'install' else 1)
+                             for name, ms in costs.items()])
+        assert sum(1 for _ in pipeline.run(range(args.fonts))) == args.fonts
+        return pipeline
+
+    print(f"  {'':<28} {'predicted':>9}   {'measured':>8}")
+    start = time.perf_counter()
+    sequential()
+    print(f"  {'one stage after another':<28} {args.fonts * sum(costs.values()) / 1000:8.2f}s   "
+          f"{time.perf_counter() - start:7.2f}s   (sum of stages)")
+    for install_workers in (1, args.install_workers):
+        slowest = max(ms / (install_workers if name == 'install' else 1) for name, ms in costs.items())
+        start = time.perf_counter()
+        pipeline = pipelined(install_workers)
+        label = f"pipeline, install x{install_workers}"
+        print(f"  {label:<28} {args.fonts * slowest / 1000:8.2f}s   {time.perf_counter() - start:7.2f}s   "
+              f"(slowest stage)")
+
+    print(f"\n  {'stage':<9} {'workers':>7} {'mean ms':>8} {'max ms':>8} {'wait ms':>8} {'queue max':>9} "
+          f"{'queue mean':>10} {'busy':>6}")
+    for name, metrics in pipeline.report().items():
+        print(f"  {name:<9} {metrics['workers']:7d} {metrics['mean_latency_ms']:8.2f} {metrics['max_latency_ms']:8.2f} "
+              f"{metrics['mean_wait_ms']:8.2f} {metrics['queue_max']:9d} {metrics['queue_mean']:10.2f} "
+              f"{metrics['utilization']:6.0%}")
+
+
+def bench_archives(args):
+    """Serial archive extraction vs. ArchiveScanner feeding the install engine."""
+    with tempfile.TemporaryDirectory(dir=args.workdir) as work:
+        font_size = args.font_kb * 1024
+        paths = []
+        for i in range(args.archives):
+            path = os.path.join(work, f'vendor-{i:03d}.zip')
+            make_synthetic_archive(path, args.fonts, font_size)
+            paths.append(path)
+        total = args.archives * args.fonts
+        print(f"{args.archives} archives x {args.fonts} fonts x {args.font_kb} KB\n")
+
+        def run(scan_workers, install_workers):
+            fonts_dir = tempfile.mkdtemp(dir=work)
+            first = []
+            start = time.perf_counter()
+            with ArchiveScanner(paths, workers=scan_workers) as scanner:
+                engine = InstallEngine(DirectoryFontBackend(fonts_dir), workers=install_workers)
+                summary = engine.run(scanner, lambda result: first or first.append(time.perf_counter()))
+            elapsed = time.perf_counter() - start
+            assert summary.installed_count == total
+            shutil.rmtree(fonts_dir)
+            return elapsed, first[0] - start
+
+        # Legacy order: every archive fully extracted before the first install
+        fonts_dir = tempfile.mkdtemp(dir=work)
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory(dir=work) as temp_dir:
+            extracted = []
+            for path in paths:
+                with zipfile.ZipFile(path) as zip_ref:
+                    extracted += [zip_ref.extract(info, temp_dir) for info in zip_ref.infolist()]
+            first_font = time.perf_counter() - start
+            for path in extracted:
+                shutil.copy2(path, fonts_dir)
+        legacy = time.perf_counter() - start
+        shutil.rmtree(fonts_dir)
+
+        print(f"  {'mode':<28} {'total':>8}   {'first font':>10}")
+        print(f"  {'extract all, then install':<28} {legacy:7.2f}s   {first_font:9.3f}s")
+        for scan_workers, install_workers in ((1, 1), (args.workers, args.workers)):
+            elapsed, first_font = run(scan_workers, install_workers)
+            label = f"scanner {scan_workers} / install {install_workers}"
+            print(f"  {label:<28} {elapsed:7.2f}s   {first_font:9.3f}s")
+
+
+def bench_names(args):
+    """Per-font cost of reading names from the sfnt name table, by font file size."""
+    with tempfile.TemporaryDirectory(dir=args.workdir) as work:
+        print(f"{args.repeat} parses per size; fonts are sparse files so no disk time is spent writing them\n")
+        print(f"  {'font size':>12}   {'per parse':>10}")
+        size = 64 * 1024
+        while size <= args.max_mb * 1024 * 1024:
+            path = write_test_font(os.path.join(work, f'Font-{size}.ttf'), 'Synthetic Sans', padding=size)
+            read_font_names_from_file(path)  # Warm the page cache for the header
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                read_font_names_from_file(path)
+            elapsed = (time.perf_counter() - start) / args.repeat
+            print(f"  {size / 1024 ** 2:9.2f} MB   {elapsed * 1e6:8.1f} us")
+            size *= 8
+
+
+def bench_inventory(args):
+    """Full rebuild vs. incremental refresh of the installed-font inventory."""
+    system_dir = 'C:\\Windows\\Fonts'
+    user_dir = 'C:\\Users\\bench\\AppData\\Local\\Microsoft\\Windows\\Fonts'
+    scopes = [(HKLM, system_dir), (HKCU, user_dir)]
+    fs = MemoryFileSystem()
+    registry = MemoryRegistry()
+    system_key = registry.open_key(HKLM, FONTS_REGISTRY_KEY, write=True)
+    user_key = registry.open_key(HKCU, FONTS_REGISTRY_KEY, write=True)
+    for i in range(args.entries):
+        filename = f"SyntheticFont-{i}.ttf"
+        if i % 4:
+            fs.add_file(system_dir, filename)
+            registry.set_value(system_key, f"Synthetic Font {i} (TrueType)", filename)
+        else:
+            fs.add_file(user_dir, filename)
+            registry.set_value(user_key, f"Synthetic Font {i} (TrueType)", f"{user_dir}\\{filename}")
+    print(f"{args.entries} fonts in an in-memory registry and file system. Reading those costs")
+    print("nothing, so the cold build here leaves out RegEnumValueW and directory listing time.\n")
+
+    with tempfile.TemporaryDirectory(dir=args.workdir) as work:
+        index_path = os.path.join(work, 'inventory.json')
+
+        def load():
+            start = time.perf_counter()
+            inventory = FontInventory(registry, fs, scopes, index_path).load()
+            return inventory, time.perf_counter() - start
+
+        def row(label, elapsed, inventory):
+            changed = inventory.last_refresh
+            print(f"  {label:<30} {elapsed * 1000:9.1f} ms   "
+                  f"re-read {changed['dirs']} dirs, {changed['keys']} keys")
+
+        inventory, cold = load()
+        row('cold build (no snapshot)', cold, inventory)
+        inventory.save()
+        print(f"  {'snapshot size':<30} {os.path.getsize(index_path) / 1024:9.1f} KB")
+
+        inventory, warm = load()
+        row('load, nothing changed', warm, inventory)
+
+        start = time.perf_counter()
+        inventory.refresh()
+        row('refresh, nothing changed', time.perf_counter() - start, inventory)
+
+        fs.add_file(user_dir, 'NewFont.ttf')
+        registry.set_value(user_key, 'New Font (TrueType)', f"{user_dir}\\NewFont.ttf")
+        start = time.perf_counter()
+        inventory.refresh()
+        row('refresh, one user font added', time.perf_counter() - start, inventory)
+
+        start = time.perf_counter()
+        hits = sum(inventory.is_installed(f"SyntheticFont-{i}.ttf") for i in range(args.entries))
+        queries = time.perf_counter() - start
+        print(f"  {'is_installed() per query':<30} {queries / args.entries * 1e6:9.2f} us   ({hits} hits)")
+
+
+def import_profile(module: str):
+    """Import module in a fresh interpreter with -X importtime.
+    Returns (cumulative import time in us, names of every module imported)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                               cwd=here, capture_output=True, text=True, check=True)
+    cumulative = 0
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append(name.strip())
+        if name.strip() == module:
+            cumulative = int(cumulative_us)
+    return cumulative, modules
+
+
+def bench_startup(args):
+    """Import cost of the headless CLI vs. the GUI module, measured with -X importtime."""
+    print(f"Median of {args.repeat} fresh interpreters per entry point (the GUI path stops before Tk())\n")
+    print(f"  {'entry point':<34} {'import':>9}   {'modules':>7}   tkinter  PIL (tried)")
+    medians = {}
+    for label, module in (('GUI (import font_installer)', 'font_installer'),
+                          ('headless CLI (import font_cli)', 'font_cli')):
+        runs = [import_profile(module) for _ in range(args.repeat)]
+        cumulative = medians[module] = statistics.median(run[0] for run in runs)
+        modules = runs[0][1]
+        tkinter_loaded = 'yes' if any(name.startswith('tkinter') for name in modules) else 'no'
+        pil_loaded = 'yes' if any(name.startswith('PIL') for name in modules) else 'no'
+        print(f"  {label:<34} {cumulative / 1000:6.1f} ms   {len(modules):7d}   {tkinter_loaded:<7}  {pil_loaded}")
+    # Headless mode exists to start faster than the GUI; each command imports its machinery when it runs
+    assert medians['font_cli'] <= medians['font_installer'], "the headless CLI imports slower than the GUI"
+
+
+def bench_icon(args):
+    """Header icon step of startup: scaling on every launch vs. the cached 32x32 PNG."""
+    import tkinter as tk
+    from font_assets import load_icon, load_pil
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"Needs a display to create PhotoImages ({e})")
+        return
+    root.withdraw()
+    here = os.path.dirname(os.path.abspath(__file__))
+    sources = [os.path.join(here, 'icon.ico'), os.path.join(here, 'icon.png')]
+    pil = load_pil()
+
+    def legacy():
+        # What setup_gui did before the cache
+        if pil:
+            Image, ImageTk = pil
+            img = Image.open(sources[0]).resize((32, 32), Image.Resampling.LANCZOS)
+            return ImageTk.PhotoImage(img, master=root)
+        icon_img = tk.PhotoImage(master=root, file=sources[1])
+        return icon_img.subsample(max(1, icon_img.width() // 32), max(1, icon_img.height() // 32))
+
+    def timed(func, setup=None):
+        times = []
+        for _ in range(args.repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        return statistics.median(times)
+
+    with tempfile.TemporaryDirectory(dir=args.workdir) as work:
+        cache = os.path.join(work, 'cache')
+        cold = timed(lambda: load_icon(root, sources, 32, cache), lambda: shutil.rmtree(cache, ignore_errors=True))
+        warm = timed(lambda: load_icon(root, sources, 32, cache))
+        per_launch = timed(legacy)
+    root.destroy()
+
+    print(f"PIL {'available' if pil else 'not installed'}; median of {args.repeat} runs\n")
+    print(f"  scale on every launch   {per_launch * 1000:8.2f} ms")
+    print(f"  cache, cold (first run) {cold * 1000:8.2f} ms")
+    print(f"  cache, warm             {warm * 1000:8.2f} ms   (no PIL import)")
+    if pil:
+        pil_import, _ = import_profile('PIL.ImageTk')
+        print(f"  PIL import, paid by every launch before the cache: {pil_import / 1000:.1f} ms")
+
+
+class FakeTkRoot:
+    """Event queue with Tk's after(); run() plays the role of mainloop on the calling thread."""
+
+    def __init__(self):
+        self._queue = []
+        self._lock = threading.Lock()
+        self._order = 0
+        self.callbacks = 0
+
+    def after(self, ms, callback):
+        with self._lock:
+            self._order += 1
+            heapq.heappush(self._queue, (time.perf_counter() + ms / 1000, self._order, callback))
+
+    def run(self, until):
+        """Run due callbacks until until() is true and the queue is empty."""
+        while True:
+            with self._lock:
+                due = self._queue[0][0] if self._queue else None
+            if due is None:
+                if until():
+                    return
+                time.sleep(0.001)
+                continue
+            if due > time.perf_counter():
+                time.sleep(min(0.001, due - time.perf_counter()))
+                continue
+            with self._lock:
+                _, _, callback = heapq.heappop(self._queue)
+            self.callbacks += 1
+            callback()
+
+
+def bench_ui(args):
+    """Tk callbacks per run: one root.after() per font vs. the coalescing UI update pump."""
+    print(f"{args.fonts} fonts posted by a worker; applying a status costs {args.apply_us} us on the UI thread\n")
+
+    def apply_status(*_):
+        end = time.perf_counter() + args.apply_us / 1e6
+        while time.perf_counter() < end:
+            pass
+
+    def run(post_updates):
+        root = FakeTkRoot()
+        done = threading.Event()
+        finished = {}
+
+        def worker():
+            post_updates(root)
+            finished['worker'] = time.perf_counter()
+            done.set()
+
+        start = time.perf_counter()
+        threading.Thread(target=worker).start()
+        root.run(done.is_set)
+        end = time.perf_counter()
+        return root.callbacks, end - start, end - finished['worker']
+
+    def per_font(root):
+        for i in range(args.fonts):
+            root.after(0, lambda i=i: apply_status(f"Installing ({i + 1}/{args.fonts})"))
+            time.sleep(args.font_us / 1e6)
+
+    def coalesced(root):
+        channel = UiUpdateChannel()
+        UiUpdatePump(root, channel, apply_status).start()
+        for i in range(args.fonts):
+            channel.count('fonts_done')
+            channel.set_status(f"Installing ({i + 1}/{args.fonts})")
+            time.sleep(args.font_us / 1e6)
+        channel.close()
+
+    print(f"  {'':<22} {'Tk callbacks':>12}   {'run time':>9}   {'UI lag after work':>17}")
+    for label, post in (('root.after per font', per_font), ('UiUpdatePump', coalesced)):
+        callbacks, elapsed, lag = run(post)
+        print(f"  {label:<22} {callbacks:12d}   {elapsed:8.2f}s   {lag * 1000:15.1f} ms")
+
+
+class FakeListbox:
+    """Stands in for tk.Listbox and its scrollbar; counts the rows inserted."""
+
+    def __init__(self, height=5):
+        self.height = height
+        self.rows = []
+        self.inserted = 0
+
+    def cget(self, option):
+        return self.height
+
+    def configure(self, **options):
+        pass
+
+    def bind(self, *args, **kwargs):
+        pass
+
+    def set(self, first, last):
+        pass
+
+    def delete(self, first, last=None):
+        self.rows.clear()
+
+    def insert(self, index, *rows):
+        self.rows.extend(rows)
+        self.inserted += len(rows)
+
+
+def bench_filelist(args):
+    """File list updates: rebuilding the whole listbox per selection vs. the virtual list."""
+    from font_widgets import VirtualListbox  # Imports tkinter, which the other benchmarks don't need
+    work = tempfile.mkdtemp(prefix='fontflow-bench-', dir=args.workdir)
+    try:
+        paths = []
+        for i in range(args.archives):
+            path = os.path.join(work, f"pack{i:05d}.zip")
+            with open(path, 'wb') as f:
+                f.write(b'PK' * (i % 64 + 1))
+            paths.append(path)
+        batches = [paths[i:i + args.batch] for i in range(0, len(paths), args.batch)]
+        print(f"{args.archives} archives selected in {len(batches)} batches of {args.batch}\n")
+
+        # What update_files_display did before: a list, and every row re-inserted after each pick
+        legacy = FakeListbox()
+        selected = []
+        start = time.perf_counter()
+        for batch in batches:
+            selected.extend(batch)
+            legacy.delete(0, 'end')
+            for path in selected:
+                legacy.insert('end', os.path.basename(path))
+        legacy_time = time.perf_counter() - start
+
+        listbox = FakeListbox()
+        selection = ArchiveSelection()
+        file_list = VirtualListbox(listbox, listbox, lambda index: selection[index].describe())
+        virtual_time = add_time = 0.0
+        for batch in batches:
+            start = time.perf_counter()
+            selection.add_many(batch)
+            add_time += time.perf_counter() - start
+            start = time.perf_counter()
+            file_list.set_count(len(selection))
+            virtual_time += time.perf_counter() - start
+        virtual_rows = listbox.inserted
+        for _ in range(args.archives // 5):  # Scroll through everything once
+            file_list.yview('scroll', 1, 'pages')
+
+        start = time.perf_counter()
+        duplicates = selection.add_many(paths + [os.path.join(work, '.', os.path.basename(p)) for p in paths])
+        dedup_time = time.perf_counter() - start
+
+        print(f"  {'':<22} {'rows inserted':>13}   {'time':>9}")
+        print(f"  {'full rebuild':<22} {legacy.inserted:13d}   {legacy_time * 1000:7.1f} ms")
+        print(f"  {'VirtualListbox':<22} {virtual_rows:13d}   {virtual_time * 1000:7.1f} ms"
+              f"   (scrolling through all of it: {listbox.inserted - virtual_rows} more)")
+        print(f"\n  Adding {args.archives} archives to the selection (stat + realpath): {add_time * 1000:.1f} ms")
+        print(f"  Re-selecting all {args.archives} archives by two paths each: {len(duplicates)} added, "
+              f"{dedup_time * 1000:.1f} ms")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def bench_folders(args):
+    """Folder discovery: collecting the whole tree first vs. the bounded FolderFeed queue."""
+    work = tempfile.mkdtemp(prefix='fontflow-bench-', dir=args.workdir)
+    try:
+        per_dir = max(1, args.entries // args.dirs)
+        for d in range(args.dirs):
+            directory = os.path.join(work, f"family{d:04d}", "static")
+            os.makedirs(directory)
+            for i in range(per_dir):
+                open(os.path.join(directory, f"Font{i:05d}.ttf" if i % 10 else f"readme{i}.txt"), 'wb').close()
+        print(f"{args.dirs * per_dir} files in {args.dirs * 2 + 1} folders, 90% fonts\n")
+
+        def consume(make_paths):
+            # Stands in for the installer: notes when the first path arrives
+            start = time.perf_counter()
+            first = None
+            count = 0
+            for _ in make_paths():
+                if first is None:
+                    first = time.perf_counter() - start
+                count += 1
+                if args.consumer_us:
+                    time.sleep(args.consumer_us / 1e6)
+            return first, count
+
+        def collect_first():
+            found = []
+            for root, _, files in os.walk(work):
+                found.extend(os.path.join(root, name) for name in files if name.endswith('.ttf'))
+            return found
+
+        print(f"  {'':<24} {'found':>7}   {'first path':>10}   {'total':>8}   {'peak memory':>11}")
+        for label, make_paths in (('os.walk into a list', collect_first),
+                                  ('FolderFeed (bounded)', lambda: FolderFeed([work]))):
+            start = time.perf_counter()
+            first, count = consume(make_paths)
+            elapsed = time.perf_counter() - start
+            # Memory is measured in a second pass; tracemalloc slows everything down
+            tracemalloc.start()
+            consume(make_paths)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  {label:<24} {count:7d}   {first * 1000:7.1f} ms   {elapsed:7.2f}s   {peak / 1024:8.0f} KB")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def _write_large_otf(path: str, family: str, size: int, block: bytes):
+    # A CFF font of size bytes whose CFF table is filled with block, repeated,
+    # with the table's checksum patched in so it passes checksum verification
+    header = build_test_font_header(family, size, sfnt_version=b'OTTO')
+    with open(path, 'w+b') as f:
+        f.write(header)
+        remaining = size - len(header)
+        while remaining > 0:
+            remaining -= f.write(block[:remaining])
+        with mmap.mmap(f.fileno(), 0) as mapped:
+            num_tables, = struct.unpack_from('>H', mapped, 4)
+            for entry in range(12, 12 + 16 * num_tables, 16):
+                if mapped[entry:entry + 4] == b'CFF ':
+                    offset, length = struct.unpack_from('>LL', mapped, entry + 8)
+                    struct.pack_into('>L', mapped, entry + 4, checksum(memoryview(mapped), offset, length))
+    return path
+
+
+def bench_validate(args):
+    """Font validation on large OTFs: structure only, table checksums with array over mmap,
+    and a struct word-by-word checksum of the file read into memory."""
+    with tempfile.TemporaryDirectory(dir=args.workdir) as work:
+        size = args.size_mb * 1024 * 1024
+        block = os.urandom(1024 * 1024)
+        paths = [_write_large_otf(os.path.join(work, f'Large{i}.otf'), f'Large {i}', size, block)
+                 for i in range(args.fonts)]
+        total = size * args.fonts
+        print(f"{args.fonts} OTF fonts x {args.size_mb} MB\n")
+
+        def struct_words(path):
+            # Every table's words unpacked one at a time, the way a plain Python validator would
+            with open(path, 'rb') as f:
+                data = f.read()
+            num_tables, = struct.unpack_from('>H', data, 4)
+            for entry in range(12, 12 + 16 * num_tables, 16):
+                offset, length = struct.unpack_from('>LL', data, entry + 8)
+                table = data[offset:offset + length] + b'\0' * (-length % 4)
+                sum(word for word, in struct.iter_unpack('>L', table)) & 0xFFFFFFFF
+
+        runs = [
+            ('structure only', lambda path: validate_font_file(path)),
+            ('checksums: array+mmap', lambda path: validate_font_file(path, checksums=True)),
+            ('checksums: struct', struct_words),
+        ]
+        for path in paths:
+            validate_font_file(path)  # Warm the page cache
+        print(f"  {'':<24} {'per font':>10}   {'throughput':>12}")
+        for label, check in runs:
+            start = time.perf_counter()
+            for path in paths:
+                check(path)
+            elapsed = time.perf_counter() - start
+            print(f"  {label:<24} {elapsed / args.fonts * 1000:8.2f} ms   {total / elapsed / 1024 ** 2:8.1f} MB/s")
+
+
+def bench_limits(args):
+    """Cost of the archive limits on normal archives: central directory check and limited member reads."""
+    with tempfile.TemporaryDirectory(dir=args.workdir) as work:
+        path = os.path.join(work, 'fonts.zip')
+        make_synthetic_archive(path, args.fonts, args.font_kb * 1024)
+        listing = os.path.join(work, 'listing.zip')
+        with zipfile.ZipFile(listing, 'w') as zf:
+            for i in range(args.entries):
+                zf.writestr(f"family{i % 100:03d}/Font{i:06d}.ttf", b'')
+        print(f"{args.fonts} fonts x {args.font_kb} KB; directory of {args.entries} entries\n")
+
+        def read_members(zf, wrap):
+            for info in zf.infolist():
+                with wrap(zf.open(info), info) as member:
+                    while member.read(COPY_BUFFER_SIZE):
+                        pass
+
+        with zipfile.ZipFile(path) as zf:
+            runs = [
+                ('plain zipfile', lambda: read_members(zf, lambda stream, info: stream)),
+                ('limited', lambda: (DEFAULT_LIMITS.check_directory(path, zf.infolist()),
+                                     read_members(zf, lambda stream, info: DEFAULT_LIMITS.reader(
+                                         stream, info.filename, info.file_size, info.compress_size)))),
+            ]
+            for label, run in runs:
+                times = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    run()
+                    times.append(time.perf_counter() - start)
+                best = min(times)
+                print(f"  {label:<16} {best:8.3f} s   {args.fonts * args.font_kb / 1024 / best:8.1f} MB/s")
+
+        with zipfile.ZipFile(listing) as zf:
+            infos = zf.infolist()
+            start = time.perf_counter()
+            DEFAULT_LIMITS.check_directory(listing, infos)
+            elapsed = time.perf_counter() - start
+        print(f"\n  directory check  {elapsed * 1000:8.2f} ms for {args.entries} entries "
+              f"({elapsed / args.entries * 1e9:.0f} ns/entry)")
+
+
+def bench_preview(args):
+    """Archive preview over a large central directory: suffix filtering with pathlib, splitext and SuffixFilter."""
+    with tempfile.TemporaryDirectory(dir=args.workdir) as work:
+        path = os.path.join(work, 'library.zip')
+        suffixes = ['.ttf', '.otf', '.txt', '.pdf', '.png', '.html']
+        with zipfile.ZipFile(path, 'w') as zf:
+            for i in range(args.entries):
+                zf.writestr(f"family{i % 500:03d}/static/Font-{i:06d}{suffixes[i % len(suffixes)]}", b'')
+        print(f"central directory of {args.entries} entries\n")
+
+        start = time.perf_counter()
+        with zipfile.ZipFile(path) as zf:
+            names = [info.filename for info in zf.infolist()]
+        read_directory = time.perf_counter() - start
+
+        suffix_filter = SuffixFilter(FONT_EXTENSIONS)
+        runs = [
+            ('Path(name).suffix', lambda: sum(1 for name in names if Path(name).suffix.lower() in FONT_EXTENSIONS)),
+            ('os.path.splitext', lambda: sum(1 for name in names
+                                             if os.path.splitext(name)[1].lower() in FONT_EXTENSIONS)),
+            ('SuffixFilter', lambda: sum(1 for name in names if suffix_filter.match(name) is not None)),
+        ]
+        print(f"  {'read directory (zipfile)':<26} {read_directory * 1000:8.1f} ms")
+        for label, run in runs:
+            start = time.perf_counter()
+            found = run()
+            elapsed = time.perf_counter() - start
+            print(f"  {label:<26} {elapsed * 1000:8.1f} ms   {elapsed / len(names) * 1e9:6.0f} ns/entry   "
+                  f"{found} fonts")
+        start = time.perf_counter()
+        preview = preview_archive(path)
+        print(f"  {'preview_archive (total)':<26} {(time.perf_counter() - start) * 1000:8.1f} ms   "
+              f"{preview.formats()}, {preview.other_files} other files")
+
+
+def bench_cache(args):
+    """Re-scanning a library of archives: cold previews and opens against the scan cache, warm from disk."""
+    with tempfile.TemporaryDirectory(dir=args.workdir) as work:
+        paths = []
+        for a in range(args.archives):
+            path = os.path.join(work, f'pack{a:05d}.zip')
+            with zipfile.ZipFile(path, 'w') as zf:
+                for i in range(args.fonts):
+                    zf.writestr(f"Family{a}/static/Font{a}-{i:03d}.ttf", b'')
+                zf.writestr(f"Family{a}/OFL.txt", b'licence')
+            paths.append(path)
+        cache_path = os.path.join(work, 'cache.json')
+        print(f"{args.archives} archives of {args.fonts} fonts\n")
+
+        def timed(label, run):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            print(f"  {label:<30} {elapsed * 1000:8.1f} ms   {elapsed / len(paths) * 1e6:7.1f} us/archive")
+
+        def open_all(cache):
+            for path in paths:
+                ZipFontArchive(path, cache=cache).close()
+
+        timed('preview, no cache', lambda: [preview_archive(path) for path in paths])
+        timed('open, no cache', lambda: open_all(None))
+        cache = ScanCache(cache_path)
+        timed('preview + open, cold cache', lambda: ([preview_archive(path, cache=cache) for path in paths],
+                                                     open_all(cache)))
+        timed('save', cache.save)
+        print(f"  {'cache file':<30} {os.path.getsize(cache_path) / 1024:8.1f} KB")
+        warm = ScanCache(cache_path)
+        timed('load', lambda: len(warm))
+        timed('preview, warm cache', lambda: [preview_archive(path, cache=warm) for path in paths])
+        assert warm.hits == len(paths)
+        # Directory hashes are only in manifests written with content checks on
+        checked = ScanCache(cache_path, verify_content=True)
+        for path in paths:
+            preview_archive(path, cache=checked)
+        timed('preview, warm + content check', lambda: [preview_archive(path, cache=checked) for path in paths])
+
+
+def bench_formats(args):
+    """The same fonts as a ZIP and as tarballs: reading every font through ArchiveScanner, then installing."""
+    with tempfile.TemporaryDirectory(dir=args.workdir) as work:
+        font_size = args.font_kb * 1024
+        zip_path = os.path.join(work, 'corpus.zip')
+        make_synthetic_archive(zip_path, args.fonts, font_size)
+        paths = [zip_path]
+        # The tarballs hold exactly the ZIP's members
+        for compression, suffix, options in [('', '.tar', {}), ('gz', '.tar.gz', {'compresslevel': 1}),
+                                             ('bz2', '.tar.bz2', {'compresslevel': 1}), ('xz', '.tar.xz', {'preset': 1})]:
+            path = os.path.join(work, 'corpus' + suffix)
+            with zipfile.ZipFile(zip_path) as zf, tarfile.open(path, f'w:{compression}', **options) as tar:
+                for info in zf.infolist():
+                    member = tarfile.TarInfo(info.filename)
+                    member.size = info.file_size
+                    with zf.open(info) as src:
+                        tar.addfile(member, src)
+            paths.append(path)
+        total = args.fonts * font_size
+        print(f"{args.fonts} fonts x {args.font_kb} KB\n")
+        print(f"  {'format':<10} {'archive':>10}   {'read all':>9} {'MB/s':>8}   {'install':>8} {'MB/s':>8}")
+        for path in paths:
+            start = time.perf_counter()
+            read = 0
+            with ArchiveScanner([path]) as scanner:
+                for source in scanner:
+                    with source.open() as f:
+                        while True:
+                            chunk = f.read(COPY_BUFFER_SIZE)
+                            if not chunk:
+                                break
+                            read += len(chunk)
+            read_time = time.perf_counter() - start
+            assert read == total
+
+            fonts_dir = tempfile.mkdtemp(dir=work)
+            start = time.perf_counter()
+            with ArchiveScanner([path]) as scanner:
+                summary = InstallEngine(DirectoryFontBackend(fonts_dir)).run(scanner)
+            install_time = time.perf_counter() - start
+            assert summary.installed_count == args.fonts
+            shutil.rmtree(fonts_dir)
+            label = os.path.basename(path)[len('corpus'):]
+            print(f"  {label:<10} {os.path.getsize(path) / 1024 ** 2:7.1f} MB   {read_time:8.2f}s "
+                  f"{total / read_time / 1024 ** 2:8.1f}   {install_time:7.2f}s {total / install_time / 1024 ** 2:8.1f}")
+
+
+def bench_journal(args):
+    """Installing with the install journal off, fsync'd after every record, and fsync'd in batches."""
+    data = [build_test_font(f'Journal{i}') for i in range(args.fonts)]
+    with tempfile.TemporaryDirectory(dir=args.workdir) as work:
+        print(f"{args.fonts} fonts\n")
+        print(f"  {'journal':<22} {'time':>8} {'fsyncs':>7} {'per font':>10}")
+        for label, sync_every in [('off', None), ('fsync every record', 1), ('batched (default)', DEFAULT_SYNC_EVERY)]:
+            fonts_dir = tempfile.mkdtemp(dir=work)
+            journal = None
+            if sync_every is not None:
+                journal = InstallJournal(os.path.join(work, f'journal{sync_every}.jsonl'), sync_every=sync_every)
+            sources = [FontSource(f'Font{i:05d}.ttf', len(d), 'memory', lambda d=d: io.BytesIO(d))
+                       for i, d in enumerate(data)]
+            start = time.perf_counter()
+            summary = InstallEngine(DirectoryFontBackend(fonts_dir), journal=journal).run(sources)
+            elapsed = time.perf_counter() - start
+            assert summary.installed_count == args.fonts
+            syncs = journal.syncs if journal is not None else 0
+            if journal is not None:
+                journal.close()
+            print(f"  {label:<22} {elapsed:7.2f}s {syncs:7d} {elapsed / args.fonts * 1e6:8.0f} us")
+            shutil.rmtree(fonts_dir)
+
+
+class BroadcastingBackend(DirectoryFontBackend):
+    """Directory backend whose WM_FONTCHANGE broadcast takes broadcast_delay seconds, like a desktop full of windows."""
+
+    def __init__(self, fonts_dir, broadcast_delay):
+        super().__init__(fonts_dir)
+        self.broadcast_delay = broadcast_delay
+        self.broadcasts = 0
+
+    def notify_font_change(self):
+        time.sleep(self.broadcast_delay)
+        self.broadcasts += 1
+
+
+def bench_uninstall(args):
+    """Rolling back a run font by font (key open, RemoveFontResourceW, delete, broadcast each) vs. RollbackEngine."""
+    data = [build_test_font(f'Rollback{i}') for i in range(args.fonts)]
+    with tempfile.TemporaryDirectory(dir=args.workdir) as work:
+        print(f"{args.fonts} fonts, {args.broadcast_ms} ms simulated WM_FONTCHANGE broadcast\n")
+        times = {}
+        for label in ('per font', 'RollbackEngine'):
+            fonts_dir = tempfile.mkdtemp(dir=work)
+            backend = BroadcastingBackend(fonts_dir, args.broadcast_ms / 1000)
+            journal = InstallJournal(fonts_dir + '.jsonl')
+            sources = [FontSource(f'Font{i:05d}.ttf', len(d), 'memory', lambda d=d: io.BytesIO(d))
+                       for i, d in enumerate(data)]
+            backend.broadcast_delay = 0
+            InstallEngine(backend, journal=journal).run(sources)
+            backend.broadcast_delay = args.broadcast_ms / 1000
+            backend.registry.opens = backend.broadcasts = 0
+            fonts = installed_fonts(journal, fonts_dir)
+            assert len(fonts) == args.fonts
+
+            start = time.perf_counter()
+            if label == 'per font':
+                for font in fonts:
+                    key = backend.registry.open_key(HKLM, FONTS_REGISTRY_KEY, write=True)
+                    backend.registry.delete_value(key, font.name)
+                    backend.registry.close_key(key)
+                    backend.remove_font_resource(font.path)
+                    backend.remove_font(font.filename)
+                    backend.notify_font_change()
+            else:
+                RollbackEngine(backend, journal).uninstall(fonts)
+            times[label] = time.perf_counter() - start
+            journal.close()
+            assert os.listdir(fonts_dir) == [] and not backend.registry.values(HKLM, FONTS_REGISTRY_KEY)
+            print(f"  {label:<16} {times[label] * 1000:9.1f} ms   {backend.registry.opens:6d} key opens "
+                  f"{backend.broadcasts:6d} broadcasts")
+        print(f"  speedup          {times['per font'] / times['RollbackEngine']:9.1f}x")
+
+
+BENCHMARKS = {
+    'streaming': (bench_streaming, lambda p: (
+        p.add_argument('--size-mb', type=int, default=2048, help='total uncompressed font bytes'),
+        p.add_argument('--fonts', type=int, default=16, help='number of fonts in the archive'),
+    )),
+    'registry': (bench_registry, lambda p: (
+        p.add_argument('--entries', type=int, default=5000, help='number of registry values to write'),
+    )),
+    'workers': (bench_workers, lambda p: (
+        p.add_argument('--fonts', type=int, default=500, help='number of fonts to install'),
+        p.add_argument('--font-kb', type=int, default=256, help='size of each font'),
+        p.add_argument('--gdi-ms', type=float, default=5.0, help='simulated AddFontResourceW latency'),
+        p.add_argument('--max-workers', type=int, default=16, help='largest worker count to try'),
+    )),
+    'pipeline': (bench_pipeline, lambda p: (
+        p.add_argument('--fonts', type=int, default=400, help='fonts sent through the pipeline'),
+        p.add_argument('--extract-ms', type=float, default=2.0, help='simulated extract time per font'),
+        p.add_argument('--validate-ms', type=float, default=1.0, help='simulated validation time per font'),
+        p.add_argument('--name-ms', type=float, default=1.5, help='simulated name parsing time per font'),
+        p.add_argument('--install-ms', type=float, default=6.0, help='simulated copy + AddFontResourceW time'),
+        p.add_argument('--install-workers', type=int, default=4, help='install stage threads'),
+    )),
+    'archives': (bench_archives, lambda p: (
+        p.add_argument('--archives', type=int, default=50, help='number of archives'),
+        p.add_argument('--fonts', type=int, default=20, help='fonts per archive'),
+        p.add_argument('--font-kb', type=int, default=512, help='size of each font'),
+        p.add_argument('--workers', type=int, default=4, help='scanner and install workers'),
+    )),
+    'names': (bench_names, lambda p: (
+        p.add_argument('--max-mb', type=int, default=4096, help='largest font size to try'),
+        p.add_argument('--repeat', type=int, default=2000, help='parses per font size'),
+    )),
+    'inventory': (bench_inventory, lambda p: (
+        p.add_argument('--entries', type=int, default=50000, help='number of installed fonts'),
+    )),
+    'startup': (bench_startup, lambda p: (
+        p.add_argument('--repeat', type=int, default=5, help='interpreters started per entry point'),
+    )),
+    'ui': (bench_ui, lambda p: (
+        p.add_argument('--fonts', type=int, default=10000, help='fonts reported by the worker'),
+        p.add_argument('--font-us', type=int, default=100, help='worker time per font'),
+        p.add_argument('--apply-us', type=int, default=200, help='UI time to apply one status update'),
+    )),
+    'filelist': (bench_filelist, lambda p: (
+        p.add_argument('--archives', type=int, default=5000, help='number of archives selected'),
+        p.add_argument('--batch', type=int, default=50, help='archives picked per file dialog'),
+    )),
+    'folders': (bench_folders, lambda p: (
+        p.add_argument('--entries', type=int, default=100000, help='files in the tree'),
+        p.add_argument('--dirs', type=int, default=200, help='font family folders'),
+        p.add_argument('--consumer-us', type=int, default=0, help='simulated install time per path'),
+    )),
+    'icon': (bench_icon, lambda p: (
+        p.add_argument('--repeat', type=int, default=50, help='icon loads per variant'),
+    )),
+    'limits': (bench_limits, lambda p: (
+        p.add_argument('--fonts', type=int, default=64, help='fonts in the archive'),
+        p.add_argument('--font-kb', type=int, default=1024, help='size of each font'),
+        p.add_argument('--entries', type=int, default=100000, help='entries in the directory-only archive'),
+        p.add_argument('--repeat', type=int, default=3, help='runs per mode (the best is shown)'),
+    )),
+    'preview': (bench_preview, lambda p: (
+        p.add_argument('--entries', type=int, default=100000, help='entries in the archive'),
+    )),
+    'validate': (bench_validate, lambda p: (
+        p.add_argument('--fonts', type=int, default=4, help='number of fonts'),
+        p.add_argument('--size-mb', type=int, default=64, help='size of each font'),
+    )),
+    'cache': (bench_cache, lambda p: (
+        p.add_argument('--archives', type=int, default=1000, help='number of archives'),
+        p.add_argument('--fonts', type=int, default=20, help='fonts per archive'),
+    )),
+    'formats': (bench_formats, lambda p: (
+        p.add_argument('--fonts', type=int, default=64, help='fonts in the corpus'),
+        p.add_argument('--font-kb', type=int, default=1024, help='size of each font'),
+    )),
+    'journal': (bench_journal, lambda p: (
+        p.add_argument('--fonts', type=int, default=2000, help='fonts installed per run'),
+    )),
+    'uninstall': (bench_uninstall, lambda p: (
+        p.add_argument('--fonts', type=int, default=1000, help='fonts installed by the run rolled back'),
+        p.add_argument('--broadcast-ms', type=float, default=2.0, help='simulated WM_FONTCHANGE broadcast time'),
+    )),
+}
+
+
+def main():
+    """Run the requested benchmark."""
+    parser = argparse.ArgumentParser(description="FontFlow performance benchmarks")
+    parser.add_argument('--workdir', default=None, help='directory for temporary files')
+    subparsers = parser.add_subparsers(dest='benchmark')
+    for name, (func, add_arguments) in BENCHMARKS.items():
+        sub = subparsers.add_parser(name, help=func.__doc__)
+        add_arguments(sub)
+        sub.set_defaults(func=func)
+
+    args = parser.parse_args()
+    if not args.benchmark:
+        parser.print_help()
+        return 1
+    print(f"FontFlow benchmark: {args.benchmark}")
+    print("=" * 40)
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
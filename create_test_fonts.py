@@ -5,22 +5,142 @@ This creates sample font files (not real fonts) to test the application function
 """
 
 import os
+import struct
 import zipfile
 import tempfile
 from pathlib import Path
 
+SFNT_TRUETYPE = b'\x00\x01\x00\x00'
+SFNT_OPENTYPE_CFF = b'OTTO'
+HEAD_MAGIC = 0x5F0F3CF5
+
+
+def build_name_table(names):
+    """Build a `name` table with Windows Unicode (3/1/0x409) records for {name_id: text}."""
+    records = b''
+    strings = b''
+    for name_id, text in sorted(names.items()):
+        encoded = text.encode('utf-16-be')
+        records += struct.pack('>HHHHHH', 3, 1, 0x409, name_id, len(encoded), len(strings))
+        strings += encoded
+    return struct.pack('>HHH', 0, len(names), 6 + len(records)) + records + strings
+
+
+def table_checksum(data):
+    """OpenType table checksum: sum of big-endian uint32 words, zero padded."""
+    data += b'\0' * (-len(data) % 4)
+    return sum(struct.unpack(f'>{len(data) // 4}L', data)) & 0xFFFFFFFF
+
+
+def build_sfnt(tables, sfnt_version=SFNT_TRUETYPE, padding=0, base_offset=0):
+    """Build a minimal sfnt font from {tag: data}, optionally followed by `padding` zero
+    bytes in a trailing outline table ('glyf', or 'CFF ' for OTTO fonts). Returns
+    (header bytes, total size); the header holds every table except the padding so
+    huge fonts can be written sparsely.
+    base_offset is where the font will start in the file (non-zero inside collections)."""
+    num_tables = len(tables) + (1 if padding else 0)
+    offset = base_offset + 12 + 16 * num_tables
+    entries = {}
+    body = b''
+    for tag, data in tables.items():
+        entries[tag] = (table_checksum(data), offset + len(body), len(data))
+        body += data + b'\0' * (-len(data) % 4)
+    if padding:
+        entries[_outline_tag(sfnt_version)] = (0, offset + len(body), padding)
+    # The table directory must be sorted by tag
+    directory = b''.join(struct.pack('>4sLLL', tag, *entries[tag]) for tag in sorted(entries))
+    search_range = 16 * (1 << (num_tables.bit_length() - 1))
+    header = struct.pack('>4sHHHH', sfnt_version, num_tables, search_range,
+                         num_tables.bit_length() - 1, num_tables * 16 - search_range)
+    return header + directory + body, offset - base_offset + len(body) + padding
+
+
+def _outline_tag(sfnt_version):
+    return b'CFF ' if sfnt_version == SFNT_OPENTYPE_CFF else b'glyf'
+
+
+def _test_font_tables(family, style, sfnt_version=SFNT_TRUETYPE, outlines=b'\0' * 4):
+    # The tables a font needs to pass validation, with a real head magic number.
+    # outlines=None leaves the outline table out (build_sfnt's padding adds it).
+    names = {1: family, 2: style, 4: f"{family} {style}" if style != 'Regular' else family,
+             6: f"{family}-{style}".replace(' ', '')}
+    head = bytearray(54)
+    struct.pack_into('>LL', head, 0, 0x00010000, 0x00010000)
+    struct.pack_into('>L', head, 12, HEAD_MAGIC)
+    tables = {b'name': build_name_table(names), b'head': bytes(head), b'maxp': bytes(6),
+              b'cmap': bytes(4), b'hhea': bytes(36), b'hmtx': bytes(4), b'post': bytes(32),
+              b'OS/2': bytes(78)}
+    if sfnt_version != SFNT_OPENTYPE_CFF:
+        tables[b'loca'] = bytes(4)
+    if outlines is not None:
+        tables[_outline_tag(sfnt_version)] = outlines
+    return tables
+
+
+def build_test_font(family, style='Regular', sfnt_version=SFNT_TRUETYPE, outlines=b'\0' * 4):
+    """A valid test font in memory; `outlines` is the outline table's content, so
+    fonts of the same size but different bytes can be made. Checksums are correct."""
+    data, _ = build_sfnt(_test_font_tables(family, style, sfnt_version, outlines), sfnt_version)
+    return data
+
+
+def build_test_font_header(family, size, style='Regular', sfnt_version=SFNT_TRUETYPE):
+    """The first bytes of a valid test font of exactly `size` bytes whose outline table
+    takes up the rest; the caller writes those bytes. The outline table's checksum is
+    only right if they are zeros."""
+    tables = _test_font_tables(family, style, sfnt_version, None)
+    header_size = len(build_sfnt(tables, sfnt_version, padding=1)[0])
+    if size <= header_size:
+        raise ValueError(f"a test font needs more than {header_size} bytes")
+    return build_sfnt(tables, sfnt_version, size - header_size)[0]
+
+
+def write_test_font(path, family, style='Regular', sfnt_version=SFNT_TRUETYPE, padding=0):
+    """Write a structurally valid test font with a name table (no glyphs).
+    `padding` adds a sparse zero-filled table so large fonts cost no disk time."""
+    tables = _test_font_tables(family, style, sfnt_version, None if padding else b'\0' * 4)
+    data, total_size = build_sfnt(tables, sfnt_version, padding)
+    with open(path, 'wb') as f:
+        f.write(data)
+        f.truncate(total_size)
+    return path
+
+
+def write_test_collection(path, faces, sfnt_version=SFNT_TRUETYPE, padding=0):
+    """Write a .ttc/.otc holding one test font per (family, style) in faces.
+    `padding` is a sparse table appended to the last face."""
+    header_size = 12 + 4 * len(faces)
+    offsets = []
+    chunks = []
+    position = header_size
+    for index, (family, style) in enumerate(faces):
+        offsets.append(position)
+        face_padding = padding if index == len(faces) - 1 else 0
+        tables = _test_font_tables(family, style, sfnt_version, None if face_padding else b'\0' * 4)
+        data, size = build_sfnt(tables, sfnt_version, face_padding, position)
+        chunks.append(data)
+        position += size + (-size % 4)
+    header = struct.pack(f'>4sHHL{len(faces)}L', b'ttcf', 1, 0, len(faces), *offsets)
+    with open(path, 'wb') as f:
+        f.write(header)
+        for offset, data in zip(offsets, chunks):
+            f.seek(offset)
+            f.write(data)
+        f.truncate(position - (-size % 4))
+    return path
+
 def create_test_font_zip(output_path="test_fonts.zip"):
     """Create a test ZIP file with dummy font files."""
     
-    # Sample font file content (not real fonts, just for testing)
+    # Sample fonts: structurally valid (FontFlow validates fonts before installing) but without glyphs
     font_files = {
-        "TestFont-Regular.ttf": b"TTF dummy content for testing - not a real font",
-        "TestFont-Bold.ttf": b"TTF dummy content for testing - not a real font",
-        "TestFont-Italic.otf": b"OTF dummy content for testing - not a real font",
-        "TestFont-BoldItalic.otf": b"OTF dummy content for testing - not a real font",
+        "TestFont-Regular.ttf": build_test_font("TestFont"),
+        "TestFont-Bold.ttf": build_test_font("TestFont", "Bold"),
+        "TestFont-Italic.otf": build_test_font("TestFont", "Italic", SFNT_OPENTYPE_CFF),
+        "TestFont-BoldItalic.otf": build_test_font("TestFont", "Bold Italic", SFNT_OPENTYPE_CFF),
         "readme.txt": b"This is a test font package created for testing FontFlow.\nThese are not real fonts and will not work as actual fonts.",
         "license.txt": b"Test License\nThis is a dummy license file for testing purposes only.",
-        "subfolder/TestFont-Light.ttf": b"TTF dummy content in subfolder - not a real font"
+        "subfolder/TestFont-Light.ttf": build_test_font("TestFont", "Light")
     }
     
     try:
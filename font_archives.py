@@ -0,0 +1,594 @@
+#!/usr/bin/env python3
+"""
+Archive reading for FontFlow.
+Font members are exposed as readable streams so they can be copied straight
+to their final location instead of being extracted to a temporary directory first.
+ZIPs inside ZIPs are opened from memory (or a spooled temporary file when large).
+Every ZIP's central directory is checked against ArchiveLimits before anything
+is decompressed, and member streams are cut off when they break the limits.
+Tarballs are read front to back as a stream, and their fonts handed out one
+at a time as they are reached.
+"""
+
+import io
+import os
+import shutil
+import tarfile
+import zipfile
+import tempfile
+import itertools
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from font_limits import DEFAULT_LIMITS, ArchiveLimits, LimitExceeded
+
+FONT_EXTENSIONS = frozenset({'.ttf', '.otf', '.ttc', '.otc'})
+
+# Large buffer so multi-hundred-MB CJK fonts are copied in a few hundred calls
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Archives opened at the same time by ArchiveScanner
+DEFAULT_SCAN_WORKERS = 4
+
+# Archives inside archives (e.g. a vendor ZIP of per-family ZIPs)
+NESTED_ARCHIVE_EXTENSIONS = frozenset({'.zip'})
+MAX_NESTED_DEPTH = 3
+# Inner archives up to this size are kept in memory, larger ones spill to a temporary file
+NESTED_SPOOL_THRESHOLD = 32 * 1024 * 1024
+# Total uncompressed size of the inner archives of one top-level archive
+NESTED_ARCHIVE_BUDGET = 2 * 1024 * 1024 * 1024
+
+# Tarballs are read in one pass ('r|*'), so any compression tarfile knows will do
+TAR_EXTENSIONS = frozenset({'.tar', '.tgz', '.tbz', '.tbz2', '.txz', '.tar.gz', '.tar.bz2', '.tar.xz'})
+# Archives that can be selected or found in a folder
+ARCHIVE_EXTENSIONS = NESTED_ARCHIVE_EXTENSIONS | TAR_EXTENSIONS
+# Fonts read out of a tarball are kept in memory up to this size, larger ones in a temporary file
+TAR_SPOOL_THRESHOLD = NESTED_SPOOL_THRESHOLD
+
+
+class FontMetadata:
+    """What is known about a font's content without reading it, e.g. from a scan cache.
+
+    The install engine uses font_name and digest when they are set instead of
+    reading the font, and fills them in when it learns them.
+    """
+
+    __slots__ = ('size', 'crc', 'font_name', 'digest')
+
+    def __init__(self, size: int, crc: Optional[int] = None, font_name: Optional[str] = None,
+                 digest: Optional[str] = None):
+        self.size = size
+        self.crc = crc              # CRC-32 from the archive directory
+        self.font_name = font_name  # Registry name
+        self.digest = digest        # font_index content hash
+
+
+class FontSource:
+    """A font file that can be opened for reading, on disk or inside an archive."""
+
+    def __init__(self, filename: str, size: int, origin: str, opener: Callable[[], BinaryIO],
+                 metadata: Optional[FontMetadata] = None):
+        self.filename = filename  # Basename used for the installed file
+        self.size = size          # Uncompressed size in bytes
+        self.origin = origin      # Archive or file the font came from
+        self.metadata = metadata  # Shared with a scan cache, if the font's archive has a manifest
+        self._opener = opener
+
+    def open(self) -> BinaryIO:
+        """Open the font data for reading."""
+        return self._opener()
+
+    def counted(self, on_read: Callable[[int], None]) -> 'FontSource':
+        """A copy of this source whose streams call on_read(n) for every n bytes read."""
+        return FontSource(self.filename, self.size, self.origin, lambda: CountingReader(self.open(), on_read),
+                          self.metadata)
+
+    @classmethod
+    def from_path(cls, path: str) -> 'FontSource':
+        """Create a source for a loose font file on disk."""
+        return cls(os.path.basename(path), os.path.getsize(path), path, lambda: open(path, 'rb'))
+
+    def __repr__(self):
+        return f"FontSource({self.filename!r}, size={self.size}, origin={self.origin!r})"
+
+
+class CountingReader:
+    """Wraps a binary stream and reports how many bytes each read() returned."""
+
+    def __init__(self, stream: BinaryIO, on_read: Callable[[int], None]):
+        self._stream = stream
+        self._on_read = on_read
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        if data:
+            self._on_read(len(data))
+        return data
+
+    def close(self):
+        self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SuffixFilter:
+    """Matches file names (str, or bytes with bytes suffixes) against a set of suffixes
+    (e.g. '.ttf') without splitting paths.
+
+    The last few characters of a name are compared with the suffixes of each
+    length in the set, which is several times faster than os.path.splitext or
+    pathlib over directories of 100,000+ entries. Matching is case-insensitive.
+    """
+
+    def __init__(self, suffixes: Iterable[str]):
+        self.suffixes = frozenset(suffix.lower() for suffix in suffixes)
+        self._lengths = sorted({len(suffix) for suffix in self.suffixes}, reverse=True)
+
+    def match(self, name: str) -> Optional[str]:
+        """The suffix name ends with, lower-cased, or None."""
+        for length in self._lengths:
+            suffix = name[-length:].lower()
+            if suffix in self.suffixes:
+                return suffix
+        return None
+
+
+class FontArchive:
+    """What ArchiveScanner reads fonts from: a ZIP, a tarball or a loose font file.
+
+    fonts gives a FontSource per font. Archives with a directory list them all
+    when opened; streaming ones (streaming is True) find them while fonts is
+    iterated, so font_count and total_bytes only cover the fonts found so far,
+    and an error part way through ends the iteration and is kept in error.
+    Sources stay readable until close().
+    """
+
+    streaming = False
+    error: Optional[Exception] = None
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fonts: Iterable[FontSource] = []
+        self.skipped: List[Tuple[str, str]] = []  # (inner archive, reason)
+
+    @property
+    def font_count(self) -> int:
+        return len(self.fonts)
+
+    @property
+    def total_bytes(self) -> int:
+        """Uncompressed size of every font."""
+        return sum(source.size for source in self.fonts)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ZipFontArchive(FontArchive):
+    """A ZIP archive whose font members can be streamed without extracting them.
+
+    Inner ZIPs are read recursively up to max_depth levels deep. Each one is
+    copied into a SpooledTemporaryFile, which stays in memory up to
+    spool_threshold bytes, and their fonts are added to fonts like any other
+    member. Inner archives that are too deep, over nested_budget or unreadable
+    are listed in skipped instead of failing the whole archive.
+
+    Raises LimitExceeded if the archive's central directory breaks limits
+    (inner archives that do are skipped). Reading a font stops with
+    LimitExceeded once it produces more than its entry declared.
+
+    With a scan cache (font_scan_cache.ScanCache), every font gets the
+    FontMetadata kept in the archive's manifest.
+    """
+
+    def __init__(self, path: str, extensions=FONT_EXTENSIONS, max_depth: int = MAX_NESTED_DEPTH,
+                 spool_threshold: int = NESTED_SPOOL_THRESHOLD, nested_budget: int = NESTED_ARCHIVE_BUDGET,
+                 limits: ArchiveLimits = DEFAULT_LIMITS, cache=None):
+        self.path = path
+        self.limits = limits
+        self.extensions = extensions
+        self.max_depth = max_depth
+        self.spool_threshold = spool_threshold
+        self.nested_budget = nested_budget
+        self.nested_bytes = 0  # Uncompressed bytes of inner archives read so far
+        self.fonts: List[FontSource] = []
+        self.skipped: List[Tuple[str, str]] = []  # (inner archive, reason)
+        self._zips: List[zipfile.ZipFile] = []
+        self._spools = []
+        self._manifest = cache.manifest(path) if cache is not None else None
+        try:
+            self._add_members(zipfile.ZipFile(path, 'r'), path, 0)
+        except BaseException:
+            self.close()
+            raise
+
+    def _add_members(self, zf: zipfile.ZipFile, origin: str, depth: int):
+        self._zips.append(zf)
+        self.limits.check_directory(origin, zf.infolist())
+        suffixes = SuffixFilter(set(self.extensions) | NESTED_ARCHIVE_EXTENSIONS)
+        for file_info in zf.infolist():
+            ext = suffixes.match(file_info.filename)
+            if ext is None:
+                continue
+            if ext in self.extensions:
+                metadata = None
+                if self._manifest is not None:
+                    # Members of inner archives are keyed by their path inside the outer one
+                    member = f"{origin}/{file_info.filename}"[len(self.path) + 1:]
+                    metadata = self._manifest.font(member, file_info.file_size, file_info.CRC)
+                self.fonts.append(FontSource(
+                    os.path.basename(file_info.filename),
+                    file_info.file_size,
+                    origin,
+                    lambda info=file_info, zf=zf: self._open_member(zf, info),
+                    metadata
+                ))
+            elif ext in NESTED_ARCHIVE_EXTENSIONS:
+                self._add_nested(zf, file_info, f"{origin}/{file_info.filename}", depth + 1)
+
+    def _add_nested(self, zf: zipfile.ZipFile, file_info: zipfile.ZipInfo, origin: str, depth: int):
+        if depth > self.max_depth:
+            self.skipped.append((origin, f"nested more than {self.max_depth} levels deep"))
+            return
+        if self.nested_bytes + file_info.file_size > self.nested_budget:
+            self.skipped.append((origin, f"inner archives exceed {self.nested_budget} bytes"))
+            return
+        self.nested_bytes += file_info.file_size
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_threshold)
+        try:
+            with self._open_member(zf, file_info) as src:
+                copy_stream(src, spool)
+            spool.seek(0)
+            inner = zipfile.ZipFile(spool, 'r')
+        except (zipfile.BadZipFile, zipfile.LargeZipFile, NotImplementedError, RuntimeError, OSError,
+                LimitExceeded) as e:
+            spool.close()
+            self.skipped.append((origin, str(e)))
+            return
+        self._spools.append(spool)
+        try:
+            self._add_members(inner, origin, depth)
+        except LimitExceeded as e:
+            self.skipped.append((origin, str(e)))
+
+    def _open_member(self, zf: zipfile.ZipFile, file_info: zipfile.ZipInfo) -> BinaryIO:
+        return self.limits.reader(zf.open(file_info), file_info.filename, file_info.file_size,
+                                  file_info.compress_size)
+
+    def close(self):
+        """Close the ZIP files (and inner archive buffers). Sources become unreadable afterwards."""
+        for zf in reversed(self._zips):
+            zf.close()
+        for spool in self._spools:
+            spool.close()
+        self._zips.clear()
+        self._spools.clear()
+
+
+class TarFontArchive(FontArchive):
+    """A tarball (plain, gzip, bzip2 or xz) read front to back as a stream.
+
+    The file is opened in tarfile's 'r|*' mode, so it is never seeked and
+    never extracted: iterating fonts reads the member headers in order, and
+    each font member is copied out of the stream when it is reached (into
+    memory, or a temporary file above spool_threshold, since the stream can't
+    go back for it) and handed out at once. Other members are read past. Each
+    member is checked against limits as its header is read, and the member
+    count and total size as they grow; a limit hit or a damaged stream ends
+    the iteration, with the error in error. Fonts handed out before that stay
+    valid. Tarballs inside tarballs aren't opened.
+
+    Spooled fonts are kept until close(), unless release_after is set: then a
+    font's temporary file is deleted once that many fonts have been handed
+    out after it (like ArchiveScanner's release_after), so only the fonts the
+    consumer may still be reading are on disk at a time.
+    """
+
+    streaming = True
+
+    def __init__(self, path: str, extensions=FONT_EXTENSIONS, limits: ArchiveLimits = DEFAULT_LIMITS,
+                 spool_threshold: int = TAR_SPOOL_THRESHOLD, cache=None, release_after: Optional[int] = None):
+        self.path = path
+        self.extensions = extensions
+        self.limits = limits
+        self.spool_threshold = spool_threshold
+        self.skipped: List[Tuple[str, str]] = []
+        self.error: Optional[Exception] = None
+        self.members = 0          # Members read past so far
+        self._found = 0
+        self._found_bytes = 0
+        self.release_after = release_after
+        self._temp_dir: Optional[str] = None
+        self._spools = deque()  # (temporary file, fonts found once it was handed out), oldest first
+        self._manifest = cache.manifest(path) if cache is not None else None
+        # Reads the first header, so a file that isn't a tarball fails here
+        self._tar = tarfile.open(path, 'r|*')
+        self.fonts: Iterator[FontSource] = self._read_fonts()
+
+    @property
+    def font_count(self) -> int:
+        return self._found
+
+    @property
+    def total_bytes(self) -> int:
+        return self._found_bytes
+
+    def _read_fonts(self) -> Iterator[FontSource]:
+        suffixes = SuffixFilter(self.extensions)
+        total = 0
+        try:
+            for member in self._tar:
+                self.members += 1
+                if not member.isfile():
+                    continue
+                total += member.size
+                self.limits.check_member(member.name, member.size)
+                self.limits.check_totals(self.path, self.members, total)
+                if suffixes.match(member.name) is None:
+                    continue
+                source = self._read_member(member)
+                self._found += 1
+                self._found_bytes += source.size
+                yield source
+                self._drop_spools()
+        except Exception as e:
+            # A damaged stream: tarfile, zlib, bz2 and lzma each raise their own errors
+            self.error = e
+
+    def _read_member(self, member: tarfile.TarInfo) -> FontSource:
+        with self.limits.reader(self._tar.extractfile(member), member.name, member.size) as src:
+            if member.size <= self.spool_threshold:
+                data = src.read()
+                opener = lambda: io.BytesIO(data)
+            else:
+                if self._temp_dir is None:
+                    self._temp_dir = tempfile.mkdtemp(prefix='fontflow-tar-')
+                spool_path = os.path.join(self._temp_dir, f"{self._found}.font")
+                with open(spool_path, 'wb') as dst:
+                    copy_stream(src, dst)
+                self._spools.append((spool_path, self._found + 1))
+                opener = lambda: open(spool_path, 'rb')
+        metadata = self._manifest.font(member.name, member.size) if self._manifest is not None else None
+        return FontSource(os.path.basename(member.name), member.size, self.path, opener, metadata)
+
+    def _drop_spools(self):
+        # Delete the temporary files of fonts the consumer is done with
+        if self.release_after is None:
+            return
+        while self._spools and self._spools[0][1] + self.release_after <= self._found:
+            try:
+                os.remove(self._spools.popleft()[0])
+            except OSError:
+                pass
+
+    def close(self):
+        """Stop reading and close the tarball. Fonts spooled to temporary files become unreadable."""
+        self.fonts.close()
+        self._tar.close()
+        if self._temp_dir is not None:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            self._temp_dir = None
+
+
+class LooseFontFile(FontArchive):
+    """A font file given on its own (not in an archive), read like a one-font archive."""
+
+    def __init__(self, path: str, cache=None):
+        self.path = path
+        self.fonts = [FontSource.from_path(path)]
+        if cache is not None:
+            self.fonts[0].metadata = cache.manifest(path).font(self.fonts[0].filename, self.fonts[0].size)
+        self.skipped: List[Tuple[str, str]] = []
+
+
+def open_font_archive(path: str, extensions=FONT_EXTENSIONS, limits: ArchiveLimits = DEFAULT_LIMITS,
+                      cache=None, release_after: Optional[int] = None) -> FontArchive:
+    """Open path with the reader its name calls for: a loose font, a tarball (streamed) or a ZIP.
+    release_after is passed to tarballs, whose spooled fonts are deleted once the consumer is done with them."""
+    suffix = SuffixFilter(set(extensions) | TAR_EXTENSIONS).match(path)
+    if suffix in extensions:
+        return LooseFontFile(path, cache)
+    if suffix in TAR_EXTENSIONS:
+        return TarFontArchive(path, extensions, limits=limits, cache=cache, release_after=release_after)
+    return ZipFontArchive(path, extensions, limits=limits, cache=cache)
+
+
+class ArchiveEvent:
+    """Progress of one archive in an ArchiveScanner."""
+
+    OPENED = 'opened'  # Central directory read, font_count known (0 for a streamed archive)
+    FOUND = 'found'    # A streamed archive reached another font (font_count 1)
+    FAILED = 'failed'  # Couldn't be opened, or a streamed archive broke off; see error
+    DONE = 'done'      # All of its fonts have been handed out
+
+    def __init__(self, kind: str, path: str, font_count: int = 0, error: Optional[Exception] = None,
+                 skipped: Iterable[Tuple[str, str]] = (), total_bytes: int = 0, streaming: bool = False):
+        self.kind = kind
+        self.path = path
+        self.font_count = font_count
+        self.total_bytes = total_bytes  # Uncompressed size of the archive's fonts
+        self.error = error
+        self.skipped = list(skipped)  # Inner archives that weren't read, see ZipFontArchive.skipped
+        self.streaming = streaming    # Fonts are only counted as FOUND events arrive
+
+    def __repr__(self):
+        return f"ArchiveEvent({self.kind!r}, {self.path!r}, font_count={self.font_count})"
+
+
+class ArchiveScanner:
+    """Opens archives on a thread pool and yields their fonts as soon as each one is ready.
+
+    Iterating gives the fonts of whichever archive finished opening first, so
+    installation can start while other archives are still being read. Member
+    data is decompressed by whoever reads the source (the install workers), and
+    zlib releases the GIL while inflating, so that work runs in parallel too.
+    on_event is called on the iterating thread.
+
+    paths may be a lazy iterable (e.g. a FolderFeed); only twice the worker
+    count archives are being opened at a time. Paths with a font extension are
+    read as loose font files, tarballs are streamed (their fonts are counted
+    in FOUND events as they are reached). Archives stay open until close(), unless
+    release_after is set: then an archive is closed once that many fonts have
+    been yielded after its last one, so the consumer must be done with a
+    source by then (InstallEngine.window); a tarball's fonts spooled to
+    temporary files are deleted on the same schedule. With a scan cache,
+    fonts carry the metadata kept in their archive's manifest.
+    """
+
+    def __init__(self, paths: Iterable[str], workers: int = DEFAULT_SCAN_WORKERS,
+                 extensions=FONT_EXTENSIONS, on_event: Optional[Callable[[ArchiveEvent], None]] = None,
+                 release_after: Optional[int] = None, limits: ArchiveLimits = DEFAULT_LIMITS, cache=None):
+        self.paths = paths
+        self.workers = max(1, workers)
+        self.extensions = extensions
+        self.on_event = on_event
+        self.release_after = release_after
+        self.limits = limits
+        self.cache = cache
+        self.archives: List[FontArchive] = []  # Opened and not closed yet
+        self.failed: List[Tuple[str, Exception]] = []
+        self.opened = 0  # Archives and loose fonts opened so far
+
+    def _emit(self, event: ArchiveEvent):
+        if self.on_event is not None:
+            self.on_event(event)
+
+    def _open(self, path: str) -> FontArchive:
+        return open_font_archive(path, self.extensions, self.limits, self.cache, self.release_after)
+
+    def __iter__(self) -> Iterator[FontSource]:
+        paths = iter(self.paths)
+        yielded = 0
+        finished = deque()  # (archive, fonts yielded when its last font was), oldest first
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='fontflow-scan') as pool:
+            futures = {}
+            try:
+                while True:
+                    # Keep a few archives opening ahead of the consumer
+                    for path in itertools.islice(paths, self.workers * 2 - len(futures)):
+                        futures[pool.submit(self._open, path)] = path
+                    if not futures:
+                        break
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path = futures.pop(future)
+                        try:
+                            archive = future.result()
+                        except Exception as e:
+                            self.failed.append((path, e))
+                            self._emit(ArchiveEvent(ArchiveEvent.FAILED, path, error=e))
+                            continue
+                        self.archives.append(archive)
+                        self.opened += 1
+                        self._emit(ArchiveEvent(ArchiveEvent.OPENED, path, archive.font_count,
+                                                skipped=archive.skipped, total_bytes=archive.total_bytes,
+                                                streaming=archive.streaming))
+                        for source in archive.fonts:
+                            if archive.streaming:
+                                self._emit(ArchiveEvent(ArchiveEvent.FOUND, path, 1, total_bytes=source.size,
+                                                        streaming=True))
+                            yield source
+                            yielded += 1
+                            self._release(finished, yielded)
+                        if archive.error is not None:
+                            self.failed.append((path, archive.error))
+                            self._emit(ArchiveEvent(ArchiveEvent.FAILED, path, error=archive.error,
+                                                    streaming=archive.streaming))
+                        self._emit(ArchiveEvent(ArchiveEvent.DONE, path, archive.font_count))
+                        if self.release_after is not None:
+                            finished.append((archive, yielded))
+                            self._release(finished, yielded)
+            finally:
+                # Stopped early: don't leak archives that were still being opened
+                for future in futures:
+                    if future.cancel() or future.exception() is not None:
+                        continue
+                    future.result().close()
+
+    def _release(self, finished: deque, yielded: int):
+        # Close archives whose fonts the consumer is done with
+        while finished and finished[0][1] + self.release_after <= yielded:
+            archive = finished.popleft()[0]
+            archive.close()
+            self.archives.remove(archive)
+
+    def close(self):
+        """Close every archive opened so far."""
+        for archive in self.archives:
+            archive.close()
+        self.archives.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def copy_stream(src: BinaryIO, dst: BinaryIO, buffer_size: int = COPY_BUFFER_SIZE, hasher=None) -> int:
+    """Copy src to dst in large chunks and return the number of bytes written.
+    If a hashlib object is given it is fed the data on the way through."""
+    total = 0
+    while True:
+        chunk = src.read(buffer_size)
+        if not chunk:
+            return total
+        dst.write(chunk)
+        if hasher is not None:
+            hasher.update(chunk)
+        total += len(chunk)
+
+
+def stage_font_source(source: FontSource, staging_dir: str) -> FontSource:
+    """Materialize a source in staging_dir for backends that need a real file to install from.
+
+    Each font gets a file of its own, so two archives shipping the same file
+    name don't overwrite each other's copy; the returned source keeps the
+    name the font is installed under, and its origin is the staged file.
+    """
+    fd, staged_path = tempfile.mkstemp(suffix=os.path.splitext(source.filename)[1], dir=staging_dir)
+    try:
+        with os.fdopen(fd, 'wb') as dst, source.open() as src:
+            size = copy_stream(src, dst)
+    except BaseException:
+        # Don't leave a truncated copy behind
+        try:
+            os.remove(staged_path)
+        except OSError:
+            pass
+        raise
+    return FontSource(source.filename, size, staged_path, lambda: open(staged_path, 'rb'), source.metadata)
+
+
+def stage_font_sources(sources: Iterable[FontSource], staging_dir: str,
+                       release_after: Optional[int] = None) -> Iterator[FontSource]:
+    """Stage sources one by one as they are taken (see stage_font_source).
+
+    With release_after, a staged file is deleted once that many more sources
+    have been taken, so the consumer must be done with a source by then
+    (InstallEngine.window) and only the fonts still being installed are on
+    disk. The last ones are left for the caller to delete with staging_dir.
+    """
+    staged = deque()  # (staged path, sources taken when it was), oldest first
+    taken = 0
+    for source in sources:
+        copy = stage_font_source(source, staging_dir)
+        taken += 1
+        staged.append((copy.origin, taken))
+        yield copy
+        while release_after is not None and staged and staged[0][1] + release_after <= taken:
+            try:
+                os.remove(staged.popleft()[0])
+            except OSError:
+                pass
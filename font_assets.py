@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Image assets for the FontFlow window.
+Icons are scaled once and the result is cached as a PNG keyed by the hash of
+the source file, so later launches load it straight into a tk.PhotoImage
+without importing PIL.
+"""
+
+import os
+import sys
+import hashlib
+import tkinter as tk
+from typing import Iterable, Optional
+
+ICON_CACHE_VERSION = 1
+
+_pil_modules = None
+
+
+def load_pil():
+    """Import PIL on first use. Returns (Image, ImageTk), or None if PIL isn't installed."""
+    global _pil_modules
+    if _pil_modules is None:
+        try:
+            from PIL import Image, ImageTk
+            _pil_modules = (Image, ImageTk)
+        except ImportError:
+            _pil_modules = ()
+    return _pil_modules or None
+
+
+def cache_dir() -> str:
+    """Per-user cache folder (%LOCALAPPDATA%\\FontFlow\\cache on Windows)."""
+    if sys.platform == 'win32' and os.environ.get('LOCALAPPDATA'):
+        return os.path.join(os.environ['LOCALAPPDATA'], 'FontFlow', 'cache')
+    return os.path.join(os.path.expanduser('~'), '.cache', 'fontflow')
+
+
+def icon_cache_path(source: str, size: int, directory: Optional[str] = None) -> str:
+    """Path of the cached size x size rendering of source, keyed by the source's content hash."""
+    with open(source, 'rb') as f:
+        digest = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    return os.path.join(directory or cache_dir(), f"icon-v{ICON_CACHE_VERSION}-{digest}-{size}.png")
+
+
+def _render_icon(master, source: str, size: int, cache_path: str):
+    # Scale the source and save the result to cache_path. Returns the image, or None
+    # if source can't be read without PIL (Tk can't read .ico files).
+    pil = load_pil()
+    if pil:
+        Image, ImageTk = pil
+        img = Image.open(source).convert('RGBA').resize((size, size), Image.Resampling.LANCZOS)
+        try:
+            img.save(cache_path + '.tmp', format='PNG')
+            os.replace(cache_path + '.tmp', cache_path)
+        except OSError:
+            pass  # No cache this time; the image is still usable
+        return ImageTk.PhotoImage(img, master=master)
+    if os.path.splitext(source)[1].lower() != '.png':
+        return None
+    icon_img = tk.PhotoImage(master=master, file=source)
+    icon_img = icon_img.subsample(max(1, icon_img.width() // size), max(1, icon_img.height() // size))
+    try:
+        icon_img.write(cache_path + '.tmp', format='png')
+        os.replace(cache_path + '.tmp', cache_path)
+    except (OSError, tk.TclError):
+        pass
+    return icon_img
+
+
+def load_icon(master, sources: Iterable[str], size: int, directory: Optional[str] = None):
+    """Return a size x size PhotoImage of the first readable source, or None.
+
+    The first launch scales the icon (with PIL if available) and caches it.
+    Later launches load the cached PNG directly.
+    """
+    directory = directory or cache_dir()
+    for source in sources:
+        if not os.path.exists(source):
+            continue
+        try:
+            cache_path = icon_cache_path(source, size, directory)
+            if os.path.exists(cache_path):
+                return tk.PhotoImage(master=master, file=cache_path)
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError:
+                pass  # Rendered without caching
+            icon_img = _render_icon(master, source, size, cache_path)
+        except (OSError, tk.TclError):
+            continue
+        if icon_img is not None:
+            return icon_img
+    return None
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Font installation backends for FontFlow.
+A backend decides where font files are written and how Windows is told about
+them, so the install logic can also run against a plain directory.
+"""
+
+import os
+import time
+import ctypes
+import threading
+from typing import Callable, Optional, Tuple
+
+from font_archives import FontSource, copy_stream
+from font_registry import FONTS_REGISTRY_KEY, HKLM, MemoryRegistry, RegistryWriter, WinRegistry
+
+# Windows API constants
+HWND_BROADCAST = 0xFFFF
+WM_FONTCHANGE = 0x001D
+SMTO_ABORTIFHUNG = 0x0002
+
+
+def system_fonts_dir() -> str:
+    """Return the Windows Fonts directory."""
+    return os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts')
+
+
+class DirectoryFontBackend:
+    """Installs font files into a directory without registering them with Windows.
+
+    Registry entries go to an in-memory registry unless another one is given.
+    """
+
+    install_type = "directory"
+    # Backends that can only install from a real file on disk set this so the
+    # caller stages archive members in a temporary directory first.
+    requires_staging = False
+
+    registry_hive = HKLM
+
+    def __init__(self, fonts_dir: str, registry=None):
+        self.fonts_dir = fonts_dir
+        self.registry = registry if registry is not None else MemoryRegistry()
+
+    def destination_for(self, filename: str) -> str:
+        return os.path.join(self.fonts_dir, filename)
+
+    def write_font(self, source: FontSource, hasher=None) -> Tuple[str, int]:
+        """Stream a font into the fonts directory in one pass. Returns (path, bytes written)."""
+        dest_path = self.destination_for(source.filename)
+        try:
+            with source.open() as src, open(dest_path, 'wb') as dst:
+                written = copy_stream(src, dst, hasher=hasher)
+        except BaseException:
+            # Don't leave a truncated font behind
+            try:
+                os.remove(dest_path)
+            except OSError:
+                pass
+            raise
+        return dest_path, written
+
+    def add_font_resource(self, font_path: str) -> bool:
+        return True
+
+    def remove_font_resource(self, font_path: str) -> bool:
+        return True
+
+    def remove_font(self, font_filename: str) -> str:
+        """Delete a font file from the fonts directory. Returns its path; a file that is already gone is fine."""
+        dest_path = self.destination_for(font_filename)
+        try:
+            os.remove(dest_path)
+        except FileNotFoundError:
+            pass
+        return dest_path
+
+    def register_font(self, font_reg_name: str, font_filename: str):
+        """Register a single font, opening and closing the Fonts key for it."""
+        key = self.registry.open_key(self.registry_hive, FONTS_REGISTRY_KEY, write=True)
+        try:
+            self.registry.set_value(key, font_reg_name, font_filename)
+        finally:
+            self.registry.close_key(key)
+
+    def open_registry_writer(self) -> RegistryWriter:
+        """Open a writer that keeps the Fonts key open for a whole install run."""
+        return RegistryWriter(self.registry, self.registry_hive, FONTS_REGISTRY_KEY)
+
+    def notify_font_change(self):
+        pass
+
+
+class WindowsFontBackend(DirectoryFontBackend):
+    """Installs fonts system-wide into %WINDIR%\\Fonts and registers them in HKLM.
+
+    gdi32, user32 and the registry default to the real ones; pass stand-ins
+    to exercise the backend on other platforms.
+    """
+
+    install_type = "system-wide"
+
+    def __init__(self, fonts_dir: str = None, gdi32=None, user32=None, registry=None):
+        super().__init__(fonts_dir or system_fonts_dir(),
+                         registry if registry is not None else WinRegistry())
+        self._gdi32 = gdi32
+        self._user32 = user32
+
+    @property
+    def gdi32(self):
+        return self._gdi32 or ctypes.windll.gdi32
+
+    @property
+    def user32(self):
+        return self._user32 or ctypes.windll.user32
+
+    def add_font_resource(self, font_path: str) -> bool:
+        return self.gdi32.AddFontResourceW(font_path) > 0
+
+    def remove_font_resource(self, font_path: str) -> bool:
+        return self.gdi32.RemoveFontResourceW(font_path) != 0
+
+    def notify_font_change(self):
+        """Notify all windows that fonts have changed."""
+        self.user32.SendMessageTimeoutW(
+            HWND_BROADCAST,
+            WM_FONTCHANGE,
+            0,
+            0,
+            SMTO_ABORTIFHUNG,
+            1000,
+            None
+        )
+
+
+class FontChangeNotifier:
+    """Coalesces WM_FONTCHANGE broadcasts for an install run.
+
+    Each broadcast can block for up to a second per hung top-level window, so
+    instead of broadcasting after every font the notifier counts changes and
+    broadcasts once every batch_size fonts or interval seconds, and once more
+    when the run ends. With neither set, a run produces a single broadcast.
+    """
+
+    def __init__(self, broadcast: Callable[[], None], batch_size: Optional[int] = None,
+                 interval: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self._broadcast = broadcast
+        self.batch_size = batch_size
+        self.interval = interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_broadcast = clock()
+        self.pending = 0
+        self.broadcasts = 0
+
+    def font_changed(self):
+        """Record an installed or removed font, broadcasting if a batch is due."""
+        with self._lock:
+            self.pending += 1
+            due = ((self.batch_size and self.pending >= self.batch_size) or
+                   (self.interval is not None and self._clock() - self._last_broadcast >= self.interval))
+            due = due and self._take_pending()
+        if due:
+            self._broadcast()
+
+    def flush(self):
+        """Broadcast now if any change hasn't been announced yet."""
+        with self._lock:
+            due = self._take_pending()
+        if due:
+            self._broadcast()
+
+    def _take_pending(self) -> bool:
+        # Broadcasts happen outside the lock so a hung window doesn't stall other workers
+        if not self.pending:
+            return False
+        self.pending = 0
+        self.broadcasts += 1
+        self._last_broadcast = self._clock()
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
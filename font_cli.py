@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Headless batch mode for FontFlow.
+Installs fonts from ZIP and tar archives, font files and folders without creating a
+window, for deployment scripts. Never imports tkinter or PIL:
+    python font_installer.py install a.zip b.zip --json
+    python font_installer.py install D:\\FontLibrary   (searched recursively)
+    python font_installer.py resume                  (finish a run that was interrupted)
+    python font_installer.py uninstall --run last    (or --family "Noto Sans"; --list shows the runs)
+
+Each command imports the machinery it uses when it runs, so a deployment
+script's call doesn't pay for the engine to resume a run or to print --help.
+"""
+
+import os
+import sys
+import argparse
+import threading
+import contextlib
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from font_engine import InstallResult, InstallSummary
+    from font_journal import InstallJournal, ResumedFont
+    from font_progress import TransferProgress
+    from font_uninstall import UninstallResult
+
+# Exit codes
+EXIT_OK = 0              # Every font was installed or already installed
+EXIT_FAILURES = 1        # Some fonts or archives failed
+EXIT_USAGE = 2           # Bad command line (argparse's own code)
+EXIT_NO_FONTS = 3        # The archives held no fonts
+
+
+def font_report(result: 'InstallResult') -> dict:
+    """Per-font entry of the report."""
+    if result.skipped:
+        status = 'skipped'
+    elif result.success:
+        status = 'installed'
+    else:
+        status = 'failed'
+    return {
+        'file': result.source.filename,
+        'origin': result.source.origin,
+        'status': status,
+        'detail': result.install_type,
+        'path': result.dest_path,
+        'bytes_written': result.bytes_written,
+        'error': result.error,
+        'name_conflict': result.name_conflict
+    }
+
+
+def summary_report(summary: 'InstallSummary') -> dict:
+    return {
+        'total_fonts': summary.total_fonts,
+        'installed': summary.installed_count,
+        'skipped': summary.skipped_count,
+        'failed': len(summary.failed_installs),
+        'registry_failures': [name for name, _ in summary.registry_failures],
+        'name_conflicts': len(summary.name_conflicts),
+        'bytes_written': summary.bytes_written,
+        'bytes_saved': summary.bytes_saved,
+        'cancelled': summary.cancelled
+    }
+
+
+def exit_code_for(summary: 'InstallSummary', archive_failures: int) -> int:
+    if summary.failed_installs or summary.registry_failures or archive_failures:
+        return EXIT_FAILURES
+    if summary.total_fonts == 0:
+        return EXIT_NO_FONTS
+    return EXIT_OK
+
+
+def stage_workers_arg(value: str) -> Tuple[str, int]:
+    """Parse --stage-workers NAME=N."""
+    from font_engine import STAGES
+    name, _, count = value.partition('=')
+    if name not in STAGES or not count.isdigit() or int(count) < 1:
+        raise argparse.ArgumentTypeError(f"expected STAGE=N with STAGE one of {', '.join(STAGES)}, got {value!r}")
+    return name, int(count)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='font_installer.py',
+                                     description='Install fonts from ZIP and tar archives and folders without the GUI.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    install = commands.add_parser('install', help='install the fonts in ZIP or tar archives, font files or folders')
+    install.add_argument('archives', nargs='+', metavar='path',
+                         help='ZIP or tar archive, font file, or folder to search recursively for them')
+    install.add_argument('--json', action='store_true', help='print a JSON report instead of text')
+    install.add_argument('--workers', type=int, default=None,
+                         help='fonts installed in parallel (default: 4)')
+    install.add_argument('--stage-workers', type=stage_workers_arg, action='append', default=[], metavar='STAGE=N',
+                         help="threads for one pipeline stage (extract, validate, name or install); may be repeated")
+    install.add_argument('--verify-checksums', action='store_true',
+                         help='also reject fonts whose table checksums are wrong')
+    install.add_argument('--fonts-dir', help='install into this directory instead of the Windows Fonts '
+                                             'folder (registry entries are kept in memory)')
+    install.add_argument('--state-dir', default=None,
+                         help='where the installed-font index, inventory, scan cache and install journal are kept '
+                              '(default: next to the app)')
+    install.add_argument('--progress', action='store_true',
+                         help='write progress events as JSON lines to stderr')
+    install.add_argument('--progress-interval', type=float, default=0.5, help='seconds between progress events')
+    resume = commands.add_parser('resume', help='finish install runs that were interrupted, from the install journal')
+    resume.add_argument('--json', action='store_true', help='print a JSON report instead of text')
+    resume.add_argument('--fonts-dir', help='the directory the interrupted runs installed into')
+    resume.add_argument('--state-dir', default=None, help='where the install journal is kept (default: next to the app)')
+    uninstall = commands.add_parser('uninstall', help='remove fonts installed by earlier runs, from the install journal')
+    uninstall.add_argument('--run', action='append', default=[], metavar='RUN_ID',
+                           help='remove the fonts this run installed ("last" for the latest); may be repeated')
+    uninstall.add_argument('--family', action='append', default=[], metavar='NAME',
+                           help='remove the installed fonts of this family; may be repeated')
+    uninstall.add_argument('--list', action='store_true', help='list the runs and the fonts they installed instead')
+    uninstall.add_argument('--json', action='store_true', help='print a JSON report instead of text')
+    uninstall.add_argument('--fonts-dir', help='the directory the runs installed into')
+    uninstall.add_argument('--state-dir', default=None,
+                           help='where the install journal is kept (default: next to the app)')
+    uninstall.add_argument('--progress', action='store_true', help='write progress events as JSON lines to stderr')
+    uninstall.add_argument('--progress-interval', type=float, default=0.5, help='seconds between progress events')
+    return parser
+
+
+def progress_event(progress: 'TransferProgress', done: bool = False) -> str:
+    """One JSON line with the run's byte counters, throughput and ETA."""
+    import json
+    return json.dumps({'event': 'progress', 'done': done, **progress.snapshot().as_dict()})
+
+
+@contextlib.contextmanager
+def progress_events(progress: 'TransferProgress', stream, interval: float):
+    """Write a progress event every interval seconds while the block runs, and a final one after it."""
+    stop = threading.Event()
+
+    def emit():
+        while not stop.wait(interval):
+            print(progress_event(progress), file=stream, flush=True)
+
+    thread = threading.Thread(target=emit, name='fontflow-progress', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+        print(progress_event(progress, done=True), file=stream, flush=True)
+
+
+def make_backend(fonts_dir: Optional[str]):
+    from font_backend import DirectoryFontBackend, WindowsFontBackend
+    if fonts_dir is not None:
+        os.makedirs(fonts_dir, exist_ok=True)
+        return DirectoryFontBackend(fonts_dir)
+    return WindowsFontBackend()
+
+
+def state_dir_for(args, err, create: bool = False) -> Optional[str]:
+    """The directory state files are kept in, created if asked to; None once the reason it can't be used is printed."""
+    from font_index import app_dir
+    state_dir = args.state_dir or app_dir()
+    if create:
+        try:
+            os.makedirs(state_dir, exist_ok=True)
+        except OSError as e:
+            print(f"Can't create the state directory {state_dir}: {e}", file=err)
+            return None
+    elif not os.path.isdir(state_dir):
+        print(f"The state directory {state_dir} doesn't exist.", file=err)
+        return None
+    return state_dir
+
+
+def journal_error(journal: 'InstallJournal', args, err) -> Optional[str]:
+    """Why the journal couldn't be written, if it couldn't (printed unless the report is JSON)."""
+    if journal.error is None:
+        return None
+    error = f"install journal {journal.journal_path} not written: {journal.error}"
+    if not args.json:
+        print(f"FAILED  {error}", file=err)
+    return error
+
+
+def run_install(args, out=None, err=None) -> int:
+    import json
+    import tempfile
+    from font_archives import ArchiveEvent, ArchiveScanner, stage_font_sources
+    from font_engine import DEFAULT_WORKERS, InstallEngine
+    from font_folders import FolderFeed
+    from font_index import INDEX_FILENAME, InstalledFontIndex
+    from font_inventory import INVENTORY_FILENAME, FontInventory
+    from font_journal import JOURNAL_FILENAME, InstallJournal
+    from font_preview import expect_totals
+    from font_progress import TransferProgress
+    from font_registry import HKLM
+    from font_scan_cache import CACHE_FILENAME, ScanCache
+    out = out or sys.stdout
+    err = err or sys.stderr
+    if args.fonts_dir is None and sys.platform != 'win32':
+        print("Installing into the Windows Fonts folder requires Windows; use --fonts-dir.", file=err)
+        return EXIT_USAGE
+
+    state_dir = state_dir_for(args, err, create=True)
+    if state_dir is None:
+        return EXIT_USAGE
+    backend = make_backend(args.fonts_dir)
+    fonts = []
+    archives = []
+    archives_by_path = {}
+    progress = TransferProgress()
+
+    def archive_entry(path: str) -> dict:
+        if path not in archives_by_path:
+            archives_by_path[path] = {'path': path, 'fonts': 0, 'bytes': 0, 'error': None, 'skipped_archives': []}
+            archives.append(archives_by_path[path])
+        return archives_by_path[path]
+
+    def on_archive_event(event: ArchiveEvent):
+        if event.kind in (ArchiveEvent.OPENED, ArchiveEvent.FOUND):
+            # Streamed archives (tarballs) count their fonts one FOUND event at a time
+            progress.add_total(event.total_bytes, event.font_count, key=event.path)
+            entry = archive_entry(event.path)
+            entry['fonts'] += event.font_count
+            entry['bytes'] += event.total_bytes
+            entry['skipped_archives'] += [name for name, _ in event.skipped]
+        elif event.kind == ArchiveEvent.DONE:
+            progress.settle(event.path)
+        elif event.kind == ArchiveEvent.FAILED:
+            progress.settle(event.path)
+            archive_entry(event.path)['error'] = str(event.error)
+            if not args.json:
+                print(f"FAILED  {event.path}: {event.error}", file=err)
+
+    def on_result(result: 'InstallResult'):
+        entry = font_report(result)
+        fonts.append(entry)
+        if not args.json:
+            print(f"{entry['status'].upper():<9} {entry['file']}  ({entry['detail']})", file=out)
+
+    font_index = InstalledFontIndex(backend.fonts_dir, os.path.join(state_dir, INDEX_FILENAME)).load()
+    scopes = [(HKLM, backend.fonts_dir)] if args.fonts_dir is not None else None
+    inventory = FontInventory(backend.registry, scopes=scopes,
+                              index_path=os.path.join(state_dir, INVENTORY_FILENAME)).load()
+    scan_cache = ScanCache(os.path.join(state_dir, CACHE_FILENAME))
+    # The selected archives' sizes are known before installing, so the progress total doesn't grow
+    expect_totals(progress, args.archives, cache=scan_cache)
+
+    with contextlib.ExitStack() as stack:
+        # Entered first so it is closed last, after everything that journals, also when the run raises
+        journal = stack.enter_context(InstallJournal(os.path.join(state_dir, JOURNAL_FILENAME)))
+        interrupted = journal.incomplete_runs(backend.fonts_dir)
+        if interrupted and not args.json:
+            print(f"{len(interrupted)} earlier run(s) were interrupted; `font_installer.py resume` finishes them.",
+                  file=err)
+        engine = InstallEngine(backend, workers=args.workers or DEFAULT_WORKERS, font_index=font_index,
+                               inventory=inventory, stage_workers=dict(args.stage_workers),
+                               verify_checksums=args.verify_checksums, journal=journal)
+
+        # Folders are walked on a thread while the archives found so far are installed
+        def on_walk_error(path, error):
+            on_archive_event(ArchiveEvent(ArchiveEvent.FAILED, path, error=error))
+
+        feed = stack.enter_context(FolderFeed(args.archives, on_error=on_walk_error))
+        scanner = stack.enter_context(ArchiveScanner(feed, on_event=on_archive_event,
+                                                     release_after=engine.window, cache=scan_cache))
+        sources = iter(scanner)
+        if backend.requires_staging:
+            temp_dir = stack.enter_context(tempfile.TemporaryDirectory())
+            sources = stage_font_sources(sources, temp_dir, release_after=engine.window)
+        if args.progress:
+            stack.enter_context(progress_events(progress, err, args.progress_interval))
+        summary = engine.run(sources, on_result, progress)
+    inventory.refresh()
+    inventory.save()
+    scan_cache.save()
+
+    archive_failures = sum(1 for archive in archives if archive['error'])
+    exit_code = exit_code_for(summary, archive_failures)
+    unjournaled = journal_error(journal, args, err)
+    if unjournaled:
+        exit_code = EXIT_FAILURES
+    if args.json:
+        json.dump({'fonts': fonts, 'archives': archives, 'summary': summary_report(summary),
+                   'progress': progress.snapshot().as_dict(), 'stages': summary.stage_metrics,
+                   'journal_error': unjournaled, 'exit_code': exit_code}, out, indent=2)
+        out.write('\n')
+    else:
+        print(f"{summary.installed_count}/{summary.total_fonts} fonts installed, "
+              f"{summary.skipped_count} already installed, {len(summary.failed_installs)} failed", file=out)
+    return exit_code
+
+
+def resumed_report(result: 'ResumedFont') -> dict:
+    """Per-font entry of the resume report."""
+    return {'file': result.filename, 'path': result.path, 'run': result.run_id,
+            'steps': result.steps, 'error': result.error}
+
+
+def run_resume(args, out=None, err=None) -> int:
+    import json
+    from font_journal import JOURNAL_FILENAME, InstallJournal, resume_runs
+    out = out or sys.stdout
+    err = err or sys.stderr
+    if args.fonts_dir is None and sys.platform != 'win32':
+        print("Resuming installs into the Windows Fonts folder requires Windows; use --fonts-dir.", file=err)
+        return EXIT_USAGE
+
+    state_dir = state_dir_for(args, err)
+    if state_dir is None:
+        return EXIT_USAGE
+    backend = make_backend(args.fonts_dir)
+    with InstallJournal(os.path.join(state_dir, JOURNAL_FILENAME)) as journal:
+        results = resume_runs(journal, backend)
+    failed = [result for result in results if result.error]
+    unjournaled = journal_error(journal, args, err)
+    exit_code = EXIT_FAILURES if failed or unjournaled else EXIT_OK
+    if args.json:
+        json.dump({'fonts': [resumed_report(result) for result in results], 'journal_error': unjournaled,
+                   'exit_code': exit_code}, out, indent=2)
+        out.write('\n')
+    else:
+        for result in results:
+            if result.error:
+                print(f"FAILED    {result.filename}  ({result.error})", file=out)
+            else:
+                print(f"FINISHED  {result.filename}  ({', '.join(result.steps) or 'nothing left to do'})", file=out)
+        print(f"{len(results) - len(failed)}/{len(results)} interrupted fonts finished", file=out)
+    return exit_code
+
+
+def uninstall_report(result: 'UninstallResult') -> dict:
+    """Per-font entry of the uninstall report."""
+    if result.skipped:
+        status = 'skipped'
+    elif result.success:
+        status = 'removed'
+    else:
+        status = 'failed'
+    return {'file': result.font.filename, 'name': result.font.name, 'run': result.font.run_id,
+            'origin': result.font.origin, 'status': status, 'error': result.error}
+
+
+def run_uninstall(args, out=None, err=None) -> int:
+    import json
+    from font_journal import JOURNAL_FILENAME, InstallJournal
+    from font_progress import TransferProgress
+    from font_uninstall import RollbackEngine, installed_fonts
+    out = out or sys.stdout
+    err = err or sys.stderr
+    if args.fonts_dir is None and sys.platform != 'win32':
+        print("Uninstalling from the Windows Fonts folder requires Windows; use --fonts-dir.", file=err)
+        return EXIT_USAGE
+    if not (args.run or args.family or args.list):
+        print("Choose what to remove with --run or --family, or use --list.", file=err)
+        return EXIT_USAGE
+
+    state_dir = state_dir_for(args, err)
+    if state_dir is None:
+        return EXIT_USAGE
+    backend = make_backend(args.fonts_dir)
+    with InstallJournal(os.path.join(state_dir, JOURNAL_FILENAME)) as journal:
+        runs = [run for run in journal.runs() if run.fonts_dir == backend.fonts_dir]
+        if args.list:
+            listed = [{'run': run.run_id, 'started': run.started, 'ended': run.ended,
+                       'fonts': [font.filename for font in run.fonts.values()]} for run in runs if run.fonts]
+            if args.json:
+                json.dump({'runs': listed}, out, indent=2)
+                out.write('\n')
+            else:
+                for run in listed:
+                    state = '' if run['ended'] else '  (interrupted)'
+                    print(f"{run['run']}  {len(run['fonts'])} fonts{state}", file=out)
+            return EXIT_OK
+
+        run_ids = None
+        if args.run:
+            latest = next((run.run_id for run in reversed(runs) if run.fonts), None)
+            if latest is None and 'last' in args.run:
+                print("No run has fonts left to remove; `uninstall --list` shows the runs.", file=err)
+                return EXIT_USAGE
+            known = {run.run_id for run in runs}
+            unknown = [run_id for run_id in args.run if run_id != 'last' and run_id not in known]
+            if unknown:
+                print(f"Unknown run {', '.join(unknown)}; `uninstall --list` shows the runs.", file=err)
+                return EXIT_USAGE
+            run_ids = [latest if run_id == 'last' else run_id for run_id in args.run]
+        fonts = installed_fonts(journal, backend.fonts_dir, run_ids, args.family or None)
+        progress = TransferProgress()
+        results = []
+
+        def on_result(result: 'UninstallResult'):
+            report = uninstall_report(result)
+            results.append(report)
+            if not args.json:
+                detail = result.font.name if result.success else result.error
+                print(f"{report['status'].upper():<9} {result.font.filename}  ({detail})", file=out)
+
+        with contextlib.ExitStack() as stack:
+            if args.progress:
+                stack.enter_context(progress_events(progress, err, args.progress_interval))
+            summary = RollbackEngine(backend, journal).uninstall(fonts, on_result, progress)
+
+    unjournaled = journal_error(journal, args, err)
+    if summary.failed_removals or unjournaled:
+        exit_code = EXIT_FAILURES
+    elif summary.total_fonts == 0:
+        exit_code = EXIT_NO_FONTS
+    else:
+        exit_code = EXIT_OK
+    if args.json:
+        json.dump({'fonts': results,
+                   'summary': {'total_fonts': summary.total_fonts, 'removed': summary.removed_count,
+                               'skipped': summary.skipped_count,
+                               'failed': len(summary.failed_removals), 'bytes_freed': summary.bytes_freed,
+                               'registry_failures': [name for name, _ in summary.registry_failures]},
+                   'progress': progress.snapshot().as_dict(), 'journal_error': unjournaled,
+                   'exit_code': exit_code}, out, indent=2)
+        out.write('\n')
+    else:
+        print(f"{summary.removed_count}/{summary.total_fonts} fonts removed, {summary.skipped_count} pre-existing "
+              f"left installed, {len(summary.failed_removals)} failed", file=out)
+    return exit_code
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point for `font_installer.py install ...`, `resume` and `uninstall`."""
+    args = build_parser().parse_args(argv)
+    if args.command == 'install':
+        return run_install(args)
+    if args.command == 'resume':
+        return run_resume(args)
+    if args.command == 'uninstall':
+        return run_uninstall(args)
+    return EXIT_USAGE
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+Install engine for FontFlow.
+Fonts go through a pipeline of stages (extract, validate, name, install), each
+on its own threads with a bounded queue in front of it, so reading archives,
+checking fonts, parsing names, file copies and GDI registration all overlap,
+while results are reported in the order fonts were given.
+"""
+
+import io
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from font_archives import FontSource
+from font_backend import FontChangeNotifier
+from font_index import InstalledFontIndex, new_hasher
+from font_inventory import FontInventory
+from font_journal import REGISTERED, InstallJournal
+from font_limits import LimitExceeded
+from font_metadata import get_font_name_from_file, get_font_name_from_stream
+from font_pipeline import Pipeline, Stage
+from font_progress import TransferProgress
+from font_registry import RegistryWriter
+from font_validation import validate_font, validate_font_header
+
+DEFAULT_WORKERS = 4
+
+# Pipeline stages in order. The install stage runs on the engine's `workers` threads
+STAGES = ('extract', 'validate', 'name', 'install')
+DEFAULT_STAGE_WORKERS = {'extract': 2, 'validate': 1, 'name': 1}
+
+# Fonts up to this size are read into memory by the extract stage, so the later
+# stages don't go back to the archive. Larger fonts are streamed from the
+# archive straight into the Fonts directory by the install stage.
+EXTRACT_IN_MEMORY_LIMIT = 8 * 1024 * 1024
+
+
+class InstallResult:
+    """Outcome of installing one font."""
+
+    def __init__(self, source: FontSource, success: bool, install_type: str,
+                 dest_path: Optional[str] = None, bytes_written: int = 0, error: Optional[str] = None,
+                 skipped: bool = False, name_conflict: Optional[str] = None):
+        self.source = source
+        self.success = success
+        self.install_type = install_type  # e.g. "system-wide", or the failure reason
+        self.dest_path = dest_path
+        self.bytes_written = bytes_written
+        self.error = error
+        self.skipped = skipped  # Identical font already installed; nothing was written
+        self.name_conflict = name_conflict  # File already registered under the same font name
+
+    def __repr__(self):
+        return f"InstallResult({self.source.filename!r}, success={self.success}, install_type={self.install_type!r})"
+
+
+class InstallSummary:
+    """Totals for an install run. Only updated from the thread that called run()."""
+
+    def __init__(self):
+        self.total_fonts = 0
+        self.installed_count = 0
+        self.system_installs = 0
+        self.user_installs = 0
+        self.failed_installs: List[Tuple[str, str]] = []
+        self.registry_failures: List[Tuple[str, Exception]] = []
+        self.bytes_written = 0
+        self.skipped_count = 0
+        self.bytes_saved = 0
+        self.name_conflicts: List[Tuple[str, str]] = []  # (file installed, file it replaced in the registry)
+        self.cancelled = False
+        self.stage_metrics: Dict[str, dict] = {}  # Per pipeline stage, see StageMetrics.as_dict()
+
+    def add(self, result: InstallResult):
+        self.total_fonts += 1
+        if result.skipped:
+            self.skipped_count += 1
+            self.bytes_saved += result.source.size
+        elif result.success:
+            self.installed_count += 1
+            self.bytes_written += result.bytes_written
+            if result.install_type == "system-wide":
+                self.system_installs += 1
+            elif "user-level" in result.install_type:  # Handles all user-level variants
+                self.user_installs += 1
+        else:
+            self.failed_installs.append((result.source.filename, result.install_type))
+        if result.name_conflict is not None:
+            self.name_conflicts.append((result.source.filename, result.name_conflict))
+
+
+class FontJob:
+    """A font on its way through the install pipeline."""
+
+    def __init__(self, source: FontSource):
+        self.source = source
+        self.data: Optional[bytes] = None    # The font's bytes, if small enough to hold in memory
+        self.extracted = 0                   # Bytes read out of the archive so far
+        self.font_name: Optional[str] = None  # Registry name, if read before installing
+        self.result: Optional[InstallResult] = None  # Set by the stage that finished the font
+        self.cancelled = False
+
+    @property
+    def finished(self) -> bool:
+        return self.result is not None or self.cancelled
+
+    def memory_source(self) -> Optional[FontSource]:
+        """A source reading the extracted bytes, or None if the font is streamed."""
+        if self.data is None:
+            return None
+        data = self.data
+        return FontSource(self.source.filename, len(data), self.source.origin, lambda: io.BytesIO(data),
+                          self.source.metadata)
+
+
+class InstallEngine:
+    """Installs fonts through a backend on a pipeline of worker threads."""
+
+    # WM_FONTCHANGE is broadcast every NOTIFY_BATCH_SIZE fonts or NOTIFY_INTERVAL
+    # seconds during a run, and once when it finishes
+    NOTIFY_BATCH_SIZE = 250
+    NOTIFY_INTERVAL = 5.0
+
+    def __init__(self, backend, workers: int = DEFAULT_WORKERS,
+                 name_resolver: Optional[Callable[[str], str]] = None,
+                 font_index: Optional[InstalledFontIndex] = None,
+                 inventory: Optional[FontInventory] = None,
+                 stage_workers: Optional[Dict[str, int]] = None,
+                 verify_checksums: bool = False,
+                 journal: Optional[InstallJournal] = None):
+        self.backend = backend
+        # Threads per pipeline stage; `workers` is the install stage's
+        self.stage_workers = dict(DEFAULT_STAGE_WORKERS, install=workers)
+        for stage, count in (stage_workers or {}).items():
+            if stage not in STAGES:
+                raise ValueError(f"unknown pipeline stage {stage!r} (expected one of {', '.join(STAGES)})")
+            self.stage_workers[stage] = count
+        self.stage_workers = {stage: max(1, self.stage_workers[stage]) for stage in STAGES}
+        self.workers = self.stage_workers['install']
+        # None reads names from the font data before installing; a callable is
+        # given the installed file's path instead
+        self.name_resolver = name_resolver
+        # When set, fonts identical to an installed and registered one (or one
+        # installed earlier in the run) are skipped
+        self.font_index = font_index
+        # When set, registry names already used by a different file are reported
+        self.inventory = inventory
+        # Also verify the table checksums of fonts read into memory
+        self.verify_checksums = verify_checksums
+        # When set, every run and each font's completed steps are journaled, so an
+        # interrupted run can be finished with font_journal.resume_runs()
+        self.journal = journal
+        self._cancel_event = threading.Event()
+        self._dest_locks = {}
+        self._dest_locks_guard = threading.Lock()
+        self._journaled: Dict[str, bool] = {}  # Lower-case file name -> registered by the last run that copied it
+        self.stage_metrics: Dict[str, dict] = {}  # Of the last run
+
+    def cancel(self):
+        """Stop starting new fonts. Fonts already being installed are finished."""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def window(self) -> int:
+        """Most sources run() holds at once. When it asks for the next source,
+        only the last `window` sources it was given may still be in progress."""
+        return 2 * sum(self.stage_workers.values())
+
+    def _journaled_fonts(self) -> Dict[str, bool]:
+        journaled = {}
+        for run in self.journal.runs():
+            if run.fonts_dir == self.backend.fonts_dir:
+                for key, font in run.fonts.items():
+                    journaled[key] = REGISTERED in font.phases
+        return journaled
+
+    def _registered(self, filename: str) -> bool:
+        # An identical file only makes a font a duplicate if it is registered: a run
+        # that died between copying and registering must not make later runs skip it
+        if self._journaled.get(filename.lower()):
+            return True
+        if self.inventory is not None:
+            return self.inventory.is_installed(filename)
+        return filename.lower() not in self._journaled
+
+    def _dest_lock(self, filename: str) -> threading.Lock:
+        # Two archives may ship the same file name; installs of it must not interleave.
+        # The Fonts directory is case-insensitive on Windows.
+        with self._dest_locks_guard:
+            return self._dest_locks.setdefault(filename.lower(), threading.Lock())
+
+    def install(self, source: FontSource, notifier: Optional[FontChangeNotifier] = None,
+                registry_writer: Optional[RegistryWriter] = None,
+                progress: Optional[TransferProgress] = None) -> InstallResult:
+        """Install a single font using Windows API with proper registry registration.
+
+        Runs the pipeline's stages one after the other on the calling thread.
+        Fonts over EXTRACT_IN_MEMORY_LIMIT are streamed straight into the Fonts
+        directory, so they are written to disk exactly once. During a run the
+        WM_FONTCHANGE broadcast and the registry write are handed to the run's
+        notifier and registry writer, and bytes read are counted in progress.
+        """
+        job = FontJob(source)
+        for stage in self._stages(notifier, registry_writer, progress):
+            job = stage.func(job)
+        return job.result
+
+    def _extract(self, job: FontJob, progress: Optional[TransferProgress]) -> FontJob:
+        if job.finished:
+            return job
+        # A font whose content hash a scan cache remembers is checked for duplicates
+        # before it is read, so reinstalling an unchanged archive decompresses nothing
+        metadata = job.source.metadata
+        if self.font_index is not None and metadata is not None and metadata.digest is not None:
+            duplicate_of = self.font_index.find_duplicate(job.source)
+            if duplicate_of is not None:
+                job.result = InstallResult(job.source, True, f"already installed as {duplicate_of}", skipped=True)
+                return job
+        if job.source.size > EXTRACT_IN_MEMORY_LIMIT:
+            return job
+        try:
+            with job.source.counted(lambda size: self._count_read(job, size, progress)).open() as f:
+                job.data = f.read()
+        except LimitExceeded as e:
+            print(f"Stopped reading {job.source.filename}: {str(e)}")
+            job.result = InstallResult(job.source, False, "archive limit exceeded", error=str(e))
+        except Exception as e:
+            print(f"Could not read {job.source.filename}: {str(e)}")
+            job.result = InstallResult(job.source, False, "could not be read", error=str(e))
+        return job
+
+    @staticmethod
+    def _count_read(job: FontJob, size: int, progress: Optional[TransferProgress]):
+        job.extracted += size
+        if progress is not None:
+            progress.extracted(size)
+
+    def _validate(self, job: FontJob) -> FontJob:
+        if job.finished:
+            return job
+        size = len(job.data) if job.data is not None else job.source.size
+        if size == 0:
+            job.result = InstallResult(job.source, False, "not a font (empty file)", error="empty file")
+        elif size != job.source.size:
+            job.result = InstallResult(job.source, False, "truncated font",
+                                       error=f"read {size} of {job.source.size} bytes")
+        else:
+            # Broken fonts are turned away here, before anything is copied or registered.
+            # Streamed fonts only have their table directory checked, so they are read once.
+            try:
+                if job.data is not None:
+                    validate_font(job.data, self.verify_checksums)
+                else:
+                    with job.source.open() as f:
+                        validate_font_header(f, job.source.size)
+            except Exception as e:
+                job.result = InstallResult(job.source, False, "not a valid font", error=str(e))
+        return job
+
+    def _read_name(self, job: FontJob) -> FontJob:
+        # Fonts that are streamed, or a custom name_resolver, are named after installing
+        if job.finished or self.name_resolver is not None:
+            return job
+        if job.source.metadata is not None and job.source.metadata.font_name is not None:
+            job.font_name = job.source.metadata.font_name
+            return job
+        if job.data is None:
+            return job
+        job.font_name = get_font_name_from_stream(io.BytesIO(job.data), job.source.filename)
+        return job
+
+    def _install_job(self, job: FontJob, notifier: Optional[FontChangeNotifier],
+                     registry_writer: Optional[RegistryWriter], progress: Optional[TransferProgress]) -> FontJob:
+        if job.cancelled:
+            return job
+        try:
+            if job.result is None:
+                memory_source = job.memory_source()
+                if memory_source is not None:
+                    job.result = self._install(job.source, memory_source, memory_source, job.font_name,
+                                               notifier, registry_writer)
+                else:
+                    write_source = job.source.counted(lambda size: self._count_read(job, size, progress))
+                    job.result = self._install(job.source, job.source, write_source, job.font_name,
+                                               notifier, registry_writer)
+        finally:
+            if progress is not None:
+                progress.font_done(job.source.size, job.extracted)
+            job.data = None  # The bytes aren't needed once the font is installed
+        return job
+
+    def _stages(self, notifier: Optional[FontChangeNotifier], registry_writer: Optional[RegistryWriter],
+                progress: Optional[TransferProgress]) -> List[Stage]:
+        if self.journal is not None and registry_writer is not None:
+            # Registry values are journaled once their batch is actually written
+            registry_writer.on_written = self.journal.registered
+        funcs = {
+            'extract': lambda job: self._extract(job, progress),
+            'validate': self._validate,
+            'name': self._read_name,
+            'install': lambda job: self._install_job(job, notifier, registry_writer, progress),
+        }
+        return [Stage(name, funcs[name], self.stage_workers[name]) for name in STAGES]
+
+    def _install(self, source: FontSource, read_source: FontSource, write_source: FontSource,
+                 font_name: Optional[str], notifier: Optional[FontChangeNotifier],
+                 registry_writer: Optional[RegistryWriter]) -> InstallResult:
+        # read_source is hashed to find duplicates, write_source is copied into the Fonts directory
+        font_filename = source.filename
+
+        # Try system-wide installation first (requires admin)
+        try:
+            with self._dest_lock(font_filename):
+                hasher = None
+                if self.font_index is not None:
+                    duplicate_of = self.font_index.find_duplicate(read_source, self._registered)
+                    if duplicate_of is not None:
+                        return InstallResult(source, True, f"already installed as {duplicate_of}", skipped=True)
+                    hasher = new_hasher()
+
+                # A font that was there before is journaled as such, so uninstalling leaves it alone
+                existed = self.journal is not None and os.path.exists(self.backend.destination_for(font_filename))
+                system_dest_path, written = self.backend.write_font(write_source, hasher)
+                if self.journal is not None:
+                    self.journal.copied(font_filename, written, hasher.hexdigest() if hasher is not None else None,
+                                        source.origin, existed)
+                # Add font resource
+                if self.backend.add_font_resource(system_dest_path):
+                    if self.journal is not None:
+                        self.journal.resource_added(font_filename)
+                    name_conflict = None
+                    # Register in system registry for persistence across reboots
+                    try:
+                        # Create registry entry with font name and file
+                        font_reg_name = font_name or (self.name_resolver or get_font_name_from_file)(system_dest_path)
+                        if source.metadata is not None and self.name_resolver is None:
+                            source.metadata.font_name = font_reg_name
+                        if self.inventory is not None:
+                            name_conflict = self.inventory.conflicting_name(
+                                font_reg_name, font_filename, self.backend.registry_hive)
+                            # Whatever the value held before is put back if the font is uninstalled
+                            previous = self.inventory.registered_value(font_reg_name, self.backend.registry_hive)
+                            if previous is not None and self.journal is not None:
+                                self.journal.replaced(font_filename, font_reg_name, previous)
+                        if registry_writer is not None:
+                            registry_writer.queue(font_reg_name, font_filename)
+                        else:
+                            self.backend.register_font(font_reg_name, font_filename)
+                            if self.journal is not None:
+                                self.journal.registered(font_reg_name, font_filename)
+                    except Exception as reg_error:
+                        print(f"Registry registration failed for {font_filename}: {str(reg_error)}")
+                        # Continue anyway - font is still loaded temporarily
+
+                    if hasher is not None:
+                        self.font_index.record_install(system_dest_path, hasher.hexdigest())
+                        if source.metadata is not None:
+                            source.metadata.digest = hasher.hexdigest()
+
+                    # Notify all windows that fonts have changed
+                    if notifier is not None:
+                        notifier.font_changed()
+                    else:
+                        self.backend.notify_font_change()
+                    return InstallResult(source, True, self.backend.install_type, system_dest_path, written,
+                                         name_conflict=name_conflict)
+                else:
+                    # If AddFontResource failed, remove the copied file
+                    try:
+                        os.remove(system_dest_path)
+                    except OSError:
+                        pass
+                    if self.journal is not None:
+                        self.journal.removed(font_filename)
+                    return InstallResult(source, False, "font rejected by Windows",
+                                         error="AddFontResourceW failed")
+
+        except PermissionError as e:
+            print(f"System installation failed for {font_filename}: Administrator privileges are required.")
+            return InstallResult(source, False, "administrator privileges required", error=str(e))
+        except LimitExceeded as e:
+            # Streamed fonts are checked while they are copied; the partial copy is removed
+            print(f"Stopped installing {font_filename}: {str(e)}")
+            return InstallResult(source, False, "archive limit exceeded", error=str(e))
+        except Exception as e:
+            print(f"System installation failed for {font_filename}: {str(e)}")
+            return InstallResult(source, False, "unknown error", error=str(e))
+
+    def run(self, sources: Iterable[FontSource],
+            on_result: Optional[Callable[[InstallResult], None]] = None,
+            progress: Optional[TransferProgress] = None) -> InstallSummary:
+        """Install every source and return the run's totals.
+
+        sources may be a lazy iterable; at most `window` fonts are in the
+        pipeline at once. on_result is called on this thread for every font, in
+        the order the sources were given, whichever stage finished it. Bytes are
+        counted in progress as they are read. Per-stage queue depths and
+        latencies end up in summary.stage_metrics.
+        """
+        summary = InstallSummary()
+
+        def jobs():
+            for source in sources:
+                if self._cancel_event.is_set():
+                    return
+                yield FontJob(source)
+
+        if self.journal is not None:
+            if self.font_index is not None:
+                self._journaled = self._journaled_fonts()
+            self.journal.begin(self.backend.fonts_dir, self.backend.registry_hive)
+        with FontChangeNotifier(self.backend.notify_font_change,
+                                batch_size=self.NOTIFY_BATCH_SIZE,
+                                interval=self.NOTIFY_INTERVAL) as notifier, \
+                self.backend.open_registry_writer() as registry_writer:
+
+            stages = self._stages(notifier, registry_writer, progress)
+            extract = stages[0].func
+
+            def extract_unless_cancelled(job):
+                # Fonts not started before cancel() are dropped
+                if self._cancel_event.is_set():
+                    job.cancelled = True
+                return extract(job)
+
+            stages[0].func = extract_unless_cancelled
+            pipeline = Pipeline(stages, window=self.window)
+            try:
+                for job in pipeline.run(jobs()):
+                    if job.cancelled:
+                        continue
+                    summary.add(job.result)
+                    if on_result is not None:
+                        on_result(job.result)
+            finally:
+                self.stage_metrics = summary.stage_metrics = pipeline.report()
+
+        # Leaving the with block flushed the registry writer
+        summary.registry_failures = registry_writer.failures
+        if self.journal is not None:
+            # A run that raised isn't ended, so it can be resumed
+            self.journal.end()
+        if self.font_index is not None:
+            self.font_index.save()
+        summary.cancelled = self._cancel_event.is_set()
+        return summary
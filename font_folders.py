@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Folder ingestion for FontFlow.
+A selected folder is walked with os.scandir, one directory at a time, and the
+archives and font files found are handed over as they are found. FolderFeed
+runs the walk on a background thread into a bounded queue, so installation
+starts with the first archive found and memory stays flat however many
+entries the tree has.
+"""
+
+import os
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from font_archives import ARCHIVE_EXTENSIONS, FONT_EXTENSIONS, SuffixFilter
+
+# How far the walk may run ahead of the installer, in paths
+DEFAULT_FEED_QUEUE_SIZE = 256
+
+# Paths are handed over in batches of up to this many, so the queue's lock is
+# taken once per batch rather than once per file
+FEED_BATCH_SIZE = 64
+
+_DONE = object()
+
+
+def walk_fonts(paths: Iterable[str], extensions=FONT_EXTENSIONS, archive_extensions=ARCHIVE_EXTENSIONS,
+               on_error: Optional[Callable[[str, OSError], None]] = None) -> Iterator[str]:
+    """Yield the archives and font files in paths, searching folders recursively.
+
+    Paths that aren't folders are yielded as given. Folders are walked depth
+    first with os.scandir and files are yielded while their folder is being
+    listed. Symlinked folders aren't followed, so links can't make the walk
+    loop. Folders that can't be listed are passed to on_error and skipped.
+    """
+    wanted = SuffixFilter(frozenset(extensions) | frozenset(archive_extensions))  # Also '.tar.gz' and the like
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        pending = [path]  # Folders still to list; the only state that grows with the tree
+        while pending:
+            directory = pending.pop()
+            subdirectories = []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirectories.append(entry.path)
+                                continue
+                            if not entry.is_file():
+                                continue
+                        except OSError:
+                            continue  # Vanished or unreadable entry
+                        if wanted.match(entry.name) is not None:
+                            yield entry.path
+            except OSError as e:
+                if on_error is not None:
+                    on_error(directory, e)
+            # Reversed so subfolders are visited in listing order
+            pending.extend(reversed(subdirectories))
+
+
+class FolderFeed:
+    """Walks paths on a background thread and yields what it finds through a bounded queue.
+
+    The walk blocks once queue_size paths are waiting, so it never runs more
+    than that far ahead of the consumer. Paths are queued in batches, but a
+    batch is handed over early whenever the consumer is waiting for one.
+    on_error(path, error) is called on the iterating thread for folders that
+    couldn't be listed. Stopping the iteration early (or close()) stops the walk.
+    """
+
+    def __init__(self, paths: Iterable[str], extensions=FONT_EXTENSIONS,
+                 queue_size: int = DEFAULT_FEED_QUEUE_SIZE,
+                 on_error: Optional[Callable[[str, OSError], None]] = None):
+        self.paths = paths
+        self.extensions = extensions
+        self.on_error = on_error
+        self.found = 0  # Paths yielded so far
+        self.errors: List[Tuple[str, OSError]] = []
+        self.batch_size = max(1, min(FEED_BATCH_SIZE, queue_size // 4))
+        self._queue = queue.Queue(maxsize=max(1, queue_size // self.batch_size))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _put(self, item) -> bool:
+        # Block while the queue is full, but give up once the consumer has stopped
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _walk(self):
+        batch = []
+        try:
+            for path in walk_fonts(self.paths, self.extensions,
+                                   on_error=lambda directory, e: batch.append((directory, e))):
+                batch.append((path, None))
+                if len(batch) >= self.batch_size or self._queue.empty():
+                    if not self._put(batch):
+                        return
+                    batch = []
+        except Exception as e:
+            batch.append((None, e))
+        if batch and not self._put(batch):
+            return
+        self._put(_DONE)
+
+    def __iter__(self) -> Iterator[str]:
+        self._thread = threading.Thread(target=self._walk, name='fontflow-walk', daemon=True)
+        self._thread.start()
+        try:
+            while True:
+                batch = self._queue.get()
+                if batch is _DONE:
+                    return
+                for path, error in batch:
+                    if error is None:
+                        self.found += 1
+                        yield path
+                    elif path is None:
+                        raise error  # The walk itself failed
+                    else:
+                        self.errors.append((path, error))
+                        if self.on_error is not None:
+                            self.on_error(path, error)
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop the walk and wait for its thread to finish."""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
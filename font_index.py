@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Installed-font index for FontFlow.
+Remembers the size and content hash of every font in the Fonts directory so
+an install run can skip fonts that are already installed byte for byte.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import threading
+from typing import BinaryIO, Callable, Dict, List, Optional
+
+from font_archives import FONT_EXTENSIONS, FontSource
+
+INDEX_FILENAME = 'fontflow_index.json'
+INDEX_VERSION = 1
+
+HASH_BUFFER_SIZE = 1024 * 1024
+
+
+def app_dir() -> str:
+    """Directory of the running app (the .exe when frozen by PyInstaller)."""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def new_hasher():
+    """Hash used to compare font contents; BLAKE2b is faster than SHA-256 on 64-bit CPUs."""
+    return hashlib.blake2b(digest_size=20)
+
+
+def hash_stream(f: BinaryIO) -> str:
+    hasher = new_hasher()
+    while True:
+        chunk = f.read(HASH_BUFFER_SIZE)
+        if not chunk:
+            return hasher.hexdigest()
+        hasher.update(chunk)
+
+
+class InstalledFontIndex:
+    """Content index of a fonts directory, persisted as JSON next to the app.
+
+    Entries are keyed by file name and hold (size, mtime_ns, digest). Digests
+    are computed lazily, only for installed files whose size matches a font
+    being installed, so building the index never reads the whole directory.
+    The directory listing is only re-read when the directory's mtime changes,
+    and then only new or changed files lose their cached digest.
+
+    find_duplicate() also remembers fonts installed earlier in the same run,
+    so the same font shipped in two archives is only installed once.
+    """
+
+    def __init__(self, fonts_dir: str, index_path: Optional[str] = None):
+        self.fonts_dir = fonts_dir
+        self.index_path = index_path or os.path.join(app_dir(), INDEX_FILENAME)
+        self._files: Dict[str, list] = {}  # lower-case name -> [name, size, mtime_ns, digest]
+        self._by_size: Dict[int, List[str]] = {}
+        self._dir_mtime_ns = None
+        self._run_digests: Dict[str, str] = {}  # digest -> file name, for this run
+        self._lock = threading.Lock()
+        self.dirty = False
+
+    def load(self):
+        """Load the saved index (if any) and bring it up to date with the directory."""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION and data.get('fonts_dir') == self.fonts_dir:
+                self._dir_mtime_ns = data.get('dir_mtime_ns')
+                for name, size, mtime_ns, digest in data.get('files', []):
+                    self._files[name.lower()] = [name, size, mtime_ns, digest]
+        except (OSError, ValueError, TypeError):
+            pass  # Missing or unreadable index: rebuild from the directory
+        self.refresh()
+        return self
+
+    def refresh(self):
+        """Re-list the directory if its mtime changed, keeping digests of unchanged files."""
+        try:
+            dir_mtime_ns = os.stat(self.fonts_dir).st_mtime_ns
+        except OSError:
+            return
+        if dir_mtime_ns != self._dir_mtime_ns:
+            files = {}
+            with os.scandir(self.fonts_dir) as entries:
+                for entry in entries:
+                    if os.path.splitext(entry.name)[1].lower() not in FONT_EXTENSIONS:
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    old = self._files.get(entry.name.lower())
+                    digest = old[3] if old and old[1] == stat.st_size and old[2] == stat.st_mtime_ns else None
+                    files[entry.name.lower()] = [entry.name, stat.st_size, stat.st_mtime_ns, digest]
+            self._files = files
+            self._dir_mtime_ns = dir_mtime_ns
+            self.dirty = True
+        self._by_size = {}
+        for key, (_, size, _, _) in self._files.items():
+            self._by_size.setdefault(size, []).append(key)
+
+    def save(self):
+        """Write the index next to the app. Failures (e.g. read-only folder) are ignored."""
+        if not self.dirty:
+            return
+        data = {
+            'version': INDEX_VERSION,
+            'fonts_dir': self.fonts_dir,
+            'dir_mtime_ns': self._dir_mtime_ns,
+            'files': list(self._files.values())
+        }
+        temp_path = self.index_path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(temp_path, self.index_path)
+            self.dirty = False
+        except OSError:
+            pass
+
+    def __len__(self):
+        return len(self._files)
+
+    def _installed_digest(self, key: str) -> Optional[str]:
+        entry = self._files[key]
+        if entry[3] is None:
+            try:
+                with open(os.path.join(self.fonts_dir, entry[0]), 'rb') as f:
+                    entry[3] = hash_stream(f)
+                self.dirty = True
+            except OSError:
+                return None
+        return entry[3]
+
+    def find_duplicate(self, source: FontSource,
+                       registered: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """Return the name of an installed (or already installed this run) font with
+        exactly the same content as source, or None. Only hashes on a size match,
+        and not at all if source.metadata already holds the digest (which is
+        filled in otherwise). With registered, a file in the directory only
+        counts if registered(name) is true, so a copy that was never
+        registered is installed again."""
+        with self._lock:
+            candidates = list(self._by_size.get(source.size, ()))
+            if not candidates:
+                return None
+        metadata = source.metadata
+        digest = metadata.digest if metadata is not None else None
+        if digest is None:
+            with source.open() as f:
+                digest = hash_stream(f)
+            if metadata is not None:
+                metadata.digest = digest
+        with self._lock:
+            if digest in self._run_digests:
+                return self._run_digests[digest]
+            for key in candidates:
+                if key in self._files and self._installed_digest(key) == digest:
+                    if registered is None or registered(self._files[key][0]):
+                        return self._files[key][0]
+        return None
+
+    def record_install(self, dest_path: str, digest: str):
+        """Add a font written during this run."""
+        try:
+            stat = os.stat(dest_path)
+        except OSError:
+            return
+        name = os.path.basename(dest_path)
+        with self._lock:
+            key = name.lower()
+            old = self._files.get(key)
+            if old is not None and key in self._by_size.get(old[1], ()):
+                self._by_size[old[1]].remove(key)
+            self._files[key] = [name, stat.st_size, stat.st_mtime_ns, digest]
+            self._by_size.setdefault(stat.st_size, []).append(key)
+            self._run_digests[digest] = name
+            self.dirty = True
@@ -1,41 +1,94 @@
 #!/usr/bin/env python3
 """
 FontFlow - A modern GUI application to install TTF and OTF fonts from ZIP files.
+Run `font_installer.py install a.zip b.zip [--json]` to install without the GUI,
+`font_installer.py resume` to finish an install run that was interrupted, and
+`font_installer.py uninstall --run last` to roll back what a run installed.
+
+Only what the first frame needs is imported here. PIL, zipfile, the registry
+and the installation machinery are imported on first use, so they are not
+paid for before the window paints.
 """
 
 import os
 import sys
-import shutil
-import zipfile
-import tempfile
+import time
+
+_MODULE_START = time.perf_counter()
+
+if __name__ == "__main__" and sys.argv[1:2] in (['install'], ['resume'], ['uninstall']):
+    # Headless batch mode: dispatch before tkinter and PIL are imported
+    from font_cli import main as cli_main
+    sys.exit(cli_main(sys.argv[1:]))
+
+import threading
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-from pathlib import Path
+from tkinter import ttk
 import ctypes
-from ctypes import wintypes
-import threading
-from typing import List, Set
-import winreg
-try:
-    from PIL import Image, ImageTk
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
+from font_assets import load_icon
+from font_progress import TransferProgress, UiUpdateChannel, UiUpdatePump
+from font_selection import ArchiveSelection
+from font_widgets import VirtualListbox
+from font_startup import FIRST_PAINT, IMPORTS_DONE, INTERACTIVE, TIMING_ENV_VAR, TK_ROOT, StartupTimer
+
+STARTUP_TIMER = StartupTimer(start=_MODULE_START)
+STARTUP_TIMER.mark(IMPORTS_DONE)
 
 # Windows API constants
-HWND_BROADCAST = 0xFFFF
-WM_FONTCHANGE = 0x001D
-SMTO_ABORTIFHUNG = 0x0002
 DWMWA_USE_IMMERSIVE_DARK_MODE_BEFORE_20H1 = 19
 DWMWA_USE_IMMERSIVE_DARK_MODE = 20
 
 class FontInstaller:
-    def __init__(self):
+    # Fonts installed in parallel; copies and GDI registration are I/O-bound
+    # (None uses font_engine.DEFAULT_WORKERS)
+    INSTALL_WORKERS = None
+    # Resolution of the determinate progress bar
+    PROGRESS_STEPS = 1000
+
+    def __init__(self, startup_timer: StartupTimer = STARTUP_TIMER):
+        self.startup_timer = startup_timer
         self.root = tk.Tk()
+        self.startup_timer.mark(TK_ROOT)
         self.setup_window()
         self.setup_modern_style()  # Setup styles before GUI
         self.setup_gui()
-        self.font_extensions = {'.ttf', '.otf', '.ttc', '.otc'}
+        self.font_extensions = None  # None installs every extension in font_archives.FONT_EXTENSIONS
+        self._backend = None
+        self._scan_cache = None
+        self.install_engine = None
+        # Worker threads post UI updates here; a timer applies them (see install_fonts)
+        self.ui_updates = UiUpdateChannel()
+        self.ui_pump = None
+        self.transfer_progress = TransferProgress()
+        self.root.bind('<Expose>', self._on_first_paint, add='+')
+
+    @property
+    def backend(self):
+        """Windows font backend, created on first use so the registry and GDI bindings load after startup."""
+        if self._backend is None:
+            from font_backend import WindowsFontBackend
+            self._backend = WindowsFontBackend()
+        return self._backend
+
+    @property
+    def scan_cache(self):
+        """What earlier scans found in each archive, loaded on first use."""
+        if self._scan_cache is None:
+            from font_scan_cache import ScanCache
+            self._scan_cache = ScanCache()
+        return self._scan_cache
+
+    def _on_first_paint(self, event):
+        if event.widget is not self.root or FIRST_PAINT in self.startup_timer.marks:
+            return
+        self.startup_timer.mark(FIRST_PAINT)
+        self.root.after_idle(self._on_interactive)
+
+    def _on_interactive(self):
+        self.startup_timer.mark(INTERACTIVE)
+        destination = os.environ.get(TIMING_ENV_VAR)
+        if destination:
+            self.startup_timer.dump(destination)
         
     def setup_window(self):
         """Configure the main window with modern styling."""
@@ -131,13 +184,8 @@ class FontInstaller:
         if self.use_custom_titlebar and titlebar is not None:
             # Title/icon on left
             try:
-                if PIL_AVAILABLE and os.path.exists('icon.png'):
-                    img = Image.open('icon.png')
-                    img = img.resize((16, 16), Image.Resampling.LANCZOS)
-                    self._title_icon = ImageTk.PhotoImage(img)
-                    icon_lbl = tk.Label(titlebar, image=self._title_icon, bg=self.colors['surface'])
-                elif os.path.exists('icon.png'):
-                    self._title_icon = tk.PhotoImage(file='icon.png')
+                self._title_icon = load_icon(self.root, ['icon.png'], 16)
+                if self._title_icon is not None:
                     icon_lbl = tk.Label(titlebar, image=self._title_icon, bg=self.colors['surface'])
                 else:
                     icon_lbl = tk.Label(titlebar, text='🎨', bg=self.colors['surface'], fg=self.colors['text'])
@@ -174,7 +222,7 @@ class FontInstaller:
                 return b
 
             # Close
-            _make_btn('✕', lambda: self.root.destroy(), font_size=12, width=4)
+            _make_btn('✕', self.close, font_size=12, width=4)
             # Maximize/Restore
             self._is_maximized = False
             self._prev_geometry = None
@@ -290,34 +338,11 @@ class FontInstaller:
         title_frame = ttk.Frame(header_frame)
         title_frame.grid(row=0, column=0, pady=(0, 5))
         
-        # Load and display icon
+        # Load and display icon (scaled once, then loaded from the icon cache)
         icon_loaded = False
         try:
-            if PIL_AVAILABLE:
-                # Try to load .ico file first
-                if os.path.exists("icon.ico"):
-                    img = Image.open("icon.ico")
-                    img = img.resize((32, 32), Image.Resampling.LANCZOS)
-                    icon_img = ImageTk.PhotoImage(img)
-                    icon_label = ttk.Label(title_frame, image=icon_img)
-                    icon_label.image = icon_img  # Keep a reference
-                    icon_label.grid(row=0, column=0, padx=(0, 10))
-                    icon_loaded = True
-                elif os.path.exists("icon.png"):
-                    img = Image.open("icon.png")
-                    img = img.resize((32, 32), Image.Resampling.LANCZOS)
-                    icon_img = ImageTk.PhotoImage(img)
-                    icon_label = ttk.Label(title_frame, image=icon_img)
-                    icon_label.image = icon_img  # Keep a reference
-                    icon_label.grid(row=0, column=0, padx=(0, 10))
-                    icon_loaded = True
-            elif os.path.exists("icon.png"):
-                # Fallback to tk.PhotoImage for PNG if PIL not available
-                icon_img = tk.PhotoImage(file="icon.png")
-                # Resize icon to fit nicely in the title (32x32 pixels)
-                subsample_x = max(1, icon_img.width() // 32)
-                subsample_y = max(1, icon_img.height() // 32)
-                icon_img = icon_img.subsample(subsample_x, subsample_y)
+            icon_img = load_icon(self.root, ["icon.ico", "icon.png"], 32)
+            if icon_img is not None:
                 icon_label = ttk.Label(title_frame, image=icon_img)
                 icon_label.image = icon_img  # Keep a reference
                 icon_label.grid(row=0, column=0, padx=(0, 10))
@@ -338,7 +363,7 @@ class FontInstaller:
         title_label.grid(row=0, column=1)
         
         # Modern description with permission info
-        desc_text = "Install TTF and OTF fonts from ZIP archives with one click\n"
+        desc_text = "Install TTF and OTF fonts from ZIP and tar archives with one click\n"
 
         # Ensure the application is running with administrator privileges
         try:
@@ -371,6 +396,7 @@ class FontInstaller:
         select_button_frame = ttk.Frame(file_card)
         select_button_frame.grid(row=0, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
         select_button_frame.columnconfigure(0, weight=1)
+        select_button_frame.columnconfigure(1, weight=1)
         
         self.select_btn = ttk.Button(
             select_button_frame,
@@ -380,6 +406,15 @@ class FontInstaller:
         )
         self.select_btn.grid(row=0, column=0, sticky=(tk.W, tk.E))
         
+        # A whole font library: its subfolders are searched while installing
+        self.folder_btn = ttk.Button(
+            select_button_frame,
+            text="Select Folder",
+            command=self.select_folder,
+            style='Primary.TButton'
+        )
+        self.folder_btn.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=(10, 0))
+        
         # Modern file list
         listbox_frame = ttk.Frame(file_card)
         listbox_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
@@ -403,9 +438,13 @@ class FontInstaller:
         self.files_listbox.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(0, 10))
         
         # Modern scrollbar
-        scrollbar = ttk.Scrollbar(listbox_frame, orient=tk.VERTICAL, command=self.files_listbox.yview)
+        scrollbar = ttk.Scrollbar(listbox_frame, orient=tk.VERTICAL)
         scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
-        self.files_listbox.configure(yscrollcommand=scrollbar.set)
+        
+        # Only the rows in view are put in the listbox, so thousands of archives stay responsive
+        self.selection = ArchiveSelection()
+        self.preview_scans = []  # Background previews of the current selection
+        self.file_list = VirtualListbox(self.files_listbox, scrollbar, lambda index: self.selection[index].describe())
         
         # Clear button (icon only)
         self.clear_btn = ttk.Button(
@@ -423,10 +462,11 @@ class FontInstaller:
         progress_card.grid(row=2, column=0, sticky=(tk.W, tk.E), pady=(0, 15))
         progress_card.columnconfigure(0, weight=1)
         
-        # Modern progress bar
+        # Modern progress bar, filled by bytes installed out of the archives' total
         self.progress = ttk.Progressbar(
             progress_card,
-            mode='indeterminate',
+            mode='determinate',
+            maximum=self.PROGRESS_STEPS,
             length=500,
             style='Modern.Horizontal.TProgressbar'
         )
@@ -435,11 +475,15 @@ class FontInstaller:
         # Status label with icon
         self.status_label = ttk.Label(
             progress_card,
-            text="Select ZIP files to begin",
+            text="Select ZIP files or a folder to begin",
             style='Status.TLabel'
         )
         self.status_label.grid(row=1, column=0, sticky=(tk.W))
         
+        # Throughput and ETA while installing
+        self.transfer_label = ttk.Label(progress_card, text="", style='Status.TLabel')
+        self.transfer_label.grid(row=2, column=0, sticky=(tk.W))
+        
         # Install button (centered, compact spacing)
         self.install_btn = ttk.Button(
             main_frame,
@@ -450,232 +494,271 @@ class FontInstaller:
         )
         self.install_btn.grid(row=3, column=0, sticky=(tk.W, tk.E), pady=(10, 0))
         
-        self.selected_files = []
         
     def select_files(self):
-        """Open file dialog to select ZIP files."""
+        """Open file dialog to select ZIP files or tarballs."""
+        from tkinter import filedialog
         files = filedialog.askopenfilenames(
-            title="Select ZIP files containing fonts",
+            title="Select ZIP files or tarballs containing fonts",
             filetypes=[
+                ("Font archives", "*.zip *.tar *.tgz *.tar.gz *.tbz *.tbz2 *.tar.bz2 *.txz *.tar.xz"),
                 ("ZIP files", "*.zip"),
                 ("All files", "*.*")
             ]
         )
         
-        if files:
-            self.selected_files.extend(files)
+        # Archives already selected (under any path) are not added again
+        added = self.selection.add_many(files)
+        if added:
             self.update_files_display()
             self.update_button_states()
+            self.scan_previews(added)
+            
+    def select_folder(self):
+        """Open a folder dialog; the folder is searched for archives and font files when installing."""
+        from tkinter import filedialog
+        folder = filedialog.askdirectory(title="Select a folder of fonts and ZIP files", mustexist=True)
+        if folder and self.selection.add(folder) is not None:
+            self.update_files_display()
+            self.update_button_states()
+            
+    def scan_previews(self, items):
+        """Preview newly selected archives from their central directories in the background:
+        fonts by format, unpacked size and other files, shown as each archive is read.
+        Archives unchanged since an earlier scan are previewed from the scan cache."""
+        from font_archives import FONT_EXTENSIONS
+        from font_preview import PreviewScan
+        channel = UiUpdateChannel()
+        UiUpdatePump(self.root, channel, lambda status, counters: self.file_list.refresh()).start()
+        by_path = {item.path: item for item in items}
+        
+        def on_preview(path, preview, error):
+            item = by_path[path]
+            if error is not None:
+                item.error = str(error)
+            else:
+                item.preview = preview
+                item.font_count = preview.font_count
+            channel.set_status(path)
+            
+        cache = self.scan_cache
+        
+        def on_done():
+            cache.save()
+            channel.close()
+            
+        scan = PreviewScan(by_path, on_preview, self.font_extensions or FONT_EXTENSIONS, on_done=on_done,
+                           cache=cache)
+        self.preview_scans = [s for s in self.preview_scans if s.running] + [scan.start()]
             
     def clear_files(self):
-        """Clear the selected files list."""
-        self.selected_files.clear()
+        """Clear the selected files list and stop previewing it."""
+        for scan in self.preview_scans:
+            scan.cancel()
+        self.preview_scans.clear()
+        self.selection.clear()
         self.update_files_display()
         self.update_button_states()
         
     def update_files_display(self):
-        """Update the listbox with selected files."""
-        self.files_listbox.delete(0, tk.END)
-        for file_path in self.selected_files:
-            filename = os.path.basename(file_path)
-            self.files_listbox.insert(tk.END, filename)
+        """Update the listbox with selected files. Only rows in view are (re)drawn."""
+        self.file_list.set_count(len(self.selection))
+        self.file_list.refresh()
             
     def update_button_states(self):
         """Update button states and status message based on selected files."""
-        has_files = len(self.selected_files) > 0
+        has_files = len(self.selection) > 0
         self.install_btn.config(state=tk.NORMAL if has_files else tk.DISABLED)
         self.clear_btn.config(state=tk.NORMAL if has_files else tk.DISABLED)
         
         # Update status message based on selection
         if has_files:
-            file_count = len(self.selected_files)
+            file_count = len(self.selection)
             file_text = "file" if file_count == 1 else "files"
             self.status_label.config(text=f"Ready to install fonts from {file_count} {file_text}")
         else:
-            self.status_label.config(text="Select ZIP files to begin")
-        
-    def extract_fonts_from_zip(self, zip_path: str, temp_dir: str) -> List[str]:
-        """Extract font files from a ZIP archive."""
-        font_files = []
-        
-        try:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                for file_info in zip_ref.infolist():
-                    if not file_info.is_dir():
-                        file_ext = Path(file_info.filename).suffix.lower()
-                        if file_ext in self.font_extensions:
-                            # Extract to temp directory
-                            extracted_path = zip_ref.extract(file_info, temp_dir)
-                            font_files.append(extracted_path)
-                            
-        except zipfile.BadZipFile:
-            messagebox.showerror("Error", f"Invalid ZIP file: {os.path.basename(zip_path)}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error extracting {os.path.basename(zip_path)}: {str(e)}")
-            
-        return font_files
-        
-    def install_font_file(self, font_path: str) -> tuple[bool, str]:
-        """Install a single font file using Windows API with proper registry registration."""
-        font_filename = os.path.basename(font_path)
-        
-        # Try system-wide installation first (requires admin)
-        try:
-            system_fonts_dir = os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts')
-            system_dest_path = os.path.join(system_fonts_dir, font_filename)
-            
-            # Copy font file to Windows Fonts directory
-            shutil.copy2(font_path, system_dest_path)
-            
-            # Register the font with Windows
-            gdi32 = ctypes.windll.gdi32
-            user32 = ctypes.windll.user32
-            
-            # Add font resource
-            result = gdi32.AddFontResourceW(system_dest_path)
-            
-            if result > 0:
-                # Register in system registry for persistence across reboots
-                try:
-                    with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, 
-                                      r"SOFTWARE\Microsoft\Windows NT\CurrentVersion\Fonts", 
-                                      0, winreg.KEY_SET_VALUE) as key:
-                        # Create registry entry with font name and file
-                        font_reg_name = self.get_font_name_from_file(font_path)
-                        winreg.SetValueEx(key, font_reg_name, 0, winreg.REG_SZ, font_filename)
-                except Exception as reg_error:
-                    print(f"Registry registration failed for {font_filename}: {str(reg_error)}")
-                    # Continue anyway - font is still loaded temporarily
-                
-                # Notify all windows that fonts have changed
-                user32.SendMessageTimeoutW(
-                    HWND_BROADCAST,
-                    WM_FONTCHANGE,
-                    0,
-                    0,
-                    SMTO_ABORTIFHUNG,
-                    1000,
-                    None
-                )
-                return True, "system-wide"
+            self.status_label.config(text="Select ZIP files or a folder to begin")
+        
+    def on_archive_event(self, event):
+        """Show per-archive progress while archives are opened in the background."""
+        import tarfile
+        import zipfile
+        from tkinter import messagebox
+        from font_archives import ArchiveEvent
+        archive_name = os.path.basename(event.path)
+        if event.kind == ArchiveEvent.OPENED:
+            # The central directory gives the archive's uncompressed font bytes, which replace
+            # the preview's estimate; a tarball's fonts are added one by one as the stream reaches them
+            self.transfer_progress.add_total(event.total_bytes, event.font_count, key=event.path)
+            if event.streaming:
+                self.ui_updates.set_status(f"📂  Reading: {archive_name}")
             else:
-                # If AddFontResource failed, remove the copied file
-                try:
-                    os.remove(system_dest_path)
-                except:
-                    pass
-                    
-        except PermissionError:
-            print(f"System installation failed for {font_filename}: Administrator privileges are required.")
-            return
-        except Exception as e:
-            print(f"System installation failed for {font_filename}: {str(e)}")
-        
-        return False, "unknown error"
+                self.ui_updates.set_status(f"📂  Reading: {archive_name} ({event.font_count} fonts)")
+            for inner_archive, reason in event.skipped:
+                print(f"Skipped nested archive {inner_archive}: {reason}")
+        elif event.kind == ArchiveEvent.FOUND:
+            self.transfer_progress.add_total(event.total_bytes, event.font_count, key=event.path)
+        elif event.kind == ArchiveEvent.DONE:
+            self.transfer_progress.settle(event.path)
+        elif event.kind == ArchiveEvent.FAILED:
+            self.transfer_progress.settle(event.path)
+            if isinstance(event.error, zipfile.BadZipFile):
+                message = f"Invalid ZIP file: {archive_name}"
+            elif isinstance(event.error, tarfile.ReadError):
+                message = f"Invalid or damaged tar archive: {archive_name}"
+            else:
+                message = f"Error reading {archive_name}: {str(event.error)}"
+            self.ui_updates.call(lambda: messagebox.showerror("Error", message))
+
+    def install_font_file(self, font_path: str) -> tuple[bool, str]:
+        """Install a single font file from disk."""
+        from font_archives import FontSource
+        from font_engine import InstallEngine
+        result = InstallEngine(self.backend).install(FontSource.from_path(font_path))
+        return result.success, result.install_type
         
     def get_font_name_from_file(self, font_path: str) -> str:
         """Extract the actual font name from the font file for better registry registration."""
-        try:
-            # Try to read font name from the file itself
-            # This is a simplified approach - for more complex font name extraction,
-            # you would need a font parsing library like fonttools
-            font_filename = os.path.basename(font_path)
-            font_name_base = os.path.splitext(font_filename)[0]
-            
-            # Clean up common font filename patterns
-            font_name_base = font_name_base.replace('_', ' ').replace('-', ' ')
-            
-            # Determine font type and create proper registry name
-            ext = os.path.splitext(font_filename)[1].lower()
-            if ext == '.ttf':
-                return f"{font_name_base} (TrueType)"
-            elif ext == '.otf':
-                return f"{font_name_base} (OpenType)"
-            elif ext in ['.ttc', '.otc']:
-                return f"{font_name_base} (TrueType Collection)" if ext == '.ttc' else f"{font_name_base} (OpenType Collection)"
-            else:
-                return f"{font_name_base} (TrueType)"  # Default fallback
-                
-        except Exception:
-            # Fallback to simple naming
-            font_name_base = os.path.splitext(os.path.basename(font_path))[0]
-            return f"{font_name_base} (TrueType)"
+        from font_metadata import get_font_name_from_file
+        return get_font_name_from_file(font_path)
             
     def install_fonts_thread(self):
         """Install fonts in a separate thread to prevent GUI freezing."""
-        installed_count = 0
+        # The installation machinery is loaded on first use, off the startup path
+        import tempfile
+        import itertools
+        import contextlib
+        from tkinter import messagebox
+        from font_archives import FONT_EXTENSIONS, ArchiveEvent, ArchiveScanner, stage_font_sources
+        from font_engine import DEFAULT_WORKERS, InstallEngine, InstallSummary
+        from font_folders import FolderFeed
+        from font_index import InstalledFontIndex
+        from font_inventory import FontInventory
+        from font_journal import InstallJournal, resume_runs
+        from font_preview import expect_totals
+        
+        summary = InstallSummary()
         total_fonts = 0
-        system_installs = 0
-        user_installs = 0
-        failed_installs = []
+        unreadable_folders = []
+        ui = self.ui_updates
         
         # Update status with modern icons
-        self.root.after(0, lambda: self.status_label.config(text="📦  Extracting fonts from archives..."))
-        self.root.after(0, self.progress.start)
+        ui.set_status("📦  Extracting fonts from archives...")
         
         try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                all_font_files = []
+            with contextlib.ExitStack() as stack:
+                discovered = {'fonts': 0}
                 
-                # Extract all fonts from ZIP files
-                for zip_path in self.selected_files:
-                    self.root.after(0, lambda z=zip_path: self.status_label.config(
-                        text=f"📂  Extracting: {os.path.basename(z)}"
-                    ))
-                    
-                    font_files = self.extract_fonts_from_zip(zip_path, temp_dir)
-                    all_font_files.extend(font_files)
+                def on_archive_event(event):
+                    if event.kind in (ArchiveEvent.OPENED, ArchiveEvent.FOUND):
+                        discovered['fonts'] += event.font_count
+                    self.on_archive_event(event)
+                
+                def on_walk_error(path, error):
+                    print(f"Could not read folder {path}: {error}")
+                    unreadable_folders.append(path)
+                
+                # Fonts identical to ones already in the Fonts folder are skipped
+                font_index = InstalledFontIndex(self.backend.fonts_dir).load()
+                # Registry names already taken by other files are reported
+                inventory = FontInventory(self.backend.registry).load()
+                # Each font's steps are journaled; a run cut short last time is finished first
+                journal = stack.enter_context(InstallJournal())
+                for resumed in resume_runs(journal, self.backend):
+                    print(f"Finished interrupted install of {resumed.filename}: "
+                          f"{resumed.error or ', '.join(resumed.steps) or 'nothing left to do'}")
+                self.install_engine = InstallEngine(self.backend, workers=self.INSTALL_WORKERS or DEFAULT_WORKERS,
+                                                    font_index=font_index, inventory=inventory, journal=journal)
+                
+                # Selected folders are walked on a thread into a bounded queue while
+                # the archives found so far are installed
+                extensions = self.font_extensions or FONT_EXTENSIONS
+                # The selected archives' sizes come from their previews (in the scan cache by now),
+                # so the progress bar's total is known before the first font is installed
+                expect_totals(self.transfer_progress, self.selection.paths(), extensions, self.scan_cache)
+                feed = stack.enter_context(FolderFeed(self.selection.paths(), extensions, on_error=on_walk_error))
+                
+                # Archives are opened on a thread pool; fonts of the first archive
+                # that is ready start installing while the rest are still being read.
+                # Each archive is closed once its fonts are installed
+                scanner = stack.enter_context(ArchiveScanner(
+                    feed,
+                    extensions=extensions,
+                    on_event=on_archive_event,
+                    release_after=self.install_engine.window,
+                    cache=self.scan_cache
+                ))
+                font_sources = iter(scanner)
+                
+                # Only backends that cannot install from a stream get a staging area
+                if self.backend.requires_staging:
+                    temp_dir = stack.enter_context(tempfile.TemporaryDirectory())
+                    font_sources = stage_font_sources(font_sources, temp_dir,
+                                                      release_after=self.install_engine.window)
                     
-                total_fonts = len(all_font_files)
+                # Install fonts on the worker pool; results arrive in order
+                ui.set_status("⚡  Installing fonts...")
+                progress_counter = itertools.count(1)
+                
+                def on_result(result):
+                    # Coalesced: the UI only shows the latest font at each refresh
+                    ui.count('fonts_done')
+                    ui.set_status(f"🔧  Installing ({next(progress_counter)}/{discovered['fonts']}): "
+                                  f"{result.source.filename}")
+                
+                summary = self.install_engine.run(font_sources, on_result, self.transfer_progress)
+                inventory.refresh()
+                inventory.save()
+                # Names and content hashes learned during the run make the next one cheaper
+                self.scan_cache.save()
+                total_fonts = summary.total_fonts
                 
                 if total_fonts == 0:
-                    self.root.after(0, lambda: messagebox.showwarning(
+                    ui.call(lambda: messagebox.showwarning(
                         "No Fonts Found",
-                        "No TTF or OTF font files were found in the selected ZIP archives."
+                        "No TTF or OTF font files were found in the selected archives and folders."
                     ))
                     return
-                    
-                # Install each font
-                self.root.after(0, lambda: self.status_label.config(text="⚡  Installing fonts..."))
                 
-                for i, font_path in enumerate(all_font_files):
-                    font_name = os.path.basename(font_path)
-                    self.root.after(0, lambda fn=font_name, prog=i+1, tot=total_fonts: self.status_label.config(
-                        text=f"🔧  Installing ({prog}/{tot}): {fn}"
-                    ))
-                    
-                    success, install_type = self.install_font_file(font_path)
-                    if success:
-                        installed_count += 1
-                        if install_type == "system-wide":
-                            system_installs += 1
-                        elif "user-level" in install_type:  # Handles all user-level variants
-                            user_installs += 1
-                    else:
-                        failed_installs.append((font_name, install_type))
-                        
+            for font_reg_name, reg_error in summary.registry_failures:
+                print(f"Registry registration failed for {font_reg_name}: {str(reg_error)}")
+            if journal.error is not None:
+                print(f"Install journal {journal.journal_path} not written, the run can't be resumed: {journal.error}")
+                
         except Exception as e:
-            self.root.after(0, lambda: messagebox.showerror(
+            ui.call(lambda: messagebox.showerror(
                 "Installation Error",
                 f"An error occurred during installation: {str(e)}"
             ))
         finally:
+            self.install_engine = None
+            installed_count = summary.installed_count
+            system_installs = summary.system_installs
+            user_installs = summary.user_installs
+            failed_installs = summary.failed_installs
+            registry_failures = summary.registry_failures
+            skipped_count = summary.skipped_count
+            
             # Update UI in main thread with modern status
-            self.root.after(0, self.progress.stop)
+            ui.call(self.show_final_progress)
             
-            if installed_count > 0:
-                self.root.after(0, lambda: self.status_label.config(
-                    text=f"✅  Complete: {installed_count}/{total_fonts} fonts installed successfully"
-                ))
+            if installed_count > 0 or skipped_count > 0:
+                status_text = f"✅  Complete: {installed_count}/{total_fonts} fonts installed successfully"
+                if skipped_count > 0:
+                    status_text += f", {skipped_count} already installed"
+                ui.set_status(status_text)
             else:
-                self.root.after(0, lambda: self.status_label.config(
-                    text=f"❌  Failed: No fonts were installed"
-                ))
+                ui.set_status("❌  Failed: No fonts were installed")
             
             # Prepare detailed completion message with modern formatting
-            if installed_count > 0:
+            if installed_count > 0 or skipped_count > 0:
                 message_parts = [f"Successfully installed {installed_count} out of {total_fonts} fonts"]
                 
+                if skipped_count > 0:
+                    saved_mb = summary.bytes_saved / (1024 * 1024)
+                    message_parts.append(f"\n{skipped_count} fonts were already installed and were skipped "
+                                         f"({saved_mb:.1f} MB not copied)")
+                
                 if system_installs > 0:
                     message_parts.append(f"\n{system_installs} fonts installed system-wide")
                 
@@ -685,38 +768,88 @@ class FontInstaller:
                 if failed_installs:
                     message_parts.append(f"\n{len(failed_installs)} fonts failed to install")
                     
+                if registry_failures:
+                    message_parts.append(f"\n{len(registry_failures)} fonts could not be registered "
+                                         "and will not persist after a reboot")
+                
+                if unreadable_folders:
+                    message_parts.append(f"\n{len(unreadable_folders)} folders could not be read")
+                
+                if summary.name_conflicts:
+                    message_parts.append(f"\n{len(summary.name_conflicts)} fonts replaced the registry entry "
+                                         "of a different file with the same font name")
+                    
                 message_parts.append("\nThe fonts are now available in your applications")
                 
-                self.root.after(0, lambda: messagebox.showinfo(
+                ui.call(lambda: messagebox.showinfo(
                     "Installation Complete",
                     "\n".join(message_parts)
                 ))
             else:
-                self.root.after(0, lambda: messagebox.showerror(
+                ui.call(lambda: messagebox.showerror(
                     "Installation Failed",
                     "No fonts were installed.\n\nPlease try running as Administrator."
                 ))
                 
             # Re-enable buttons
-            self.root.after(0, lambda: self.install_btn.config(state=tk.NORMAL))
-            self.root.after(0, lambda: self.select_btn.config(state=tk.NORMAL))
+            ui.call(lambda: self.install_btn.config(state=tk.NORMAL))
+            ui.call(lambda: self.select_btn.config(state=tk.NORMAL))
+            ui.call(lambda: self.folder_btn.config(state=tk.NORMAL))
+            ui.close()
             
     def install_fonts(self):
         """Start font installation process."""
-        if not self.selected_files:
-            messagebox.showwarning("No Files Selected", "Please select ZIP files containing fonts first.")
+        if not self.selection:
+            from tkinter import messagebox
+            messagebox.showwarning("No Files Selected", "Please select ZIP files or a folder containing fonts first.")
             return
             
         # Disable buttons during installation
         self.install_btn.config(state=tk.DISABLED)
         self.select_btn.config(state=tk.DISABLED)
+        self.folder_btn.config(state=tk.DISABLED)
+        
+        # The worker posts its updates to a fresh channel; the pump applies them
+        # every DEFAULT_UI_INTERVAL_MS however many fonts are installed
+        self.ui_updates = UiUpdateChannel()
+        self.transfer_progress = TransferProgress()
+        self.progress.config(value=0)
+        self.ui_pump = UiUpdatePump(self.root, self.ui_updates, self.apply_status, on_tick=self.apply_progress)
+        self.ui_pump.start()
         
         # Start installation in separate thread
         thread = threading.Thread(target=self.install_fonts_thread, daemon=True)
         thread.start()
         
+    def apply_status(self, status: str, counters: dict):
+        """Show the latest status posted by the install thread."""
+        self.status_label.config(text=status)
+        
+    def apply_progress(self):
+        """Redraw the progress bar, throughput and ETA from the run's byte counters."""
+        snapshot = self.transfer_progress.snapshot()
+        if snapshot.bytes_total:
+            self.progress.config(value=snapshot.fraction * self.PROGRESS_STEPS)
+            self.transfer_label.config(text=snapshot.describe())
+        
+    def show_final_progress(self):
+        """Show the run's total size and average throughput once it is finished."""
+        snapshot = self.transfer_progress.snapshot()
+        self.progress.config(value=snapshot.fraction * self.PROGRESS_STEPS)
+        if snapshot.bytes_total and snapshot.elapsed > 0:
+            mb = 1024 * 1024
+            self.transfer_label.config(text=f"{snapshot.bytes_done / mb:.1f} MB in {snapshot.elapsed:.1f} s  ·  "
+                                            f"{snapshot.bytes_done / mb / snapshot.elapsed:.1f} MB/s average")
+        
+    def close(self):
+        """Stop starting new fonts and close the window."""
+        if self.install_engine is not None:
+            self.install_engine.cancel()
+        self.root.destroy()
+        
     def run(self):
         """Run the application."""
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
         self.root.mainloop()
 
     def setup_modern_style(self):
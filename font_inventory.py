@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Installed-font inventory for FontFlow.
+Combines the HKLM/HKCU Fonts registry values with the listings of the matching
+Fonts directories. A snapshot is saved next to the app; later runs only re-read
+directories whose mtime changed and registry keys whose value count or last
+write time changed.
+"""
+
+import os
+import json
+import ntpath
+from typing import Dict, List, Optional, Set, Tuple
+
+from font_archives import FONT_EXTENSIONS
+from font_backend import system_fonts_dir
+from font_index import app_dir
+from font_registry import FONTS_REGISTRY_KEY, HKCU, HKLM, WinRegistry
+
+INVENTORY_FILENAME = 'fontflow_inventory.json'
+INVENTORY_VERSION = 1
+
+
+def user_fonts_dir() -> str:
+    """Per-user Fonts directory used by Windows 10 1809 and later."""
+    local_app_data = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), 'AppData', 'Local')
+    return os.path.join(local_app_data, 'Microsoft', 'Windows', 'Fonts')
+
+
+def default_scopes() -> List[Tuple[str, str]]:
+    """(registry hive, fonts directory) pairs that make up the installed fonts."""
+    return [(HKLM, system_fonts_dir()), (HKCU, user_fonts_dir())]
+
+
+class LocalFileSystem:
+    """Directory access for the inventory."""
+
+    def dir_mtime_ns(self, path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def list_fonts(self, path: str) -> List[str]:
+        with os.scandir(path) as entries:
+            return [entry.name for entry in entries
+                    if os.path.splitext(entry.name)[1].lower() in FONT_EXTENSIONS]
+
+
+class MemoryFileSystem:
+    """In-memory directories with the LocalFileSystem interface."""
+
+    def __init__(self):
+        self.dirs: Dict[str, List] = {}  # path -> [mtime_ns, set of names]
+        self.listings = 0
+
+    def add_file(self, directory: str, name: str):
+        entry = self.dirs.setdefault(directory, [0, set()])
+        entry[0] += 1
+        entry[1].add(name)
+
+    def remove_file(self, directory: str, name: str):
+        entry = self.dirs[directory]
+        entry[0] += 1
+        entry[1].discard(name)
+
+    def dir_mtime_ns(self, path: str) -> Optional[int]:
+        entry = self.dirs.get(path)
+        return entry[0] if entry else None
+
+    def list_fonts(self, path: str) -> List[str]:
+        self.listings += 1
+        return sorted(self.dirs[path][1])
+
+
+class FontInventory:
+    """Set-style view of the installed fonts, kept up to date incrementally.
+
+    Each scope pairs a registry hive's Fonts key with a Fonts directory. Values
+    under HKLM name files relative to the system Fonts directory; values under
+    HKCU usually hold full paths. Both are normalized to lower-case file names
+    when they point into the scope's directory.
+    """
+
+    def __init__(self, registry=None, fs=None, scopes: Optional[List[Tuple[str, str]]] = None,
+                 index_path: Optional[str] = None):
+        self.registry = registry if registry is not None else WinRegistry()
+        self.fs = fs if fs is not None else LocalFileSystem()
+        self.scopes = scopes if scopes is not None else default_scopes()
+        self.index_path = index_path or os.path.join(app_dir(), INVENTORY_FILENAME)
+        self._dirs: Dict[str, Tuple[Optional[int], List[str]]] = {}       # dir -> (mtime_ns, names)
+        self._keys: Dict[str, Tuple[Optional[tuple], Dict[str, str]]] = {}  # hive -> (state, values)
+        self._files: Dict[str, Set[str]] = {}       # hive -> lower-case names in the directory
+        self._referenced: Dict[str, Set[str]] = {}  # hive -> lower-case files named by registry values
+        self._names: Dict[str, Dict[str, str]] = {}  # hive -> {lower-case value name: data}
+        self.last_refresh = {'dirs': 0, 'keys': 0}  # What the last refresh() had to re-read
+        self.dirty = False
+
+    def load(self):
+        """Load the saved snapshot (if any) and refresh what changed since."""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == INVENTORY_VERSION:
+                for directory, (mtime_ns, names) in data.get('dirs', {}).items():
+                    self._dirs[directory] = (mtime_ns, names)
+                for hive, (state, values) in data.get('keys', {}).items():
+                    self._keys[hive] = (tuple(state) if state else None, dict(values))
+        except (OSError, ValueError, TypeError):
+            pass  # Missing or unreadable snapshot: read everything
+        self._rebuild(set(self._keys), set(self._dirs))
+        self.refresh()
+        return self
+
+    def _key_state(self, hive: str):
+        try:
+            key = self.registry.open_key(hive, FONTS_REGISTRY_KEY)
+        except OSError:
+            return None, None
+        return key, self.registry.query_info(key)
+
+    def refresh(self):
+        """Re-read only the directories and registry keys that changed."""
+        changed_dirs = set()
+        changed_hives = set()
+        for hive, directory in self.scopes:
+            mtime_ns = self.fs.dir_mtime_ns(directory)
+            if directory not in self._dirs or self._dirs[directory][0] != mtime_ns:
+                names = self.fs.list_fonts(directory) if mtime_ns is not None else []
+                self._dirs[directory] = (mtime_ns, names)
+                changed_dirs.add(directory)
+
+            key, state = self._key_state(hive)
+            try:
+                if hive not in self._keys or self._keys[hive][0] != state:
+                    values = dict(self.registry.enum_values(key)) if key is not None else {}
+                    self._keys[hive] = (state, values)
+                    changed_hives.add(hive)
+            finally:
+                if key is not None:
+                    self.registry.close_key(key)
+
+        self.last_refresh = {'dirs': len(changed_dirs), 'keys': len(changed_hives)}
+        if changed_dirs or changed_hives:
+            self.dirty = True
+            self._rebuild(changed_hives, changed_dirs)
+
+    def _rebuild(self, hives: Set[str], dirs: Set[str]):
+        for hive, directory in self.scopes:
+            if directory in dirs and directory in self._dirs:
+                self._files[hive] = {name.lower() for name in self._dirs[directory][1]}
+            if hive in hives and hive in self._keys:
+                values = self._keys[hive][1]
+                self._names[hive] = {name.lower(): data for name, data in values.items()}
+                self._referenced[hive] = {self._file_key(data, directory) for data in values.values()}
+
+    @staticmethod
+    def _file_key(data: str, directory: str) -> str:
+        # Registry values are Windows paths even when the inventory runs elsewhere
+        folder = ntpath.dirname(data)
+        if not folder or folder.lower().rstrip('\\/') == directory.lower().rstrip('\\/'):
+            return ntpath.basename(data).lower()
+        return data.lower()
+
+    def save(self):
+        """Write the snapshot next to the app. Failures (e.g. read-only folder) are ignored."""
+        if not self.dirty:
+            return
+        data = {
+            'version': INVENTORY_VERSION,
+            'dirs': {directory: [mtime_ns, names] for directory, (mtime_ns, names) in self._dirs.items()},
+            'keys': {hive: [list(state) if state else None, sorted(values.items())]
+                     for hive, (state, values) in self._keys.items()}
+        }
+        temp_path = self.index_path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(temp_path, self.index_path)
+            self.dirty = False
+        except OSError:
+            pass
+
+    # Queries
+
+    def is_installed(self, font_filename: str) -> bool:
+        """True if the file is in a Fonts directory and registered in that scope."""
+        key = font_filename.lower()
+        return any(key in self._files.get(hive, ()) and key in self._referenced.get(hive, ())
+                   for hive, _ in self.scopes)
+
+    def is_registered(self, font_reg_name: str) -> bool:
+        """True if a registry value with this name exists in any scope."""
+        key = font_reg_name.lower()
+        return any(key in names for names in self._names.values())
+
+    def registered_value(self, font_reg_name: str, hive: str = HKLM) -> Optional[str]:
+        """The file font_reg_name is registered for in hive, or None."""
+        return self._names.get(hive, {}).get(font_reg_name.lower())
+
+    def conflicting_name(self, font_reg_name: str, font_filename: str, hive: str = HKLM) -> Optional[str]:
+        """If font_reg_name is already registered in hive for a different file, return that file."""
+        data = self.registered_value(font_reg_name, hive)
+        if data is None:
+            return None
+        if ntpath.basename(data).lower() == font_filename.lower():
+            return None
+        return data
+
+    def orphaned_files(self) -> Set[str]:
+        """Font files in a Fonts directory that no registry value in the same scope refers to."""
+        orphans = set()
+        for hive, directory in self.scopes:
+            for name in self._dirs.get(directory, (None, []))[1]:
+                if name.lower() not in self._referenced.get(hive, ()):
+                    orphans.add(os.path.join(directory, name))
+        return orphans
@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Install journal for FontFlow.
+Every install run appends what it did to fontflow_journal.jsonl next to the
+app, one JSON record per line: the run's start, each font's phases as they
+complete (copied into the Fonts folder, font resource added, registry value
+written) and the run's end. Records are written and fsync'd in batches, so a
+run costs a few syncs rather than one per font. resume_runs() finishes the
+fonts of runs that never ended, doing only the steps the journal doesn't show
+as done; fonts whose records were lost with the last batch are found by their
+copies in the Fonts folder, since every step is safe to do twice. The first
+read of a journal compacts it once most of it is history: ended runs are
+rewritten as their fonts' final state, and those with no fonts left dropped.
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+from typing import Callable, Dict, List, Optional
+
+from font_archives import FONT_EXTENSIONS
+from font_index import app_dir
+from font_metadata import get_font_name_from_file
+from font_validation import validate_font_file
+
+JOURNAL_FILENAME = 'fontflow_journal.jsonl'
+JOURNAL_VERSION = 1
+
+# A font's phases, in the order the engine completes them
+COPIED = 'copied'
+RESOURCE_ADDED = 'resource_added'
+REGISTERED = 'registered'
+PHASES = (COPIED, RESOURCE_ADDED, REGISTERED)
+# The copy was deleted again (Windows rejected the font, or it was uninstalled); the font is out of the run
+REMOVED = 'removed'
+# The font's registry value was written over one that was already there
+REPLACED = 'replaced'
+
+# Pending records are fsync'd once this many are waiting, or this many seconds after the last sync
+DEFAULT_SYNC_EVERY = 256
+DEFAULT_SYNC_INTERVAL = 2.0
+# Copies modified this long before a run began still count as its own (FAT keeps 2-second mtimes)
+MTIME_SLACK = 2.0
+# A journal this big is compacted when that would at least halve it
+COMPACT_MIN_BYTES = 64 * 1024
+
+
+class JournalFont:
+    """What the journal shows was done for one font of a run."""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.size: Optional[int] = None    # As copied
+        self.digest: Optional[str] = None  # font_index content hash, if it was computed
+        self.origin: Optional[str] = None  # Archive the font came from
+        self.name: Optional[str] = None    # Registry name, once registered
+        self.existed = False               # A file of the same name was overwritten by the copy
+        self.replaced: Dict[str, str] = {}  # Registry name -> the value it had before
+        self.phases = set()
+
+    @property
+    def complete(self) -> bool:
+        return all(phase in self.phases for phase in PHASES)
+
+    def __repr__(self):
+        return f"JournalFont({self.filename!r}, phases={sorted(self.phases)})"
+
+
+class JournalRun:
+    """One install run as read back from the journal."""
+
+    def __init__(self, run_id: str, fonts_dir: str, hive: str, started: float):
+        self.run_id = run_id
+        self.fonts_dir = fonts_dir
+        self.hive = hive
+        self.started = started
+        self.last_record = started  # Time of its last record before any resume
+        self.sync_interval = DEFAULT_SYNC_INTERVAL  # Of the journal that wrote it
+        self.resumed = False
+        self.ended = False
+        self.fonts: Dict[str, JournalFont] = {}  # By lower-case file name, in install order
+        self.journal_bytes = 0  # Size of its records in the file
+
+    def font(self, filename: str) -> JournalFont:
+        key = filename.lower()
+        if key not in self.fonts:
+            self.fonts[key] = JournalFont(filename)
+        return self.fonts[key]
+
+    def incomplete_fonts(self) -> List[JournalFont]:
+        """Fonts that were copied but are missing a later phase."""
+        return [font for font in self.fonts.values() if font.phases and not font.complete]
+
+    def __repr__(self):
+        return f"JournalRun({self.run_id!r}, fonts={len(self.fonts)}, ended={self.ended})"
+
+
+def read_journal(path: str) -> List[JournalRun]:
+    """Every run recorded in a journal file, oldest first. A torn last line (the
+    process died while writing it) and records of unknown versions are ignored."""
+    runs: Dict[str, JournalRun] = {}
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return []
+    with f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if record.get('v') != JOURNAL_VERSION:
+                    continue
+                event = record['event']
+                run_id = record['run']
+            except (ValueError, KeyError, AttributeError):
+                continue
+            if event == 'begin':
+                run = runs[run_id] = JournalRun(run_id, record['fonts_dir'], record['hive'], record['time'])
+                run.sync_interval = record.get('sync_interval', DEFAULT_SYNC_INTERVAL)
+                run.journal_bytes = len(line)
+                continue
+            run = runs.get(run_id)
+            if run is None:
+                continue
+            run.journal_bytes += len(line)
+            if not run.resumed and record.get('time'):
+                run.last_record = max(run.last_record, record['time'])
+            if event == 'end':
+                run.ended = True
+            elif event == 'resumed':
+                run.ended = False
+                run.resumed = True
+            elif event == REMOVED:
+                run.fonts.pop(record['file'].lower(), None)
+            elif event == REPLACED:
+                run.font(record['file']).replaced.setdefault(record['name'], record['previous'])
+            elif event in PHASES:
+                first_copy = record['file'].lower() not in run.fonts
+                font = run.font(record['file'])
+                font.phases.add(event)
+                if event == COPIED:
+                    font.phases = {COPIED}  # Copied again: later phases are redone too
+                    font.size = record.get('size')
+                    font.digest = record.get('digest')
+                    font.origin = record.get('origin')
+                    if first_copy:
+                        # A later copy of the same name in the run finds the run's own file
+                        font.existed = record.get('existed', False)
+                elif event == REGISTERED:
+                    font.name = record.get('name')
+    return list(runs.values())
+
+
+def _encode(record: dict) -> bytes:
+    return json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def _summary(run: JournalRun) -> bytes:
+    """Records that read back as an ended run: its start, each font's final state and its end."""
+    def record(event, **fields):
+        return _encode({'v': JOURNAL_VERSION, 'run': run.run_id, 'event': event, 'time': run.started, **fields})
+
+    records = [record('begin', fonts_dir=run.fonts_dir, hive=run.hive, sync_interval=run.sync_interval)]
+    for font in run.fonts.values():
+        # The copy first: it resets the phases, and only a run's first copy says whether the file existed
+        if COPIED in font.phases:
+            records.append(record(COPIED, file=font.filename, size=font.size, digest=font.digest,
+                                  origin=font.origin, existed=font.existed))
+        for name, previous in font.replaced.items():
+            records.append(record(REPLACED, file=font.filename, name=name, previous=previous))
+        if RESOURCE_ADDED in font.phases:
+            records.append(record(RESOURCE_ADDED, file=font.filename))
+        if REGISTERED in font.phases:
+            records.append(record(REGISTERED, file=font.filename, name=font.name))
+    records.append(_encode({'v': JOURNAL_VERSION, 'run': run.run_id, 'event': 'end', 'time': run.last_record}))
+    return b''.join(records)
+
+
+class InstallJournal:
+    """Append-only record of install runs, fsync'd in batches.
+
+    begin() starts a run (or continues one being resumed) and end() closes
+    it; the phase methods are called as each font gets through a step, from
+    any thread, and do nothing outside a run. Records wait in memory until
+    sync_every of them are pending or sync_interval seconds have passed, then
+    are appended and fsync'd together; begin() and end() sync at once. If the
+    journal can't be written or read (e.g. a read-only folder) installs carry
+    on and the error is kept in error, for the caller to report. The first
+    runs() before anything is written compacts the file (see compact()).
+    """
+
+    def __init__(self, journal_path: Optional[str] = None, sync_every: int = DEFAULT_SYNC_EVERY,
+                 sync_interval: float = DEFAULT_SYNC_INTERVAL):
+        self.journal_path = journal_path or os.path.join(app_dir(), JOURNAL_FILENAME)
+        self.sync_every = max(1, sync_every)
+        self.sync_interval = sync_interval
+        self.run_id: Optional[str] = None
+        self.syncs = 0  # fsync calls so far
+        self.error: Optional[OSError] = None
+        self._pending: List[bytes] = []
+        self._file = None
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+        self._compacted = False
+
+    def _record(self, event: str, run_id: Optional[str] = None, **fields):
+        with self._lock:
+            run_id = run_id or self.run_id
+            if run_id is None:
+                return
+            self._pending.append(_encode({'v': JOURNAL_VERSION, 'run': run_id, 'event': event,
+                                          'time': time.time(), **fields}))
+            if len(self._pending) >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync_locked()
+
+    def _sync_locked(self):
+        batch, self._pending = self._pending, []
+        self._last_sync = time.monotonic()
+        if not batch:
+            return
+        try:
+            if self._file is None:
+                self._file = open(self.journal_path, 'ab')
+            self._file.write(b''.join(batch))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.syncs += 1
+        except OSError as e:
+            self.error = e
+
+    def sync(self):
+        """Write and fsync the pending records."""
+        with self._lock:
+            self._sync_locked()
+
+    def begin(self, fonts_dir: str, hive: str, run_id: Optional[str] = None) -> str:
+        """Start a run into fonts_dir, or continue run_id when resuming it. Returns the run id."""
+        if run_id is None:
+            run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+            self._record('begin', run_id, fonts_dir=fonts_dir, hive=hive, sync_interval=self.sync_interval)
+        else:
+            self._record('resumed', run_id)
+        self.run_id = run_id
+        self.sync()
+        return run_id
+
+    def copied(self, filename: str, size: int, digest: Optional[str] = None, origin: Optional[str] = None,
+               existed: bool = False):
+        """Record a copy; existed if it overwrote a file that was already in the Fonts folder."""
+        self._record(COPIED, file=filename, size=size, digest=digest, origin=origin, existed=existed)
+
+    def replaced(self, filename: str, name: str, previous: str):
+        """Record that the font's registry value is written over one that was there before, so it can be put back."""
+        self._record(REPLACED, file=filename, name=name, previous=previous)
+
+    def resource_added(self, filename: str):
+        self._record(RESOURCE_ADDED, file=filename)
+
+    def registered(self, name: str, filename: str):
+        """Record a registry value; takes (name, value) like RegistryWriter.on_written."""
+        self._record(REGISTERED, file=filename, name=name)
+
+    def removed(self, filename: str, run_id: Optional[str] = None):
+        """Record that a font is gone again: rejected during the current run, or uninstalled from run_id."""
+        self._record(REMOVED, run_id, file=filename)
+
+    def end(self):
+        """Close the current run; it won't be resumed."""
+        self._record('end')
+        with self._lock:
+            self.run_id = None
+            self._sync_locked()
+
+    def runs(self) -> List[JournalRun]:
+        """Every run in the journal, including what is still pending here. A journal that
+        can't be read counts as empty, with the error kept in error."""
+        self.sync()
+        try:
+            runs = read_journal(self.journal_path)
+        except OSError as e:
+            self.error = e
+            return []
+        if not self._compacted:
+            runs = self.compact(runs)
+        return runs
+
+    def compact(self, runs: List[JournalRun]) -> List[JournalRun]:
+        """Rewrite the journal read back as runs without its history, and return the runs kept.
+
+        Only done before this journal writes anything, and only if it is at
+        least COMPACT_MIN_BYTES and would shrink to half or less. Each ended
+        run is replaced by records of its fonts' final state. An ended run
+        with no fonts left (rejected or uninstalled) is dropped, unless an
+        interrupted run into the same folder started before it: the next
+        run's start bounds which copies resume_runs() takes for that run's.
+        Interrupted runs, and records of other journal versions, are kept
+        as they are. The new file replaces the old in one rename, so a crash
+        leaves one or the other.
+        """
+        with self._lock:
+            if self._compacted or self.run_id is not None or self._file is not None or self._pending:
+                self._compacted = True
+                return runs
+            self._compacted = True
+            try:
+                size = os.path.getsize(self.journal_path)
+            except OSError:
+                return runs
+            if size < COMPACT_MIN_BYTES:
+                return runs
+            interrupted = [run for run in runs if not run.ended]
+            kept = [run for run in runs if not run.ended or run.fonts or any(
+                other.fonts_dir == run.fonts_dir and other.started < run.started for other in interrupted)]
+            summaries = {run.run_id: _summary(run) for run in kept if run.ended}
+            if 2 * (sum(map(len, summaries.values())) + sum(run.journal_bytes for run in interrupted)) > size:
+                return runs
+
+            raw: Dict[str, List[bytes]] = {run.run_id: [] for run in interrupted}
+            other_versions = []
+            temp_path = self.journal_path + '.compact'
+            try:
+                with open(self.journal_path, 'rb') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                            if record.get('v') != JOURNAL_VERSION:
+                                other_versions.append(line)
+                            elif record['run'] in raw:
+                                raw[record['run']].append(line)
+                        except (ValueError, KeyError, AttributeError):
+                            continue  # A torn line
+                with open(temp_path, 'wb') as f:
+                    f.write(b''.join(other_versions))
+                    for run in kept:
+                        f.write(summaries[run.run_id] if run.ended else b''.join(raw[run.run_id]))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.journal_path)
+            except OSError:
+                # The journal is left whole; the next one opened tries again
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+                return runs
+            return kept
+
+    def incomplete_runs(self, fonts_dir: Optional[str] = None) -> List[JournalRun]:
+        """Runs that never ended (the process died or was killed), optionally only into fonts_dir."""
+        return [run for run in self.runs()
+                if not run.ended and run.run_id != self.run_id and (fonts_dir is None or run.fonts_dir == fonts_dir)]
+
+    def close(self):
+        with self._lock:
+            self._sync_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _valid_copy(path: str) -> bool:
+    try:
+        validate_font_file(path)
+    except Exception:
+        return False
+    return True
+
+
+class ResumedFont:
+    """A font of an interrupted run and the steps resume_runs() did for it."""
+
+    def __init__(self, filename: str, path: str, run_id: str):
+        self.filename = filename
+        self.path = path
+        self.run_id = run_id
+        self.steps: List[str] = []  # Phases done now
+        self.error: Optional[str] = None
+
+    def __repr__(self):
+        return f"ResumedFont({self.filename!r}, steps={self.steps}, error={self.error!r})"
+
+
+def _unjournaled_copies(run: JournalRun, until: float, journaled: set) -> List[JournalFont]:
+    # Fonts written into the folder while the run was going that no run's journal mentions:
+    # their records were still waiting for a sync when the process died. Records wait at most
+    # sync_interval after the last one that was synced, so later files aren't the run's
+    fonts = []
+    try:
+        with os.scandir(run.fonts_dir) as entries:
+            for entry in entries:
+                if os.path.splitext(entry.name)[1].lower() not in FONT_EXTENSIONS or entry.name.lower() in journaled:
+                    continue
+                try:
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                if run.started - MTIME_SLACK <= mtime < until:
+                    fonts.append(JournalFont(entry.name))
+    except OSError:
+        pass
+    return fonts
+
+
+def resume_runs(journal: InstallJournal, backend, name_resolver: Optional[Callable[[str], str]] = None,
+                on_font: Optional[Callable[[ResumedFont], None]] = None) -> List[ResumedFont]:
+    """Finish the interrupted runs into backend's Fonts folder.
+
+    Fonts the journal shows as copied get only the steps they are missing:
+    the font resource is added and the registry value written (through one
+    RegistryWriter, named by name_resolver or from the file). A copy that is
+    gone or has a different size can't be finished and is reported with an
+    error; installing its archive again fixes it. Font files written during
+    the run (up to sync_interval after its last synced record) whose records
+    were lost get every step after a validity check
+    (a copy cut short fails it and is reported). Fonts that weren't copied
+    are left to the next install. Each run is then ended, and WM_FONTCHANGE
+    is broadcast once.
+    """
+    results: List[ResumedFont] = []
+    all_runs = journal.runs()
+    runs = [run for run in all_runs if not run.ended and run.run_id != journal.run_id
+            and run.fonts_dir == backend.fonts_dir and run.hive == backend.registry_hive]
+    if not runs:
+        return results
+    journaled = {key for run in all_runs for key in run.fonts}
+    starts = sorted(run.started for run in all_runs if run.fonts_dir == backend.fonts_dir)
+    with backend.open_registry_writer() as writer:
+        writer.on_written = journal.registered
+        for run in runs:
+            journal.begin(run.fonts_dir, run.hive, run.run_id)
+            until = run.last_record + run.sync_interval + MTIME_SLACK
+            until = min([until] + [started for started in starts if started > run.started])
+            by_name: Dict[str, ResumedFont] = {}
+            for font in run.incomplete_fonts() + _unjournaled_copies(run, until, journaled):
+                path = backend.destination_for(font.filename)
+                result = ResumedFont(font.filename, path, run.run_id)
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    size = None
+                if size is None or (font.size is not None and size != font.size):
+                    result.error = "copy is missing or changed; install the font again"
+                elif COPIED not in font.phases and not _valid_copy(path):
+                    result.error = "copy is incomplete; install the font again"
+                else:
+                    if COPIED not in font.phases:
+                        journal.copied(font.filename, size)
+                    if RESOURCE_ADDED not in font.phases:
+                        if backend.add_font_resource(path):
+                            journal.resource_added(font.filename)
+                            result.steps.append(RESOURCE_ADDED)
+                        else:
+                            result.error = "font rejected by Windows"
+                    if result.error is None and REGISTERED not in font.phases:
+                        name = font.name or (name_resolver or get_font_name_from_file)(path)
+                        writer.queue(name, font.filename)
+                        by_name[name] = result
+                        result.steps.append(REGISTERED)
+                results.append(result)
+            writer.flush()
+            for name, error in writer.failures:
+                if name in by_name:
+                    by_name[name].error = f"registry write failed: {error}"
+                    by_name[name].steps.remove(REGISTERED)
+            writer.failures.clear()
+            journal.end()
+    if any(result.steps for result in results):
+        backend.notify_font_change()
+    if on_font is not None:
+        for result in results:
+            on_font(result)
+    return results
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Resource limits for FontFlow archives.
+An archive's central directory is checked against ArchiveLimits before any
+member is decompressed: the number of members, the total and per-member
+uncompressed size, the compression ratio and how deeply member paths are
+nested. Member streams are then wrapped in a LimitedReader, which stops a
+member as soon as it produces more than its directory entry promised or than
+the limits allow, so a hostile archive can't fill the disk or memory.
+"""
+
+from typing import BinaryIO, Iterable, Optional
+
+# Generous for font libraries; an archive over them is almost certainly broken or hostile
+MAX_ARCHIVE_MEMBERS = 1_000_000
+# sfnt table offsets are 32-bit, so no font can be larger
+MAX_MEMBER_SIZE = 4 * 1024 ** 3
+MAX_ARCHIVE_SIZE = 16 * 1024 ** 3
+# Fonts deflate by 2-4x; zip bombs by hundreds or thousands
+MAX_COMPRESSION_RATIO = 100
+# The ratio is only checked for members at least this large; tiny files compress wildly
+RATIO_MIN_SIZE = 1024 * 1024
+MAX_PATH_DEPTH = 32
+
+
+class LimitExceeded(ValueError):
+    """An archive or member went over one of the ArchiveLimits.
+
+    limit is the name of the ArchiveLimits attribute that was exceeded, or
+    'declared_size' when a member produced more bytes than its directory
+    entry said it holds.
+    """
+
+    def __init__(self, limit: str, name: str, value, maximum):
+        self.limit = limit
+        self.name = name
+        self.value = value
+        self.maximum = maximum
+        super().__init__(f"{name}: {limit.replace('_', ' ')} limit exceeded ({value} > {maximum})")
+
+
+class ArchiveLimits:
+    """The resources one archive may use. Pass None for a limit to turn it off."""
+
+    def __init__(self, max_members: Optional[int] = MAX_ARCHIVE_MEMBERS,
+                 max_member_size: Optional[int] = MAX_MEMBER_SIZE,
+                 max_total_size: Optional[int] = MAX_ARCHIVE_SIZE,
+                 max_ratio: Optional[float] = MAX_COMPRESSION_RATIO,
+                 max_path_depth: Optional[int] = MAX_PATH_DEPTH,
+                 ratio_min_size: int = RATIO_MIN_SIZE):
+        self.max_members = max_members
+        self.max_member_size = max_member_size
+        self.max_total_size = max_total_size
+        self.max_ratio = max_ratio
+        self.max_path_depth = max_path_depth
+        self.ratio_min_size = ratio_min_size
+
+    @staticmethod
+    def _check(limit: str, name: str, value, maximum):
+        if maximum is not None and value > maximum:
+            raise LimitExceeded(limit, name, value, maximum)
+
+    def check_member(self, name: str, size: int, compressed_size: Optional[int] = None):
+        """Check one directory entry. compressed_size is None when it isn't known (e.g. tar)."""
+        self._check('max_path_depth', name, name.strip('/').count('/') + 1, self.max_path_depth)
+        self._check('max_member_size', name, size, self.max_member_size)
+        if compressed_size is not None and size >= self.ratio_min_size:
+            self._check('max_ratio', name, round(size / max(1, compressed_size), 1), self.max_ratio)
+
+    def check_directory(self, archive: str, infos: Iterable) -> int:
+        """Check a ZIP's directory (ZipInfo entries) before anything is decompressed.
+        Returns the archive's total uncompressed size."""
+        members = total = 0
+        for info in infos:
+            members += 1
+            total += info.file_size
+            self.check_member(info.filename, info.file_size, info.compress_size)
+        self.check_totals(archive, members, total)
+        return total
+
+    def check_totals(self, archive: str, members: int, total_size: int):
+        """Check an archive's member count and total uncompressed size, e.g. as a stream is read."""
+        self._check('max_members', archive, members, self.max_members)
+        self._check('max_total_size', archive, total_size, self.max_total_size)
+
+    def reader(self, stream: BinaryIO, name: str, size: int, compressed_size: Optional[int] = None) -> 'LimitedReader':
+        """Wrap a member's stream so it is stopped as soon as it breaks the limits."""
+        return LimitedReader(stream, self, name, size, compressed_size)
+
+
+class LimitedReader:
+    """A member stream that raises LimitExceeded once it produces more bytes than
+    its declared size, max_member_size, or max_ratio times its compressed size.
+
+    Bytes are counted by position, so re-reading after a seek isn't counted twice.
+    """
+
+    def __init__(self, stream: BinaryIO, limits: ArchiveLimits, name: str, size: int,
+                 compressed_size: Optional[int] = None):
+        self._stream = stream
+        self.name = name
+        self.position = 0
+        # The most this member may produce: what it declared, and no more than the limits allow
+        self._limits = [('declared_size', size)]
+        if limits.max_member_size is not None:
+            self._limits.append(('max_member_size', limits.max_member_size))
+        if limits.max_ratio is not None and compressed_size is not None:
+            self._limits.append(('max_ratio', max(limits.ratio_min_size, int(compressed_size * limits.max_ratio))))
+        self._ceiling = min(maximum for _, maximum in self._limits)
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        self.position += len(data)
+        if self.position > self._ceiling:
+            for limit, maximum in self._limits:
+                if self.position > maximum:
+                    raise LimitExceeded(limit, self.name, self.position, maximum)
+        return data
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        self.position = self._stream.seek(offset, whence)
+        return self.position
+
+    def tell(self) -> int:
+        return self.position
+
+    def close(self):
+        self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+DEFAULT_LIMITS = ArchiveLimits()
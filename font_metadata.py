@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Font metadata for FontFlow.
+A small, dependency-free OpenType/TrueType reader. It only reads the table
+directory and the tables it needs with a few seeks, so the cost of reading a
+font's names doesn't depend on the size of the font file. TrueType/OpenType
+collections are read face by face from the offsets in their `ttcf` header.
+"""
+
+import os
+import struct
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+
+# sfnt version tags of a single font
+SFNT_TRUETYPE = b'\x00\x01\x00\x00'
+SFNT_OPENTYPE_CFF = b'OTTO'
+SFNT_APPLE_TRUETYPE = b'true'
+SFNT_VERSIONS = (SFNT_TRUETYPE, SFNT_OPENTYPE_CFF, SFNT_APPLE_TRUETYPE)
+TTC_TAG = b'ttcf'
+
+# Real collections hold a few dozen faces at most
+MAX_COLLECTION_FACES = 4096
+
+NAME_FAMILY = 1
+NAME_SUBFAMILY = 2
+NAME_FULL = 4
+NAME_POSTSCRIPT = 6
+NAME_TYPOGRAPHIC_FAMILY = 16
+NAME_TYPOGRAPHIC_SUBFAMILY = 17
+WANTED_NAME_IDS = frozenset({NAME_FAMILY, NAME_SUBFAMILY, NAME_FULL, NAME_POSTSCRIPT,
+                             NAME_TYPOGRAPHIC_FAMILY, NAME_TYPOGRAPHIC_SUBFAMILY})
+
+# Name tables are a few KB; anything larger than this is not worth trusting
+MAX_NAME_TABLE_SIZE = 4 * 1024 * 1024
+
+LANGUAGE_EN_US = 0x409
+
+
+class FontFormatError(ValueError):
+    """The data is not a font FontFlow can read."""
+
+
+class FontNames:
+    """Names from a font's `name` table."""
+
+    def __init__(self, family: str = '', subfamily: str = '', full_name: str = '',
+                 postscript_name: str = '', sfnt_version: bytes = SFNT_TRUETYPE,
+                 face_index: int = 0, offset: int = 0):
+        self.family = family
+        self.subfamily = subfamily
+        self.full_name = full_name
+        self.postscript_name = postscript_name
+        self.sfnt_version = sfnt_version
+        self.face_index = face_index  # Position in a collection, 0 for single fonts
+        self.offset = offset          # Where the face's sfnt header starts in the file
+
+    @property
+    def display_name(self) -> str:
+        """Full name, falling back to family + subfamily."""
+        if self.full_name:
+            return self.full_name
+        if self.subfamily and self.subfamily.lower() != 'regular':
+            return f"{self.family} {self.subfamily}".strip()
+        return self.family or self.postscript_name
+
+    @property
+    def format_label(self) -> str:
+        return "OpenType" if self.sfnt_version == SFNT_OPENTYPE_CFF else "TrueType"
+
+    def registry_name(self) -> str:
+        """Value name Windows uses for the font in the Fonts registry key."""
+        return f"{self.display_name} ({self.format_label})"
+
+    def __repr__(self):
+        return (f"FontNames(family={self.family!r}, subfamily={self.subfamily!r}, "
+                f"full_name={self.full_name!r}, postscript_name={self.postscript_name!r})")
+
+
+def _read_exact(f: BinaryIO, offset: int, length: int) -> bytes:
+    f.seek(offset)
+    data = f.read(length)
+    if len(data) != length:
+        raise FontFormatError(f"unexpected end of file reading {length} bytes at {offset}")
+    return data
+
+
+def read_table_directory(f: BinaryIO, offset: int = 0) -> Tuple[bytes, Dict[bytes, Tuple[int, int, int]]]:
+    """Read the sfnt header at offset. Returns (sfnt version, {tag: (offset, length, checksum)})."""
+    sfnt_version, num_tables = struct.unpack('>4sH', _read_exact(f, offset, 6))
+    if sfnt_version not in SFNT_VERSIONS:
+        raise FontFormatError(f"not an sfnt font (version tag {sfnt_version!r})")
+    directory = _read_exact(f, offset + 12, num_tables * 16)
+    tables = {}
+    for tag, checksum, table_offset, length in struct.iter_unpack('>4sLLL', directory):
+        tables[tag] = (table_offset, length, checksum)
+    return sfnt_version, tables
+
+
+def _record_rank(platform_id: int, encoding_id: int, language_id: int) -> int:
+    # Lower is better: Windows Unicode English first, then any Windows Unicode,
+    # then Unicode platform, then Mac Roman English
+    if platform_id == 3 and encoding_id in (1, 10):
+        return 0 if language_id == LANGUAGE_EN_US else 1
+    if platform_id == 3 and encoding_id == 0:
+        return 2
+    if platform_id == 0:
+        return 3
+    if platform_id == 1 and encoding_id == 0:
+        return 4 if language_id == 0 else 5
+    return -1  # Encoding we can't decode
+
+
+def parse_name_table(data: bytes) -> Dict[int, str]:
+    """Decode the wanted name IDs from a `name` table, preferring platform 3/encoding 1."""
+    if len(data) < 6:
+        raise FontFormatError("name table too short")
+    _, count, string_offset = struct.unpack_from('>HHH', data, 0)
+    if 6 + count * 12 > len(data):
+        raise FontFormatError("name table records out of bounds")
+
+    best: Dict[int, Tuple[int, str]] = {}
+    for platform_id, encoding_id, language_id, name_id, length, offset in \
+            struct.iter_unpack('>HHHHHH', data[6:6 + count * 12]):
+        if name_id not in WANTED_NAME_IDS:
+            continue
+        rank = _record_rank(platform_id, encoding_id, language_id)
+        if rank < 0 or (name_id in best and best[name_id][0] <= rank):
+            continue
+        start = string_offset + offset
+        raw = data[start:start + length]
+        if len(raw) != length:
+            continue  # Points outside the table; ignore the record
+        encoding = 'mac_roman' if platform_id == 1 else 'utf-16-be'
+        best[name_id] = (rank, raw.decode(encoding, errors='replace').strip('\x00').strip())
+    return {name_id: value for name_id, (_, value) in best.items()}
+
+
+def read_font_names(f: BinaryIO, offset: int = 0, face_index: int = 0) -> FontNames:
+    """Read the names of the font whose sfnt header starts at offset in f."""
+    sfnt_version, tables = read_table_directory(f, offset)
+    if b'name' not in tables:
+        raise FontFormatError("font has no name table")
+    table_offset, length, _ = tables[b'name']
+    if length > MAX_NAME_TABLE_SIZE:
+        raise FontFormatError(f"name table is implausibly large ({length} bytes)")
+    names = parse_name_table(_read_exact(f, table_offset, length))
+    return FontNames(
+        family=names.get(NAME_TYPOGRAPHIC_FAMILY) or names.get(NAME_FAMILY, ''),
+        subfamily=names.get(NAME_TYPOGRAPHIC_SUBFAMILY) or names.get(NAME_SUBFAMILY, ''),
+        full_name=names.get(NAME_FULL, ''),
+        postscript_name=names.get(NAME_POSTSCRIPT, ''),
+        sfnt_version=sfnt_version,
+        face_index=face_index,
+        offset=offset
+    )
+
+
+def read_face_offsets(f: BinaryIO) -> List[int]:
+    """Return the sfnt header offset of every face: [0] for a single font,
+    the offsets from the `ttcf` header for a collection."""
+    tag = _read_exact(f, 0, 4)
+    if tag != TTC_TAG:
+        return [0]
+    _, _, num_fonts = struct.unpack('>HHL', _read_exact(f, 4, 8))
+    if not 0 < num_fonts <= MAX_COLLECTION_FACES:
+        raise FontFormatError(f"implausible number of faces in collection ({num_fonts})")
+    return list(struct.unpack(f'>{num_fonts}L', _read_exact(f, 12, num_fonts * 4)))
+
+
+def iter_font_faces(f: BinaryIO) -> Iterator[FontNames]:
+    """Yield the names of each face in a font or collection, reading one face at a time."""
+    for face_index, offset in enumerate(read_face_offsets(f)):
+        yield read_font_names(f, offset, face_index)
+
+
+def read_font_faces_from_file(font_path: str) -> List[FontNames]:
+    """Read the names of every face in a .ttf/.otf/.ttc/.otc file."""
+    with open(font_path, 'rb') as f:
+        return list(iter_font_faces(f))
+
+
+def registry_name_for_faces(faces: List[FontNames]) -> str:
+    """Windows-style registry value name, e.g. "Cambria & Cambria Math (TrueType)" for a collection."""
+    display_names = []
+    for face in faces:
+        if face.display_name and face.display_name not in display_names:
+            display_names.append(face.display_name)
+    if not display_names:
+        raise FontFormatError("font has no usable names")
+    return f"{' & '.join(display_names)} ({faces[0].format_label})"
+
+
+def read_font_names_from_file(font_path: str) -> FontNames:
+    """Read the names of a single-font .ttf/.otf file."""
+    with open(font_path, 'rb') as f:
+        return read_font_names(f)
+
+
+def _name_from_filename(font_path: str) -> str:
+    # Used when the font can't be parsed: derive a name from the file name
+    font_filename = os.path.basename(font_path)
+    font_name_base = os.path.splitext(font_filename)[0]
+
+    # Clean up common font filename patterns
+    font_name_base = font_name_base.replace('_', ' ').replace('-', ' ')
+
+    # Determine font type and create proper registry name
+    ext = os.path.splitext(font_filename)[1].lower()
+    if ext == '.otf':
+        return f"{font_name_base} (OpenType)"
+    elif ext in ['.ttc', '.otc']:
+        return f"{font_name_base} (TrueType Collection)" if ext == '.ttc' else f"{font_name_base} (OpenType Collection)"
+    else:
+        return f"{font_name_base} (TrueType)"
+
+
+def get_font_name_from_stream(f: BinaryIO, filename: str) -> str:
+    """Registry name of the font in a seekable stream; filename is used if it can't be parsed."""
+    try:
+        return registry_name_for_faces(list(iter_font_faces(f)))
+    except (OSError, FontFormatError, struct.error):
+        return _name_from_filename(filename)
+
+
+def get_font_name_from_file(font_path: str) -> str:
+    """Extract the actual font name from the font file for better registry registration."""
+    try:
+        with open(font_path, 'rb') as f:
+            return get_font_name_from_stream(f, font_path)
+    except OSError:
+        return _name_from_filename(font_path)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Staged pipeline for FontFlow.
+Items pass through a list of stages, each running on its own threads with a
+bounded queue in front of it. A slow stage fills its queue and stops the
+stages before it (back-pressure) instead of letting work pile up in memory,
+and the stages overlap, so a run takes about as long as its slowest stage.
+Every stage keeps queue-depth and latency metrics.
+"""
+
+import time
+import queue
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+DEFAULT_STAGE_QUEUE_SIZE = 8
+
+_STOP = object()
+
+
+class StageMetrics:
+    """Counters for one stage. Updated by its workers under a lock."""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0          # Seconds spent in the stage function, summed over workers
+        self.max_latency = 0.0   # Longest single call
+        self.wait = 0.0          # Seconds items spent queued in front of the stage
+        self.queue_max = 0       # Deepest the input queue got
+        self._queue_total = 0    # Sum of the depths seen by every put, for the mean
+        self._lock = threading.Lock()
+
+    def queued(self, depth: int):
+        with self._lock:
+            self.queue_max = max(self.queue_max, depth)
+            self._queue_total += depth
+
+    def done(self, waited: float, latency: float):
+        with self._lock:
+            self.items += 1
+            self.wait += waited
+            self.busy += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def as_dict(self, elapsed: Optional[float] = None) -> dict:
+        items = max(1, self.items)
+        report = {
+            'workers': self.workers,
+            'items': self.items,
+            'mean_latency_ms': round(self.busy / items * 1000, 3),
+            'max_latency_ms': round(self.max_latency * 1000, 3),
+            'mean_wait_ms': round(self.wait / items * 1000, 3),
+            'queue_max': self.queue_max,
+            'queue_mean': round(self._queue_total / items, 2),
+            'busy_s': round(self.busy, 3),
+        }
+        if elapsed:
+            # Share of the run the stage's workers were busy; the bottleneck is close to 1
+            report['utilization'] = round(self.busy / (elapsed * self.workers), 3)
+        return report
+
+
+class Stage:
+    """One step of a pipeline: func(item) -> item, run on `workers` threads."""
+
+    def __init__(self, name: str, func: Callable, workers: int = 1, queue_size: int = DEFAULT_STAGE_QUEUE_SIZE):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+
+
+class _Failed:
+    # An exception raised by a stage, carried to the output in the item's place
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class Pipeline:
+    """Runs items through stages and yields the results in input order.
+
+    At most `window` items are inside the pipeline at once: when run() asks
+    its input for the next item, only the last `window` items taken may still
+    be in progress. An exception raised by a stage is re-raised by
+    run() at that item's place in the output.
+    """
+
+    def __init__(self, stages: List[Stage], window: Optional[int] = None):
+        if not stages:
+            raise ValueError("a pipeline needs at least one stage")
+        self.stages = stages
+        self.window = window or 2 * sum(stage.workers for stage in stages)
+        self.metrics: Dict[str, StageMetrics] = {stage.name: StageMetrics(stage.name, stage.workers)
+                                                 for stage in stages}
+        self.elapsed = 0.0
+
+    def report(self) -> Dict[str, dict]:
+        """Per-stage metrics of the last run, by stage name."""
+        return {name: metrics.as_dict(self.elapsed) for name, metrics in self.metrics.items()}
+
+    def run(self, items: Iterable) -> Iterator:
+        start = time.perf_counter()
+        abort = threading.Event()
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        output = queue.Queue()  # Never holds more than window items
+        threads = []
+
+        def put(q, metrics, entry) -> bool:
+            if metrics is not None:
+                metrics.queued(q.qsize())
+            while not abort.is_set():
+                try:
+                    q.put(entry, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def worker(index, remaining):
+            stage = self.stages[index]
+            metrics = self.metrics[stage.name]
+            inbox = queues[index]
+            outbox = queues[index + 1] if index + 1 < len(queues) else output
+            next_metrics = self.metrics[self.stages[index + 1].name] if index + 1 < len(queues) else None
+            while not abort.is_set():
+                try:
+                    entry = inbox.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if entry is _STOP:
+                    # The last worker of a stage passes the stop on to the next stage
+                    with remaining[1]:
+                        remaining[0] -= 1
+                        last = remaining[0] == 0
+                    if last:
+                        if outbox is output:
+                            output.put(_STOP)
+                        else:
+                            for _ in range(self.stages[index + 1].workers):
+                                put(outbox, None, _STOP)
+                    return
+                sequence, item, queued_at = entry
+                began = time.perf_counter()
+                if not isinstance(item, _Failed):
+                    try:
+                        item = stage.func(item)
+                    except Exception as e:
+                        item = _Failed(e)
+                finished = time.perf_counter()
+                metrics.done(began - queued_at, finished - began)
+                if not put(outbox, next_metrics, (sequence, item, finished)):
+                    return
+
+        for index, stage in enumerate(self.stages):
+            remaining = [stage.workers, threading.Lock()]
+            for n in range(stage.workers):
+                thread = threading.Thread(target=worker, args=(index, remaining),
+                                          name=f'fontflow-{stage.name}-{n}', daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        ready = {}
+        taken = delivered = 0
+
+        def collect(block: bool):
+            # Move finished items into ready; block until at least one arrives if asked to
+            while True:
+                try:
+                    entry = output.get(block=block)
+                except queue.Empty:
+                    return
+                block = False
+                if entry is not _STOP:
+                    ready[entry[0]] = entry[1]
+
+        def deliver():
+            # Yield the finished items that are next in input order
+            nonlocal delivered
+            while delivered in ready:
+                item = ready.pop(delivered)
+                delivered += 1
+                yield self._unwrap(item)
+
+        first_metrics = self.metrics[self.stages[0].name]
+        finished_cleanly = False
+        try:
+            for item in items:
+                while taken - delivered >= self.window:
+                    collect(block=delivered not in ready)
+                    yield from deliver()
+                put(queues[0], first_metrics, (taken, item, time.perf_counter()))
+                taken += 1
+                collect(block=False)
+                yield from deliver()
+            for _ in range(self.stages[0].workers):
+                put(queues[0], None, _STOP)
+            while delivered < taken:
+                collect(block=delivered not in ready)
+                yield from deliver()
+            finished_cleanly = True
+        finally:
+            # Normal end: the stop has gone through every stage. Stopped early: abort the workers
+            if not finished_cleanly:
+                abort.set()
+            for thread in threads:
+                thread.join()
+            self.elapsed = time.perf_counter() - start
+
+    @staticmethod
+    def _unwrap(item):
+        if isinstance(item, _Failed):
+            raise item.error
+        return item
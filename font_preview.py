@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Archive previews for FontFlow.
+What a selected archive holds (fonts by format, their uncompressed size and
+the other files that come with them) is read from its ZIP central directory
+only; no member is decompressed. The directory is read in one go and parsed
+in place, without the ZipInfo object zipfile builds for every entry, since a
+preview only needs each entry's name suffix and sizes. PreviewScan does this
+on a background thread for the archives just picked and can be cancelled when
+the selection changes; with a scan cache, unchanged archives aren't read at all.
+Tarballs have no directory, so their member headers are read as a stream.
+"""
+
+import os
+import struct
+import tarfile
+import zipfile
+import threading
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from font_archives import FONT_EXTENSIONS, NESTED_ARCHIVE_EXTENSIONS, TAR_EXTENSIONS, SuffixFilter
+
+# A long directory is checked for cancellation every this many entries
+CANCEL_CHECK_INTERVAL = 4096
+
+# ZIP records (APPNOTE 4.3), the same layouts zipfile uses
+_END_RECORD = struct.Struct('<4s4H2LH')
+_END_RECORD64_LOCATOR = struct.Struct('<4sLQL')
+_END_RECORD64 = struct.Struct('<4sQ2H2L4Q')
+_CENTRAL_HEADER = struct.Struct('<4s4B4HL2L5H2L')
+_END_SIGNATURE = b'PK\x05\x06'
+_END64_LOCATOR_SIGNATURE = b'PK\x06\x07'
+_END64_SIGNATURE = b'PK\x06\x06'
+_CENTRAL_SIGNATURE = b'PK\x01\x02'
+_ZIP64_EXTRA = 0x0001
+_MAX_COMMENT = 0xFFFF
+_ZIP64_LIMIT = 0xFFFFFFFF
+
+
+def _find_central_directory(f: BinaryIO) -> Tuple[int, int, int]:
+    # (offset, size, entries) of the central directory, found from the end record
+    file_size = f.seek(0, os.SEEK_END)
+    tail_size = min(file_size, _END_RECORD.size + _MAX_COMMENT + _END_RECORD64_LOCATOR.size + _END_RECORD64.size)
+    f.seek(file_size - tail_size)
+    tail = f.read(tail_size)
+    end = tail.rfind(_END_SIGNATURE)
+    if end < 0 or end + _END_RECORD.size > len(tail):
+        raise zipfile.BadZipFile("File is not a zip file")
+    _, _, _, _, entries, size, offset, _ = _END_RECORD.unpack_from(tail, end)
+    record_start = end  # Where the directory ends, relative to tail
+    locator = end - _END_RECORD64_LOCATOR.size
+    if locator >= 0 and tail[locator:locator + 4] == _END64_LOCATOR_SIGNATURE:
+        record64 = locator - _END_RECORD64.size
+        if record64 < 0 or tail[record64:record64 + 4] != _END64_SIGNATURE:
+            raise zipfile.BadZipFile("Corrupt zip64 end of central directory record")
+        _, _, _, _, _, _, _, entries, size, offset = _END_RECORD64.unpack_from(tail, record64)
+        record_start = record64
+    # The directory sits right before the end record; offset may be off if data was
+    # prepended to the archive (self-extracting ZIPs), so the position is trusted instead
+    directory_end = file_size - tail_size + record_start
+    if size > directory_end:
+        raise zipfile.BadZipFile("Bad central directory size")
+    return directory_end - size, size, entries
+
+
+def _zip64_sizes(extra: bytes, file_size: int, compress_size: int) -> Tuple[int, int]:
+    # Sizes too big for the header are in the zip64 extra field, in this order
+    position = 0
+    while position + 4 <= len(extra):
+        tag, length = struct.unpack_from('<HH', extra, position)
+        if tag == _ZIP64_EXTRA:
+            values = iter(struct.unpack_from(f'<{min(length, 24) // 8}Q', extra, position + 4))
+            if file_size == _ZIP64_LIMIT:
+                file_size = next(values)
+            if compress_size == _ZIP64_LIMIT:
+                compress_size = next(values)
+            return file_size, compress_size
+        position += 4 + length
+    raise zipfile.BadZipFile("Missing zip64 sizes")
+
+
+def _read_directory(path: str) -> Tuple[bytes, int]:
+    with open(path, 'rb') as f:
+        offset, size, entries = _find_central_directory(f)
+        f.seek(offset)
+        return f.read(size), entries
+
+
+def central_directory_bytes(path: str) -> bytes:
+    """The raw central directory of a ZIP. Raises zipfile.BadZipFile if it isn't a ZIP."""
+    return _read_directory(path)[0]
+
+
+def read_central_directory(path: str) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (raw name, uncompressed size, compressed size) for every entry of a ZIP,
+    from its central directory. Raises zipfile.BadZipFile if it isn't a ZIP."""
+    directory, entries = _read_directory(path)
+    position = 0
+    header_size = _CENTRAL_HEADER.size
+    for _ in range(entries):
+        if position + header_size > len(directory):
+            raise zipfile.BadZipFile("Truncated central directory")
+        (signature, _, _, _, _, _, _, _, _, _, compress_size, file_size,
+         name_length, extra_length, comment_length, _, _, _, _) = _CENTRAL_HEADER.unpack_from(directory, position)
+        if signature != _CENTRAL_SIGNATURE:
+            raise zipfile.BadZipFile("Bad magic number for central directory")
+        name_start = position + header_size
+        extra_start = name_start + name_length
+        if file_size == _ZIP64_LIMIT or compress_size == _ZIP64_LIMIT:
+            file_size, compress_size = _zip64_sizes(directory[extra_start:extra_start + extra_length],
+                                                    file_size, compress_size)
+        yield directory[name_start:extra_start], file_size, compress_size
+        position = extra_start + extra_length + comment_length
+
+
+class ArchivePreview:
+    """What one archive holds, from its central directory."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fonts: Dict[str, int] = {}  # Font members by suffix, e.g. {'.ttf': 12, '.otf': 6}
+        self.font_bytes = 0              # Uncompressed size of the fonts
+        self.archives = 0                # Inner archives (their fonts are counted when installing)
+        self.other_files = 0             # Everything else: licences, specimens, ...
+        self.other_bytes = 0
+
+    @property
+    def font_count(self) -> int:
+        return sum(self.fonts.values())
+
+    def formats(self) -> str:
+        """Font counts by format, most common first, e.g. "12 TTF, 6 OTF"."""
+        counts = sorted(self.fonts.items(), key=lambda item: (-item[1], item[0]))
+        return ", ".join(f"{count} {suffix.lstrip('.').upper()}" for suffix, count in counts)
+
+    def to_json(self, extensions) -> dict:
+        return {'extensions': sorted(extensions), 'fonts': self.fonts, 'font_bytes': self.font_bytes,
+                'archives': self.archives, 'other_files': self.other_files, 'other_bytes': self.other_bytes}
+
+    @classmethod
+    def from_json(cls, path: str, data: dict) -> 'ArchivePreview':
+        preview = cls(path)
+        preview.fonts = dict(data['fonts'])
+        preview.font_bytes = data['font_bytes']
+        preview.archives = data['archives']
+        preview.other_files = data['other_files']
+        preview.other_bytes = data['other_bytes']
+        return preview
+
+    def __repr__(self):
+        return f"ArchivePreview({self.path!r}, fonts={self.fonts}, other_files={self.other_files})"
+
+
+def preview_archive(path: str, extensions=FONT_EXTENSIONS,
+                    cancelled: Optional[Callable[[], bool]] = None, cache=None) -> Optional[ArchivePreview]:
+    """Preview a ZIP (or a loose font file) from its central directory, or a tarball
+    from its member headers (which means decompressing it).
+
+    With a font_scan_cache.ScanCache, an unchanged archive's preview comes from
+    the cache and a new one is stored there. Returns None if cancelled() became
+    true while the directory was read.
+    """
+    if cache is not None:
+        manifest = cache.manifest(path)
+        cached = manifest.preview
+        if cached is not None and cached.get('extensions') == sorted(extensions):
+            return ArchivePreview.from_json(path, cached)
+        preview = _preview_archive(path, extensions, cancelled)
+        if preview is not None:
+            manifest.preview = preview.to_json(extensions)
+        return preview
+    return _preview_archive(path, extensions, cancelled)
+
+
+def _preview_archive(path: str, extensions, cancelled: Optional[Callable[[], bool]]) -> Optional[ArchivePreview]:
+    preview = ArchivePreview(path)
+    suffix = SuffixFilter(extensions).match(path)
+    if suffix is not None:
+        preview.fonts[suffix] = 1
+        preview.font_bytes = os.path.getsize(path)
+        return preview
+    if SuffixFilter(TAR_EXTENSIONS).match(path) is not None:
+        return _preview_tar(preview, extensions, cancelled)
+    # Names are matched as raw bytes: suffixes are ASCII in every encoding ZIPs use
+    font_suffixes = {extension.encode('ascii') for extension in extensions}
+    suffixes = SuffixFilter(font_suffixes | {extension.encode('ascii') for extension in NESTED_ARCHIVE_EXTENSIONS})
+    fonts: Dict[bytes, int] = {}
+    for index, (name, file_size, _) in enumerate(read_central_directory(path)):
+        if cancelled is not None and index % CANCEL_CHECK_INTERVAL == 0 and cancelled():
+            return None
+        suffix = suffixes.match(name)
+        if suffix is None:
+            if not name.endswith(b'/'):  # Folder entries aren't files
+                preview.other_files += 1
+                preview.other_bytes += file_size
+        elif suffix in font_suffixes:
+            fonts[suffix] = fonts.get(suffix, 0) + 1
+            preview.font_bytes += file_size
+        else:
+            preview.archives += 1
+    preview.fonts = {suffix.decode('ascii'): count for suffix, count in fonts.items()}
+    return preview
+
+
+def _preview_tar(preview: ArchivePreview, extensions,
+                 cancelled: Optional[Callable[[], bool]]) -> Optional[ArchivePreview]:
+    # Inner archives of a tarball aren't opened when installing, so they count as other files
+    suffixes = SuffixFilter(extensions)
+    with tarfile.open(preview.path, 'r|*') as tar:
+        for member in tar:
+            if cancelled is not None and cancelled():
+                return None
+            if not member.isfile():
+                continue
+            suffix = suffixes.match(member.name)
+            if suffix is None:
+                preview.other_files += 1
+                preview.other_bytes += member.size
+            else:
+                preview.fonts[suffix] = preview.fonts.get(suffix, 0) + 1
+                preview.font_bytes += member.size
+    return preview
+
+
+class PreviewScan:
+    """Previews archives one after another on a background thread.
+
+    on_preview(path, preview, error) is called on that thread for each archive,
+    with error set instead of preview if it couldn't be read. Once cancel()
+    returns, only a callback already under way can still finish; the archive
+    being read is abandoned at the next check.
+    """
+
+    def __init__(self, paths: Iterable[str],
+                 on_preview: Callable[[str, Optional[ArchivePreview], Optional[Exception]], None],
+                 extensions=FONT_EXTENSIONS, on_done: Optional[Callable[[], None]] = None, cache=None):
+        self.paths = list(paths)
+        self.on_preview = on_preview
+        self.extensions = extensions
+        self.on_done = on_done
+        self.cache = cache
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'PreviewScan':
+        self._thread = threading.Thread(target=self._scan, name='fontflow-preview', daemon=True)
+        self._thread.start()
+        return self
+
+    def _scan(self):
+        try:
+            for path in self.paths:
+                if self._cancel.is_set():
+                    return
+                try:
+                    preview = preview_archive(path, self.extensions, self._cancel.is_set, self.cache)
+                    error = None
+                except Exception as e:
+                    preview, error = None, e
+                if self._cancel.is_set():
+                    return
+                self.on_preview(path, preview, error)
+        finally:
+            if self.on_done is not None:
+                self.on_done()
+
+    def cancel(self):
+        """Stop scanning; results not delivered yet are dropped."""
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the scan to end. Returns False if it is still running after timeout."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+
+def expect_totals(progress, paths: Iterable[str], extensions=FONT_EXTENSIONS, cache=None) -> int:
+    """Count the fonts of the given archives and font files in a TransferProgress before
+    they are installed, so its total is known up front. Returns how many were counted.
+
+    ZIPs are read from their central directories and loose fonts from their
+    size. A compressed tarball is only counted if the scan cache has its
+    preview, since reading its headers means decompressing it. Folders, and
+    paths that can't be read, count as their fonts are found.
+    """
+    counted = 0
+    tar_suffixes = SuffixFilter(TAR_EXTENSIONS)
+    for path in paths:
+        try:
+            if not os.path.isfile(path):
+                continue
+            tar_suffix = tar_suffixes.match(path)
+            if tar_suffix is not None and tar_suffix != '.tar':
+                manifest = cache.get(path) if cache is not None else None
+                cached = manifest.preview if manifest is not None else None
+                if cached is None or cached.get('extensions') != sorted(extensions):
+                    continue
+            preview = preview_archive(path, extensions, cache=cache)
+        except (OSError, ValueError, zipfile.BadZipFile, tarfile.TarError):
+            continue
+        progress.expect(path, preview.font_bytes, preview.font_count)
+        counted += 1
+    return counted
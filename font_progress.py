@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Progress reporting for FontFlow.
+Worker threads post status updates into a UiUpdateChannel instead of
+scheduling a Tk callback per font. A UiUpdatePump drains the channel on a
+fixed-interval Tk timer, so the number of Tk callbacks depends on how long a
+run takes, not on how many fonts it installs.
+
+TransferProgress counts the bytes of a run against the total known from the
+archives' central directories before the run starts, with throughput and an
+ETA from a moving average.
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 20 UI refreshes per second is smooth enough for a status line
+DEFAULT_UI_INTERVAL_MS = 50
+
+# Throughput is averaged over this many seconds, so the ETA follows the
+# current speed without jumping on every font
+RATE_WINDOW = 5.0
+
+
+class UiUpdates:
+    """What a drain of the channel returned."""
+
+    def __init__(self, status: Optional[str], counters: Dict[str, int], actions: List[Callable[[], None]],
+                 closed: bool):
+        self.status = status      # Latest status text, or None if it didn't change
+        self.counters = counters  # Running totals of every counter
+        self.actions = actions    # One-off UI actions (dialogs, button states), in posting order
+        self.closed = closed      # The worker is done; nothing more will be posted
+
+
+class UiUpdateChannel:
+    """Thread-safe mailbox between worker threads and the UI thread.
+
+    Status updates are coalesced (only the latest is kept) and counters are
+    summed, so posting costs the same whether the UI keeps up or not. Actions
+    posted with call() are never coalesced.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._status: Optional[str] = None
+        self._counters: Dict[str, int] = {}
+        self._actions: List[Callable[[], None]] = []
+        self._closed = False
+        self.posted = 0  # Updates posted by workers
+
+    def set_status(self, text: str):
+        with self._lock:
+            self._status = text
+            self.posted += 1
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+            self.posted += 1
+
+    def call(self, action: Callable[[], None]):
+        """Run action on the UI thread at the next drain."""
+        with self._lock:
+            self._actions.append(action)
+            self.posted += 1
+
+    def close(self):
+        """Mark the end of the run; the pump stops after the next drain."""
+        with self._lock:
+            self._closed = True
+
+    def drain(self) -> UiUpdates:
+        with self._lock:
+            updates = UiUpdates(self._status, dict(self._counters), self._actions, self._closed)
+            self._status = None
+            self._actions = []
+        return updates
+
+
+class UiUpdatePump:
+    """Applies a channel's updates on the UI thread every interval_ms.
+
+    root only needs Tk's after(ms, callback). on_status(status, counters) is
+    called once per tick at most, with the latest status; on_tick, if given,
+    is called on every tick. tk_callbacks counts
+    the timer callbacks scheduled, which is what the Tk event queue sees.
+    """
+
+    def __init__(self, root, channel: UiUpdateChannel, on_status: Callable[[str, Dict[str, int]], None],
+                 interval_ms: int = DEFAULT_UI_INTERVAL_MS, on_tick: Optional[Callable[[], None]] = None):
+        self.root = root
+        self.channel = channel
+        self.on_status = on_status
+        self.interval_ms = interval_ms
+        self.on_tick = on_tick  # Called every tick, e.g. to redraw a progress bar
+        self.tk_callbacks = 0
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self._schedule()
+
+    def _schedule(self):
+        self.tk_callbacks += 1
+        self.root.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        updates = self.channel.drain()
+        try:
+            if updates.status is not None:
+                self.on_status(updates.status, updates.counters)
+            if self.on_tick is not None:
+                self.on_tick()
+            for action in updates.actions:
+                action()
+        finally:
+            if updates.closed:
+                self.running = False
+            else:
+                self._schedule()
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+class ProgressSnapshot:
+    """Progress of a run at one moment."""
+
+    def __init__(self, bytes_done: int, bytes_total: int, bytes_extracted: int, position: int,
+                 fonts_done: int, fonts_total: int, elapsed: float, rate: Optional[float]):
+        self.bytes_done = bytes_done            # Bytes of fonts finished (installed, skipped or failed)
+        self.bytes_total = bytes_total          # Uncompressed bytes of the fonts expected or found
+        self.bytes_extracted = bytes_extracted  # Bytes read out of archives so far
+        self.position = position                # Bytes done plus bytes of fonts still being copied
+        self.fonts_done = fonts_done
+        self.fonts_total = fonts_total
+        self.elapsed = elapsed
+        self.rate = rate                        # Bytes per second over the last RATE_WINDOW, or None
+
+    @property
+    def fraction(self) -> float:
+        if self.bytes_total <= 0:
+            return 0.0
+        return min(1.0, self.position / self.bytes_total)
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds left at the current rate, or None until there is a rate."""
+        if not self.rate:
+            return None
+        return max(0, self.bytes_total - self.position) / self.rate
+
+    def describe(self) -> str:
+        """E.g. "12.0 / 240.0 MB  ·  45.2 MB/s  ·  ETA 0:05"."""
+        mb = 1024 * 1024
+        parts = [f"{self.position / mb:.1f} / {self.bytes_total / mb:.1f} MB"]
+        if self.rate:
+            parts.append(f"{self.rate / mb:.1f} MB/s")
+            parts.append(f"ETA {format_duration(self.eta)}")
+        return "  ·  ".join(parts)
+
+    def as_dict(self) -> dict:
+        return {
+            'bytes_done': self.bytes_done,
+            'bytes_total': self.bytes_total,
+            'bytes_extracted': self.bytes_extracted,
+            'fonts_done': self.fonts_done,
+            'fonts_total': self.fonts_total,
+            'elapsed_s': round(self.elapsed, 3),
+            'bytes_per_s': round(self.rate) if self.rate else None,
+            'eta_s': round(self.eta, 1) if self.eta is not None else None
+        }
+
+
+class TransferProgress:
+    """Thread-safe byte and font counters for an install run.
+
+    Totals can be known before the run: expect() counts an archive's fonts
+    from its preview, and the fonts add_total() then reports for the same key
+    only add what goes beyond that estimate, until settle() replaces it with
+    what the archive actually held. Archives that weren't expected add to the
+    totals as they are opened. Bytes are counted while
+    fonts are copied out of their archives (extracted) and each font counts in
+    full when it finishes (font_done), whether it was installed, skipped or
+    failed. The rate is a moving average over the last `window` seconds.
+    """
+
+    def __init__(self, window: float = RATE_WINDOW, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._start = clock()
+        self._bytes_total = 0
+        self._fonts_total = 0
+        self._bytes_done = 0
+        self._fonts_done = 0
+        self._bytes_extracted = 0
+        self._extracted_done = 0  # Extracted bytes that belong to finished fonts
+        self._samples = deque([(self._start, 0)])  # (time, position)
+        self._expected: Dict[str, Tuple[int, int]] = {}  # key -> (bytes, fonts) estimated
+        self._found: Dict[str, Tuple[int, int]] = {}     # key -> (bytes, fonts) reported so far
+
+    def expect(self, key: str, size: int, fonts: int = 0):
+        """Count an archive's fonts in the totals before it is opened. A key expected twice counts once."""
+        with self._lock:
+            if key in self._expected:
+                return
+            self._expected[key] = (size, fonts)
+            self._bytes_total += size
+            self._fonts_total += fonts
+
+    def add_total(self, size: int, fonts: int = 0, key: Optional[str] = None):
+        with self._lock:
+            if key not in self._expected:
+                self._bytes_total += size
+                self._fonts_total += fonts
+                return
+            expected_size, expected_fonts = self._expected[key]
+            found_size, found_fonts = self._found.get(key, (0, 0))
+            self._found[key] = (found_size + size, found_fonts + fonts)
+            # Only what goes beyond the estimate is new
+            self._bytes_total += max(expected_size, found_size + size) - max(expected_size, found_size)
+            self._fonts_total += max(expected_fonts, found_fonts + fonts) - max(expected_fonts, found_fonts)
+
+    def settle(self, key: str):
+        """The archive is done (or failed): its totals become what add_total() reported for it."""
+        with self._lock:
+            if key not in self._expected:
+                return
+            expected_size, expected_fonts = self._expected.pop(key)
+            found_size, found_fonts = self._found.pop(key, (0, 0))
+            self._bytes_total -= max(0, expected_size - found_size)
+            self._fonts_total -= max(0, expected_fonts - found_fonts)
+
+    def extracted(self, size: int):
+        with self._lock:
+            self._bytes_extracted += size
+            self._sample()
+
+    def font_done(self, size: int, extracted: int = 0):
+        """A font of size bytes finished, after `extracted` of its bytes were reported."""
+        with self._lock:
+            self._bytes_done += size
+            self._fonts_done += 1
+            self._extracted_done += extracted
+            self._sample()
+
+    def _position(self) -> int:
+        return self._bytes_done + self._bytes_extracted - self._extracted_done
+
+    def _sample(self):
+        now = self.clock()
+        self._samples.append((now, self._position()))
+        # Keep one sample older than the window so the average spans all of it
+        while len(self._samples) > 2 and self._samples[1][0] <= now - self.window:
+            self._samples.popleft()
+
+    def snapshot(self) -> ProgressSnapshot:
+        with self._lock:
+            now = self.clock()
+            first_time, first_position = self._samples[0]
+            position = self._position()
+            span = now - first_time
+            rate = (position - first_position) / span if span > 0 and position > first_position else None
+            return ProgressSnapshot(self._bytes_done, self._bytes_total, self._bytes_extracted, position,
+                                    self._fonts_done, self._fonts_total, now - self._start, rate)
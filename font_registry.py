@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Registry access for FontFlow.
+WinRegistry talks to the real Windows registry; MemoryRegistry implements the
+same interface in memory so registry logic can be exercised on any platform.
+"""
+
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import winreg
+except ImportError:
+    winreg = None  # Not on Windows; only MemoryRegistry is usable
+
+FONTS_REGISTRY_KEY = r"SOFTWARE\Microsoft\Windows NT\CurrentVersion\Fonts"
+
+HKLM = 'HKLM'
+HKCU = 'HKCU'
+
+
+class WinRegistry:
+    """Registry access through winreg. Hives are named 'HKLM' or 'HKCU'."""
+
+    def _hive(self, hive: str):
+        return winreg.HKEY_LOCAL_MACHINE if hive == HKLM else winreg.HKEY_CURRENT_USER
+
+    def open_key(self, hive: str, path: str, write: bool = False):
+        access = winreg.KEY_SET_VALUE if write else winreg.KEY_READ
+        return winreg.OpenKey(self._hive(hive), path, 0, access)
+
+    def close_key(self, key):
+        key.Close()
+
+    def set_value(self, key, name: str, value: str):
+        winreg.SetValueEx(key, name, 0, winreg.REG_SZ, value)
+
+    def delete_value(self, key, name: str):
+        """Delete a value; FileNotFoundError if there is none."""
+        winreg.DeleteValue(key, name)
+
+    def query_info(self, key) -> Tuple[int, int]:
+        """Return (number of values, last write time) of an open key."""
+        _, value_count, last_write = winreg.QueryInfoKey(key)
+        return value_count, last_write
+
+    def enum_values(self, key) -> Iterator[Tuple[str, str]]:
+        """Yield (name, data) for every value of an open key."""
+        index = 0
+        while True:
+            try:
+                name, data, _ = winreg.EnumValue(key, index)
+            except OSError:
+                return  # ERROR_NO_MORE_ITEMS
+            yield name, data
+            index += 1
+
+
+class _MemoryKey(dict):
+    last_write = 0
+
+
+class MemoryRegistry:
+    """In-memory registry with the WinRegistry interface.
+
+    Keys are created when first opened for writing; opening a missing key for
+    reading raises FileNotFoundError, like winreg.
+    """
+
+    def __init__(self):
+        self.keys: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self.opens = 0
+        self._writes = 0
+
+    def open_key(self, hive: str, path: str, write: bool = False):
+        self.opens += 1
+        if not write and (hive, path.lower()) not in self.keys:
+            raise FileNotFoundError(f"{hive}\\{path}")
+        return self.keys.setdefault((hive, path.lower()), _MemoryKey())
+
+    def close_key(self, key):
+        pass
+
+    def set_value(self, key, name: str, value: str):
+        key[name] = value
+        self._writes += 1
+        key.last_write = self._writes
+
+    def delete_value(self, key, name: str):
+        if name not in key:
+            raise FileNotFoundError(name)
+        del key[name]
+        self._writes += 1
+        key.last_write = self._writes
+
+    def query_info(self, key) -> Tuple[int, int]:
+        return len(key), key.last_write
+
+    def enum_values(self, key) -> Iterator[Tuple[str, str]]:
+        yield from list(key.items())
+
+    def values(self, hive: str, path: str) -> Dict[str, str]:
+        """Return the values stored under a key (empty if it doesn't exist)."""
+        return self.keys.get((hive, path.lower()), {})
+
+
+class RegistryWriter:
+    """Holds a registry key open for a whole install run and writes values in bulk.
+
+    Values are queued and written every flush_size entries and on close;
+    deletions (queue_delete) go through the same batches, and a value that is
+    already gone counts as deleted. A value that can't be written or deleted
+    is recorded in failures and the rest of the batch carries on.
+    on_written(name, value), if set, is called for every value once it has
+    been written.
+    """
+
+    def __init__(self, registry, hive: str, path: str, flush_size: int = 256):
+        self.registry = registry
+        self.hive = hive
+        self.path = path
+        self.flush_size = flush_size
+        self.failures: List[Tuple[str, Exception]] = []
+        self.written = 0
+        self.deleted = 0
+        self._key = None
+        self._pending: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+        self.on_written: Optional[Callable[[str, str], None]] = None
+
+    def queue(self, name: str, value: Optional[str]):
+        """Queue a value, writing the batch once flush_size values are waiting."""
+        with self._lock:
+            self._pending.append((name, value))
+            if len(self._pending) >= self.flush_size:
+                self._flush_locked()
+
+    def queue_delete(self, name: str):
+        """Queue the deletion of a value, in the same batches as writes."""
+        self.queue(name, None)
+
+    def flush(self) -> List[Tuple[str, Exception]]:
+        """Write all queued values and return the ones that failed in this batch."""
+        with self._lock:
+            return self._flush_locked()
+
+    def _flush_locked(self) -> List[Tuple[str, Exception]]:
+        batch, self._pending = self._pending, []
+        if not batch:
+            return []
+        failed = []
+        try:
+            if self._key is None:
+                self._key = self.registry.open_key(self.hive, self.path, write=True)
+        except Exception as e:
+            # Can't write anything without the key; a later flush tries again
+            failed = [(name, e) for name, _ in batch]
+        else:
+            for name, value in batch:
+                try:
+                    if value is None:
+                        try:
+                            self.registry.delete_value(self._key, name)
+                        except FileNotFoundError:
+                            pass  # Already gone
+                        self.deleted += 1
+                        continue
+                    self.registry.set_value(self._key, name, value)
+                    self.written += 1
+                    if self.on_written is not None:
+                        self.on_written(name, value)
+                except Exception as e:
+                    failed.append((name, e))
+        self.failures.extend(failed)
+        return failed
+
+    def close(self):
+        """Flush remaining values and release the key."""
+        with self._lock:
+            self._flush_locked()
+            key, self._key = self._key, None
+        if key is not None:
+            self.registry.close_key(key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Scan-result cache for FontFlow.
+What scanning an archive found is kept as a manifest, saved as JSON next to
+the app and keyed by the archive's resolved path, size and mtime_ns: the
+preview counts, and for every font member its size, CRC-32, registry name and
+content hash. Re-selecting an unchanged archive then costs one stat() instead
+of reading its central directory, and reinstalling it skips fonts that are
+already installed without decompressing them.
+"""
+
+import os
+import json
+import hashlib
+import zipfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from font_archives import FONT_EXTENSIONS, FontMetadata, SuffixFilter
+from font_index import app_dir
+from font_preview import central_directory_bytes
+
+CACHE_FILENAME = 'fontflow_scan_cache.json'
+CACHE_VERSION = 1
+
+# Size cap of the saved cache; least recently used manifests are dropped first
+DEFAULT_CACHE_BYTES = 16 * 1024 * 1024
+
+
+class ArchiveManifest:
+    """What scanning one version of an archive found."""
+
+    def __init__(self, path: str, size: int, mtime_ns: int, digest: Optional[str] = None):
+        self.path = path          # Resolved, normcased path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest      # Hash of the central directory, when content checks are on
+        self.preview: Optional[dict] = None  # font_preview.ArchivePreview fields
+        self.fonts: Dict[str, FontMetadata] = {}  # By member path
+
+    def font(self, member: str, size: int, crc: Optional[int] = None) -> FontMetadata:
+        """The metadata record of a font member, new if the member changed."""
+        metadata = self.fonts.get(member)
+        if metadata is None or metadata.size != size or metadata.crc != crc:
+            metadata = self.fonts[member] = FontMetadata(size, crc)
+        return metadata
+
+    def weight(self) -> int:
+        """Rough size of the manifest once saved, in bytes."""
+        return 160 + sum(len(member) + 96 for member in self.fonts)
+
+    def to_json(self) -> list:
+        fonts = {member: [metadata.size, metadata.crc, metadata.font_name, metadata.digest]
+                 for member, metadata in self.fonts.items()}
+        return [self.path, self.size, self.mtime_ns, self.digest, self.preview, fonts]
+
+    @classmethod
+    def from_json(cls, data: list) -> 'ArchiveManifest':
+        path, size, mtime_ns, digest, preview, fonts = data
+        manifest = cls(path, size, mtime_ns, digest)
+        manifest.preview = preview
+        manifest.fonts = {member: FontMetadata(*values) for member, values in fonts.items()}
+        return manifest
+
+
+class ScanCache:
+    """Archive manifests by resolved path, least recently used first, persisted as JSON.
+
+    A manifest is reused while the archive's size and mtime_ns are unchanged;
+    with verify_content, the hash of its central directory must match too
+    (for shares whose mtimes can't be trusted). The saved file is kept under
+    max_bytes by dropping the least recently used manifests when it is saved.
+    The file is loaded on first use. Safe to use from several threads.
+    """
+
+    def __init__(self, cache_path: Optional[str] = None, max_bytes: int = DEFAULT_CACHE_BYTES,
+                 verify_content: bool = False):
+        self.cache_path = cache_path or os.path.join(app_dir(), CACHE_FILENAME)
+        self.max_bytes = max_bytes
+        self.verify_content = verify_content
+        self._manifests: 'OrderedDict[str, ArchiveManifest]' = OrderedDict()
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._fonts = SuffixFilter(FONT_EXTENSIONS)
+        self.hits = self.misses = 0
+        self.dirty = False
+
+    def _load(self):
+        # Called with the lock held
+        self._loaded = True
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                for entry in data.get('manifests', []):
+                    manifest = ArchiveManifest.from_json(entry)
+                    self._manifests[manifest.path] = manifest
+        except (OSError, ValueError, TypeError):
+            self._manifests.clear()  # Missing or unreadable cache: start empty
+
+    def _digest(self, path: str) -> Optional[str]:
+        if self._fonts.match(path) is not None:
+            return None  # Loose fonts have no directory; size and mtime have to do
+        try:
+            return hashlib.blake2b(central_directory_bytes(path), digest_size=16).hexdigest()
+        except (OSError, ValueError, zipfile.BadZipFile):
+            return None  # Tarballs have no directory either
+
+    def _lookup(self, path: str):
+        info = os.stat(path)
+        key = os.path.normcase(os.path.realpath(path))
+        digest = self._digest(path) if self.verify_content else None
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            manifest = self._manifests.get(key)
+            if (manifest is None or manifest.size != info.st_size or manifest.mtime_ns != info.st_mtime_ns
+                    or (self.verify_content and manifest.digest != digest)):
+                self.misses += 1
+                return None, info, key, digest
+            self._manifests.move_to_end(key)
+            self.hits += 1
+            # The engine fills in names and digests, and recency changed: save() writes
+            self.dirty = True
+            return manifest, info, key, digest
+
+    def get(self, path: str) -> Optional[ArchiveManifest]:
+        """The manifest of path's current version, or None. Raises OSError if path can't be stat'ed."""
+        return self._lookup(path)[0]
+
+    def manifest(self, path: str) -> ArchiveManifest:
+        """The manifest of path's current version, a new empty one if the archive is new or changed."""
+        manifest, info, key, digest = self._lookup(path)
+        if manifest is None:
+            manifest = ArchiveManifest(key, info.st_size, info.st_mtime_ns, digest)
+            with self._lock:
+                self._manifests[key] = manifest
+                self._manifests.move_to_end(key)
+                self.dirty = True
+        return manifest
+
+    def _evict(self):
+        # Called with the lock held
+        total = sum(manifest.weight() for manifest in self._manifests.values())
+        while total > self.max_bytes and self._manifests:
+            _, manifest = self._manifests.popitem(last=False)
+            total -= manifest.weight()
+
+    def save(self):
+        """Write the cache next to the app. Failures (e.g. read-only folder) are ignored."""
+        with self._lock:
+            if not self.dirty:
+                return
+            self._evict()
+            data = {'version': CACHE_VERSION,
+                    'manifests': [manifest.to_json() for manifest in self._manifests.values()]}
+            self.dirty = False
+        temp_path = self.cache_path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(temp_path, self.cache_path)
+        except OSError:
+            self.dirty = True
+
+    def __len__(self):
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            return len(self._manifests)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Archive selection for FontFlow.
+An ordered set of the archives and folders picked for installation. Picking
+the same file twice, through another relative path, a symlink or a hard link,
+adds it once.
+"""
+
+import os
+import stat
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def _size_text(size: int) -> str:
+    size_mb = size / (1024 * 1024)
+    return f"{size_mb:.1f} MB" if size_mb >= 0.1 else f"{max(1, size // 1024)} KB"
+
+
+def _plural(count: int, noun: str) -> str:
+    return f"{count} {noun}{'s' if count != 1 else ''}"
+
+
+class SelectedArchive:
+    """One selected archive (or folder) and what is known about it for display."""
+
+    def __init__(self, path: str, size: int, key: Tuple, is_dir: bool = False):
+        self.path = path          # Resolved path
+        self.name = os.path.basename(path)
+        self.size = size          # Archive size on disk in bytes
+        self.key = key            # (st_dev, st_ino), identifies the file behind any path
+        self.is_dir = is_dir      # A folder, searched for archives and fonts when installing
+        self.font_count: Optional[int] = None  # Filled in by a background scan
+        self.preview = None                    # font_preview.ArchivePreview, from the same scan
+        self.error: Optional[str] = None       # Why the archive couldn't be scanned
+
+    def describe(self) -> str:
+        """Row text for the file list, e.g. "Inter.zip  ·  2.4 MB  ·  18 fonts (12 TTF, 6 OTF; 9.1 MB)"."""
+        if self.is_dir:
+            return f"{self.name}{os.sep}  ·  folder and subfolders"
+        parts = [self.name, _size_text(self.size)]
+        if self.error is not None:
+            parts.append("unreadable")
+        elif self.preview is not None:
+            preview = self.preview
+            fonts_text = _plural(preview.font_count, "font")
+            if preview.font_count:
+                fonts_text += f" ({preview.formats()}; {_size_text(preview.font_bytes)})"
+            parts.append(fonts_text)
+            if preview.archives:
+                parts.append(_plural(preview.archives, "inner archive"))
+            if preview.other_files:
+                parts.append(_plural(preview.other_files, "other file"))
+        elif self.font_count is None:
+            parts.append("… fonts")
+        else:
+            parts.append(_plural(self.font_count, "font"))
+        return "  ·  ".join(parts)
+
+    def __repr__(self):
+        return f"SelectedArchive({self.path!r}, size={self.size}, font_count={self.font_count})"
+
+
+class ArchiveSelection:
+    """Ordered set of archives keyed by resolved path and by (device, inode)."""
+
+    def __init__(self):
+        self._items: List[SelectedArchive] = []
+        self._keys: Dict[Tuple, int] = {}
+        self._paths: Dict[str, int] = {}
+
+    def add(self, path: str) -> Optional[SelectedArchive]:
+        """Add path and return its entry, or None if it is already selected or can't be read."""
+        resolved = os.path.normcase(os.path.realpath(path))
+        if resolved in self._paths:
+            return None
+        try:
+            info = os.stat(resolved)
+        except OSError:
+            return None
+        # Some file systems report no inode; fall back to the resolved path alone
+        key = (info.st_dev, info.st_ino) if info.st_ino else ('path', resolved)
+        if key in self._keys:
+            return None
+        item = SelectedArchive(os.path.realpath(path), info.st_size, key, is_dir=stat.S_ISDIR(info.st_mode))
+        self._keys[key] = self._paths[resolved] = len(self._items)
+        self._items.append(item)
+        return item
+
+    def add_many(self, paths: Iterable[str]) -> List[SelectedArchive]:
+        """Add every path and return the entries that were new."""
+        added = []
+        for path in paths:
+            item = self.add(path)
+            if item is not None:
+                added.append(item)
+        return added
+
+    def clear(self):
+        self._items.clear()
+        self._keys.clear()
+        self._paths.clear()
+
+    def paths(self) -> List[str]:
+        return [item.path for item in self._items]
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[SelectedArchive]:
+        return iter(self._items)
+
+    def __getitem__(self, index: int) -> SelectedArchive:
+        return self._items[index]
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Startup timing for FontFlow.
+Records how long the GUI takes to reach each startup milestone. Set
+FONTFLOW_STARTUP_TIMING to "stderr" to print the timings, or to a file path
+to write them as JSON.
+"""
+
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+TIMING_ENV_VAR = 'FONTFLOW_STARTUP_TIMING'
+
+# Milestones marked by the GUI, in order
+IMPORTS_DONE = 'imports'    # font_installer finished importing
+TK_ROOT = 'tk_root'         # tk.Tk() returned
+FIRST_PAINT = 'first_paint'  # The main window received its first Expose event
+INTERACTIVE = 'interactive'  # The event loop went idle after the first paint
+
+
+class StartupTimer:
+    """Milliseconds from start to named milestones. Only the first mark of a name counts."""
+
+    def __init__(self, start: Optional[float] = None, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.start = clock() if start is None else start
+        self.marks: Dict[str, float] = {}
+
+    def mark(self, name: str) -> float:
+        """Record name at the current time (unless already recorded) and return its elapsed ms."""
+        if name not in self.marks:
+            self.marks[name] = (self.clock() - self.start) * 1000
+        return self.marks[name]
+
+    def report(self) -> dict:
+        return {'milestones_ms': {name: round(elapsed, 3) for name, elapsed in self.marks.items()}}
+
+    def dump(self, destination: str):
+        """Print the timings to stderr, or write them as JSON to the path destination."""
+        if destination == 'stderr':
+            for name, elapsed in self.marks.items():
+                print(f"startup {name:<12} {elapsed:8.1f} ms", file=sys.stderr)
+            return
+        import json  # Only needed when dumping; kept off the startup path
+        try:
+            with open(destination, 'w', encoding='utf-8') as f:
+                json.dump(self.report(), f, indent=2)
+        except OSError as e:
+            print(f"Could not write startup timings to {destination}: {e}", file=sys.stderr)
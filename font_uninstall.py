@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Uninstall and rollback for FontFlow.
+The install journal records which fonts every run installed. installed_fonts()
+picks the ones to remove, a whole run or the fonts of chosen families, and
+RollbackEngine removes them in one batch: their registry values are deleted
+through a single open Fonts key, their font resources removed one after the
+other, their files deleted, and WM_FONTCHANGE broadcast once at the end.
+Fonts a run overwrote are not lost: a file that was already in the Fonts
+folder is left in place, and a registry value the run replaced is put back.
+Progress is counted in a TransferProgress, like an install's.
+"""
+
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from font_backend import FontChangeNotifier
+from font_journal import REGISTERED, RESOURCE_ADDED, InstallJournal
+from font_metadata import FontFormatError, read_font_faces_from_file
+from font_progress import TransferProgress
+
+
+class InstalledFont:
+    """A font the journal shows a run installed, and the steps to undo."""
+
+    def __init__(self, filename: str, path: str, run_id: str, name: Optional[str] = None,
+                 size: int = 0, origin: Optional[str] = None, loaded: bool = False, preexisting: bool = False):
+        self.filename = filename
+        self.path = path
+        self.run_id = run_id      # The run whose copy is in the Fonts folder
+        self.name = name          # Registry value name, if it was registered
+        self.size = size
+        self.origin = origin      # Archive the font came from
+        self.loaded = loaded      # The font resource was added
+        self.preexisting = preexisting  # The file was in the Fonts folder before the first run copied it
+        self.replaced: Dict[str, str] = {}  # Registry name -> the value it had before a run replaced it
+        self.run_ids: List[str] = [run_id]  # Every run that journaled the file
+        self.names: List[str] = [name] if name else []  # Every registry name those runs wrote for it
+
+    def families(self) -> List[str]:
+        """Family names of the font's faces, read from the installed file."""
+        try:
+            return [face.family for face in read_font_faces_from_file(self.path) if face.family]
+        except (OSError, FontFormatError, ValueError):
+            return []
+
+    def __repr__(self):
+        return f"InstalledFont({self.filename!r}, run={self.run_id!r}, name={self.name!r})"
+
+
+def installed_fonts(journal: InstallJournal, fonts_dir: str, run_ids: Optional[Iterable[str]] = None,
+                    families: Optional[Iterable[str]] = None) -> List[InstalledFont]:
+    """The fonts journaled runs installed into fonts_dir and haven't been uninstalled.
+
+    A file copied by several runs belongs to the last of them, so rolling back
+    an older run leaves it alone. Whether the file was there before comes
+    from the earliest run, and a registry value counts as replaced only if
+    no earlier run wrote it. run_ids keeps only the fonts of those runs,
+    and families only fonts with a face of one of those families (matched
+    without case, falling back to the start of the registry name when the
+    file can't be read).
+    """
+    fonts: Dict[str, InstalledFont] = {}
+    for run in journal.runs():
+        if run.fonts_dir != fonts_dir:
+            continue
+        for key, font in run.fonts.items():
+            installed = InstalledFont(font.filename, os.path.join(fonts_dir, font.filename), run.run_id, font.name,
+                                      font.size or 0, font.origin,
+                                      RESOURCE_ADDED in font.phases or REGISTERED in font.phases, font.existed)
+            installed.replaced = dict(font.replaced)
+            if key in fonts:
+                earlier = fonts[key]
+                installed.preexisting = earlier.preexisting
+                installed.replaced = {**{name: previous for name, previous in installed.replaced.items()
+                                         if name not in earlier.names}, **earlier.replaced}
+                installed.run_ids = fonts[key].run_ids + [run.run_id]
+                installed.name = installed.name or fonts[key].name
+                installed.names = fonts[key].names + [name for name in installed.names
+                                                      if name not in fonts[key].names]
+            fonts[key] = installed
+    selected = list(fonts.values())
+    if run_ids is not None:
+        run_ids = set(run_ids)
+        selected = [font for font in selected if font.run_id in run_ids]
+    if families is not None:
+        wanted = {family.casefold() for family in families}
+        selected = [font for font in selected if _in_families(font, wanted)]
+    return selected
+
+
+def _in_families(font: InstalledFont, wanted: set) -> bool:
+    families = font.families()
+    if families:
+        return any(family.casefold() in wanted for family in families)
+    name = (font.name or '').casefold()
+    return any(name == family or name.startswith(family + ' ') for family in wanted)
+
+
+class UninstallResult:
+    """Outcome of removing one font."""
+
+    def __init__(self, font: InstalledFont, success: bool, error: Optional[str] = None, skipped: bool = False):
+        self.font = font
+        self.success = success
+        self.error = error
+        self.skipped = skipped    # Pre-existing font, left installed
+
+    def __repr__(self):
+        return (f"UninstallResult({self.font.filename!r}, success={self.success}, skipped={self.skipped}, "
+                f"error={self.error!r})")
+
+
+class UninstallSummary:
+    """Totals for an uninstall batch."""
+
+    def __init__(self):
+        self.total_fonts = 0
+        self.removed_count = 0
+        self.skipped_count = 0
+        self.bytes_freed = 0
+        self.failed_removals: List[Tuple[str, str]] = []
+        self.registry_failures: List[Tuple[str, Exception]] = []
+        self.broadcasts = 0
+
+    def add(self, result: UninstallResult):
+        self.total_fonts += 1
+        if result.skipped:
+            self.skipped_count += 1
+        elif result.success:
+            self.removed_count += 1
+            self.bytes_freed += result.font.size
+        else:
+            self.failed_removals.append((result.font.filename, result.error))
+
+
+class RollbackEngine:
+    """Removes installed fonts through a backend in one batch.
+
+    The steps run for all fonts before the next begins: registry values are
+    deleted first, so a font that can't be removed completely doesn't come
+    back at the next logon, then font resources are removed and files
+    deleted. A font whose registry value can't be deleted is left installed
+    and reported. A registry value a run replaced is written back instead of
+    deleted. A file that was in the Fonts folder before any run copied it is
+    left in place and reported as skipped, though its registry values are
+    undone like any other. Every removed or skipped font is journaled as
+    removed from each run that installed it.
+    """
+
+    def __init__(self, backend, journal: Optional[InstallJournal] = None):
+        self.backend = backend
+        self.journal = journal
+
+    def uninstall(self, fonts: List[InstalledFont], on_result: Optional[Callable[[UninstallResult], None]] = None,
+                  progress: Optional[TransferProgress] = None) -> UninstallSummary:
+        summary = UninstallSummary()
+        if progress is not None:
+            progress.add_total(sum(font.size for font in fonts), len(fonts))
+        errors: Dict[str, str] = {}
+
+        # One key open for the whole batch
+        with self.backend.open_registry_writer() as writer:
+            by_name = {}
+            for font in fonts:
+                for name in font.names:
+                    # None deletes the value; a replaced one gets its old file back
+                    writer.queue(name, font.replaced.get(name))
+                    by_name[name] = font
+            writer.flush()
+            for name, error in writer.failures:
+                errors[by_name[name].filename] = f"registry value not deleted: {error}"
+            summary.registry_failures = list(writer.failures)
+
+        removable = [font for font in fonts if font.filename not in errors and not font.preexisting]
+        for font in removable:
+            if font.loaded:
+                # Fails for fonts that aren't loaded any more (e.g. since a reboot); the file goes anyway
+                self.backend.remove_font_resource(font.path)
+
+        with FontChangeNotifier(self.backend.notify_font_change) as notifier:
+            for font in fonts:
+                if font.preexisting and font.filename not in errors:
+                    self._forget(font)
+                    result = UninstallResult(font, False, "was pre-existing; left installed", skipped=True)
+                else:
+                    if font.filename not in errors:
+                        try:
+                            self.backend.remove_font(font.filename)
+                        except OSError as e:
+                            errors[font.filename] = f"file not deleted: {e}"
+                        else:
+                            notifier.font_changed()
+                            self._forget(font)
+                    result = UninstallResult(font, font.filename not in errors, errors.get(font.filename))
+                summary.add(result)
+                if progress is not None:
+                    progress.font_done(font.size)
+                if on_result is not None:
+                    on_result(result)
+        summary.broadcasts = notifier.broadcasts
+        if self.journal is not None:
+            self.journal.sync()
+        return summary
+
+    def _forget(self, font: InstalledFont):
+        if self.journal is not None:
+            for run_id in font.run_ids:
+                self.journal.removed(font.filename, run_id)
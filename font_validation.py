@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Font validation for FontFlow.
+Checks that a file really is a TrueType/OpenType font (or collection) before
+it is copied into the Fonts directory: the sfnt version tag, that the table
+directory and every table lie inside the file, the tables Windows needs and
+the `head` table's magic number. The cost depends on the number of tables,
+not on the size of the font.
+
+Table checksums can be verified too. They are summed a chunk of 32-bit words
+at a time with array over a memoryview (an mmap for files on disk) instead of
+unpacking the font word by word in Python.
+"""
+
+import sys
+import mmap
+import array
+import struct
+from typing import BinaryIO, Callable, Dict, List, Tuple
+
+from font_metadata import (FontFormatError, MAX_COLLECTION_FACES, SFNT_APPLE_TRUETYPE, SFNT_OPENTYPE_CFF,
+                           SFNT_VERSIONS, TTC_TAG)
+
+# Real fonts have a few dozen tables
+MAX_TABLES = 1024
+
+# Tables every font needs (the OpenType spec's required tables). Apple
+# TrueType fonts ('true') may leave out OS/2.
+REQUIRED_TABLES = frozenset({b'cmap', b'head', b'hhea', b'hmtx', b'maxp', b'name', b'post'})
+OS2_TABLE = b'OS/2'
+
+# A font needs at least one of these to have anything to draw
+OUTLINE_TABLES = frozenset({b'glyf', b'CFF ', b'CFF2', b'CBDT', b'EBDT', b'sbix'})
+CFF_TABLES = frozenset({b'CFF ', b'CFF2'})
+
+HEAD_MAGIC = 0x5F0F3CF5
+HEAD_MIN_LENGTH = 54
+
+# Checksums are summed this many bytes at a time, so memory stays flat on huge fonts
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+# array type code of an unsigned 32-bit word on this platform
+_WORD = 'I' if array.array('I').itemsize == 4 else 'L'
+
+Tables = Dict[bytes, Tuple[int, int, int]]
+
+
+def _reader(buffer: memoryview) -> Callable[[int, int], bytes]:
+    def read(offset: int, length: int) -> bytes:
+        if offset + length > len(buffer):
+            raise FontFormatError(f"unexpected end of file reading {length} bytes at {offset}")
+        return bytes(buffer[offset:offset + length])
+    return read
+
+
+def _stream_reader(f: BinaryIO) -> Callable[[int, int], bytes]:
+    # Reads forward by skipping, so streams that can't seek (or seek slowly, like
+    # compressed archive members) work as long as the offsets asked for increase
+    position = 0
+
+    def read(offset: int, length: int) -> bytes:
+        nonlocal position
+        if offset < position:
+            f.seek(offset)
+            position = offset
+        while position < offset:
+            skipped = len(f.read(min(offset - position, CHECKSUM_CHUNK_SIZE)))
+            if not skipped:
+                break
+            position += skipped
+        data = f.read(length)
+        position += len(data)
+        if len(data) != length:
+            raise FontFormatError(f"unexpected end of file reading {length} bytes at {offset}")
+        return data
+    return read
+
+
+def _tag(tag: bytes) -> str:
+    return tag.decode('latin-1').strip()
+
+
+def _face_offsets(read: Callable[[int, int], bytes]) -> List[int]:
+    if read(0, 4) != TTC_TAG:
+        return [0]
+    num_fonts, = struct.unpack('>L', read(8, 4))
+    if not 0 < num_fonts <= MAX_COLLECTION_FACES:
+        raise FontFormatError(f"implausible number of faces in collection ({num_fonts})")
+    return list(struct.unpack(f'>{num_fonts}L', read(12, num_fonts * 4)))
+
+
+def _check_face(read: Callable[[int, int], bytes], size: int, offset: int) -> Tables:
+    # Version tag, table directory bounds and required tables of the face at offset
+    sfnt_version, num_tables = struct.unpack('>4sH', read(offset, 6))
+    if sfnt_version not in SFNT_VERSIONS:
+        raise FontFormatError(f"not an sfnt font (version tag {sfnt_version!r})")
+    if not 0 < num_tables <= MAX_TABLES:
+        raise FontFormatError(f"implausible number of tables ({num_tables})")
+    tables = {}
+    for tag, checksum, table_offset, length in struct.iter_unpack('>4sLLL', read(offset + 12, num_tables * 16)):
+        if table_offset + length > size:
+            raise FontFormatError(f"table '{_tag(tag)}' extends past the end of the file "
+                                  f"({table_offset} + {length} > {size})")
+        tables[tag] = (table_offset, length, checksum)
+
+    required = REQUIRED_TABLES if sfnt_version == SFNT_APPLE_TRUETYPE else REQUIRED_TABLES | {OS2_TABLE}
+    missing = required - tables.keys()
+    if missing:
+        raise FontFormatError("missing required tables: " + ", ".join(sorted(_tag(tag) for tag in missing)))
+    if not OUTLINE_TABLES & tables.keys():
+        raise FontFormatError("font has no glyph outlines")
+    if sfnt_version == SFNT_OPENTYPE_CFF and not CFF_TABLES & tables.keys():
+        raise FontFormatError("OpenType CFF font without a CFF table")
+    if tables[b'head'][1] < HEAD_MIN_LENGTH:
+        raise FontFormatError(f"head table is too short ({tables[b'head'][1]} bytes)")
+    return tables
+
+
+def checksum(buffer: memoryview, offset: int, length: int) -> int:
+    """OpenType checksum of buffer[offset:offset + length]: the sum of its big-endian
+    32-bit words (the last one zero padded), modulo 2**32."""
+    total = 0
+    words_end = offset + (length & ~3)
+    for start in range(offset, words_end, CHECKSUM_CHUNK_SIZE):
+        words = array.array(_WORD)
+        words.frombytes(buffer[start:min(start + CHECKSUM_CHUNK_SIZE, words_end)])
+        if sys.byteorder == 'little':
+            words.byteswap()
+        total += sum(words)
+    if length & 3:
+        total += int.from_bytes(bytes(buffer[words_end:offset + length]).ljust(4, b'\0'), 'big')
+    return total & 0xFFFFFFFF
+
+
+def validate_font(data, checksums: bool = False) -> int:
+    """Check that data (bytes, memoryview or mmap) holds a usable font or collection.
+
+    Raises FontFormatError saying what is wrong. With checksums=True every
+    table's checksum is verified as well. Returns the number of faces.
+    """
+    with memoryview(data) as buffer:
+        read = _reader(buffer)
+        offsets = _face_offsets(read)
+        checked = set()  # Faces of a collection often share tables
+        for offset in offsets:
+            tables = _check_face(read, len(buffer), offset)
+            head_offset = tables[b'head'][0]
+            magic, = struct.unpack('>L', read(head_offset + 12, 4))
+            if magic != HEAD_MAGIC:
+                raise FontFormatError(f"bad head table magic number 0x{magic:08X}")
+            if not checksums:
+                continue
+            for tag, (table_offset, length, expected) in tables.items():
+                if (table_offset, length) in checked:
+                    continue
+                checked.add((table_offset, length))
+                actual = checksum(buffer, table_offset, length)
+                if tag == b'head':
+                    # The head checksum is computed with checkSumAdjustment as zero
+                    adjustment, = struct.unpack('>L', read(table_offset + 8, 4))
+                    actual = (actual - adjustment) & 0xFFFFFFFF
+                if actual != expected:
+                    raise FontFormatError(f"checksum mismatch in table '{_tag(tag)}' "
+                                          f"(0x{actual:08X}, expected 0x{expected:08X})")
+        return len(offsets)
+
+
+def validate_font_file(path: str, checksums: bool = False) -> int:
+    """validate_font() for a file on disk, read through an mmap."""
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise FontFormatError("empty file")
+        with mapped:
+            return validate_font(mapped, checksums)
+
+
+def validate_font_header(f: BinaryIO, size: int) -> int:
+    """The table directory checks of validate_font() for a font of size bytes that is
+    only available as a stream (e.g. a large archive member). Only the headers are read."""
+    read = _stream_reader(f)
+    offsets = _face_offsets(read)
+    for offset in offsets:
+        _check_face(read, size, offset)
+    return len(offsets)
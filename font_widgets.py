@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Widgets for the FontFlow window.
+VirtualListbox shows a long list through a tk.Listbox that only ever holds
+the rows in view, so thousands of entries cost no more to show than a few.
+"""
+
+import tkinter as tk
+import tkinter.font as tkfont
+from typing import Callable, Tuple
+
+
+class ListViewport:
+    """Which rows of a list of `count` rows are visible, `visible_rows` at a time."""
+
+    def __init__(self, visible_rows: int = 5):
+        self.visible_rows = max(1, visible_rows)
+        self.count = 0
+        self.first = 0
+
+    def _clamp(self):
+        self.first = max(0, min(self.first, self.count - self.visible_rows))
+
+    def set_count(self, count: int):
+        self.count = count
+        self._clamp()
+
+    def set_visible_rows(self, visible_rows: int):
+        self.visible_rows = max(1, visible_rows)
+        self._clamp()
+
+    def visible_range(self) -> range:
+        return range(self.first, min(self.count, self.first + self.visible_rows))
+
+    def moveto(self, fraction: float):
+        self.first = int(round(fraction * self.count))
+        self._clamp()
+
+    def scroll(self, amount: int, what: str = 'units'):
+        self.first += amount * (self.visible_rows if what == 'pages' else 1)
+        self._clamp()
+
+    def fractions(self) -> Tuple[float, float]:
+        """(first, last) visible fractions, as Tk scrollbars expect."""
+        if self.count <= self.visible_rows:
+            return 0.0, 1.0
+        return self.first / self.count, (self.first + self.visible_rows) / self.count
+
+
+class VirtualListbox:
+    """Drives a tk.Listbox and a scrollbar so only the visible rows are materialized.
+
+    render(index) returns the text of row index. Call set_count() when rows are
+    appended and refresh() when rows already shown may have changed; both only
+    touch the rows in view.
+    """
+
+    def __init__(self, listbox: tk.Listbox, scrollbar, render: Callable[[int], str]):
+        self.listbox = listbox
+        self.scrollbar = scrollbar
+        self.render = render
+        self.viewport = ListViewport(int(listbox.cget('height')))
+        self.rows_rendered = 0  # Rows inserted into the listbox so far, to check the list stays virtual
+        self._line_height = None  # Measured on the first resize, once the widget is mapped
+        scrollbar.configure(command=self.yview)
+        listbox.configure(yscrollcommand=None)
+        listbox.bind('<Configure>', self._on_resize, add='+')
+        listbox.bind('<MouseWheel>', self._on_mousewheel, add='+')
+        listbox.bind('<Button-4>', lambda event: self.yview('scroll', -1, 'units'), add='+')
+        listbox.bind('<Button-5>', lambda event: self.yview('scroll', 1, 'units'), add='+')
+
+    def set_count(self, count: int):
+        """The list now has count rows; only redraws if the change is in view."""
+        old_range = self.viewport.visible_range()
+        self.viewport.set_count(count)
+        if self.viewport.visible_range() != old_range:
+            self.refresh()
+        else:
+            self.scrollbar.set(*self.viewport.fractions())
+
+    def refresh(self):
+        """Re-render the rows in view."""
+        self.listbox.delete(0, tk.END)
+        rows = [self.render(index) for index in self.viewport.visible_range()]
+        if rows:
+            self.listbox.insert(tk.END, *rows)
+        self.rows_rendered += len(rows)
+        self.scrollbar.set(*self.viewport.fractions())
+
+    def yview(self, *args):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', amount, 'units'|'pages')."""
+        first = self.viewport.first
+        if args[0] == 'moveto':
+            self.viewport.moveto(float(args[1]))
+        elif args[0] == 'scroll':
+            self.viewport.scroll(int(args[1]), args[2])
+        if self.viewport.first != first:
+            self.refresh()
+
+    def _on_mousewheel(self, event):
+        self.yview('scroll', -1 if event.delta > 0 else 1, 'units')
+        return 'break'  # The listbox holds only visible rows; don't let it scroll itself
+
+    def _on_resize(self, event):
+        if self._line_height is None:
+            self._line_height = tkfont.Font(font=self.listbox.cget('font')).metrics('linespace') + 1
+        visible_rows = max(1, event.height // self._line_height)
+        if visible_rows != self.viewport.visible_rows:
+            self.viewport.set_visible_rows(visible_rows)
+            self.refresh()
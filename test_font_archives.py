@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Test script for FontFlow archive handling.
+Builds small ZIP files and tarballs in a temporary directory, so it runs on any platform:
+    python test_font_archives.py   (or: python -m pytest test_font_archives.py)
+"""
+
+import io
+import os
+import sys
+import tarfile
+import zipfile
+import tempfile
+
+from create_test_fonts import build_test_font
+from font_archives import (COPY_BUFFER_SIZE, ArchiveEvent, ArchiveScanner, TarFontArchive, ZipFontArchive,
+                           FontSource, stage_font_source, stage_font_sources)
+from font_backend import DirectoryFontBackend
+from font_engine import InstallEngine
+from font_folders import walk_fonts
+from font_limits import ArchiveLimits, LimitExceeded
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return path
+
+
+def zip_bytes(members):
+    buffer = io.BytesIO()
+    make_zip(buffer, members)
+    return buffer.getvalue()
+
+
+def make_tar(path, members, compression=''):
+    with tarfile.open(path, f'w:{compression}') as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return path
+
+
+def test_zip_archive_lists_fonts_only():
+    """Only font members are exposed, and they stream their original bytes."""
+    with tempfile.TemporaryDirectory() as work:
+        path = make_zip(os.path.join(work, 'pack.zip'), {
+            'Family/Regular.ttf': b'regular' * 100,
+            'Family/Bold.OTF': b'bold',
+            'readme.txt': b'not a font',
+        })
+        with ZipFontArchive(path) as archive:
+            assert [source.filename for source in archive.fonts] == ['Regular.ttf', 'Bold.OTF']
+            assert archive.fonts[0].size == 700
+            with archive.fonts[0].open() as f:
+                assert f.read() == b'regular' * 100
+
+
+def test_zip_members_are_streamed():
+    """A ZIP member is copied to the fonts or staging directory in chunks, and a failed copy leaves no file."""
+    data = os.urandom(2 * COPY_BUFFER_SIZE + 12345)
+    with tempfile.TemporaryDirectory() as work:
+        path = make_zip(os.path.join(work, 'pack.zip'), {'Big.ttf': data})
+        fonts_dir = os.path.join(work, 'Fonts')
+        staging_dir = os.path.join(work, 'staging')
+        os.makedirs(fonts_dir)
+        os.makedirs(staging_dir)
+        backend = DirectoryFontBackend(fonts_dir)
+        with ZipFontArchive(path) as archive:
+            (source,) = archive.fonts
+            reads = []
+            dest_path, written = backend.write_font(source.counted(reads.append))
+            assert written == len(data) and sum(reads) == len(data)
+            assert len(reads) > 1 and max(reads) <= COPY_BUFFER_SIZE
+            staged = stage_font_source(source.counted(reads.append), staging_dir)
+            for copy in (dest_path, staged.origin):
+                with open(copy, 'rb') as f:
+                    assert f.read() == data
+                os.remove(copy)
+
+            # The archive fails after the first chunk has been written
+            def fail_on_second_chunk(n):
+                reads.append(n)
+                if len(reads) > 1:
+                    raise OSError("archive went away")
+
+            for copy in (backend.write_font, lambda failing: stage_font_source(failing, staging_dir)):
+                reads = []
+                try:
+                    copy(source.counted(fail_on_second_chunk))
+                    raise AssertionError("the copy didn't fail")
+                except OSError:
+                    pass
+            assert os.listdir(fonts_dir) == [] and os.listdir(staging_dir) == []
+
+
+def test_staged_fonts_are_unique_and_released():
+    """Fonts sharing a file name are staged apart under their own name, and released once the consumer is past them."""
+    with tempfile.TemporaryDirectory() as staging_dir:
+        sources = [FontSource('Foo.ttf', 4, f'pack{i}.zip', lambda i=i: io.BytesIO(b'foo%d' % i)) for i in range(6)]
+        on_disk = []
+        staged = []
+        for copy in stage_font_sources(sources, staging_dir, release_after=2):
+            on_disk.append(len(os.listdir(staging_dir)))
+            with copy.open() as f:
+                staged.append((copy.filename, copy.size, f.read()))
+        assert staged == [('Foo.ttf', 4, b'foo%d' % i) for i in range(6)]
+        assert on_disk == [1, 2, 3, 3, 3, 3]
+        assert len(os.listdir(staging_dir)) == 2  # The last ones go with the staging directory
+
+
+def test_nested_archives_are_read_in_memory():
+    """Fonts in ZIPs inside the ZIP are found; large inner archives spill to a temporary file."""
+    with tempfile.TemporaryDirectory() as work:
+        inner = zip_bytes({'Inner.ttf': os.urandom(4096), 'deeper.zip': zip_bytes({'Deep.otf': b'deep'})})
+        path = make_zip(os.path.join(work, 'vendor.zip'), {'Outer.ttf': b'outer', 'families/Inner.zip': inner})
+        with ZipFontArchive(path, spool_threshold=1024) as archive:
+            assert sorted(source.filename for source in archive.fonts) == ['Deep.otf', 'Inner.ttf', 'Outer.ttf']
+            deep = [source for source in archive.fonts if source.filename == 'Deep.otf'][0]
+            assert deep.origin == f"{path}/families/Inner.zip/deeper.zip"
+            with deep.open() as f:
+                assert f.read() == b'deep'
+            assert not archive.skipped
+            assert [spool._rolled for spool in archive._spools] == [True, False]
+        assert os.listdir(work) == ['vendor.zip']  # Nothing was extracted next to the archive
+
+
+def test_nested_archive_limits():
+    """Inner archives past the depth limit or the size budget are skipped and reported."""
+    with tempfile.TemporaryDirectory() as work:
+        level2 = zip_bytes({'Level2.ttf': b'2'})
+        level1 = zip_bytes({'Level1.ttf': b'1', 'level2.zip': level2})
+        path = make_zip(os.path.join(work, 'pack.zip'), {'level1.zip': level1, 'broken.zip': b'not a zip'})
+        with ZipFontArchive(path, max_depth=1) as archive:
+            assert [source.filename for source in archive.fonts] == ['Level1.ttf']
+            reasons = dict(archive.skipped)
+            assert 'levels deep' in reasons[f"{path}/level1.zip/level2.zip"]
+            assert f"{path}/broken.zip" in reasons
+        with ZipFontArchive(path, nested_budget=len(level1) - 1) as archive:
+            assert archive.fonts == []
+            assert 'exceed' in dict(archive.skipped)[f"{path}/level1.zip"]
+
+
+def test_scanner_yields_every_archive():
+    """The scanner yields the fonts of every archive and reports progress per archive."""
+    with tempfile.TemporaryDirectory() as work:
+        paths = [make_zip(os.path.join(work, f'pack{i}.zip'),
+                          {f'Font{i}-{j}.ttf': b'x' * j for j in range(1, 6)})
+                 for i in range(8)]
+        events = []
+        with ArchiveScanner(paths, workers=3, on_event=events.append) as scanner:
+            names = sorted(source.filename for source in scanner)
+        assert names == sorted(f'Font{i}-{j}.ttf' for i in range(8) for j in range(1, 6))
+        for path in paths:
+            kinds = [event.kind for event in events if event.path == path]
+            assert kinds == [ArchiveEvent.OPENED, ArchiveEvent.DONE]
+
+
+def test_scanner_reports_bad_archive():
+    """A corrupt archive produces a failed event and the others are still scanned."""
+    with tempfile.TemporaryDirectory() as work:
+        good = make_zip(os.path.join(work, 'good.zip'), {'Good.ttf': b'good'})
+        bad = os.path.join(work, 'bad.zip')
+        with open(bad, 'wb') as f:
+            f.write(b'this is not a zip file')
+        events = []
+        with ArchiveScanner([bad, good], on_event=events.append) as scanner:
+            names = [source.filename for source in scanner]
+        assert names == ['Good.ttf']
+        failed = [event for event in events if event.kind == ArchiveEvent.FAILED]
+        assert [event.path for event in failed] == [bad]
+        assert isinstance(failed[0].error, zipfile.BadZipFile)
+        assert scanner.failed[0][0] == bad
+
+
+def test_scanner_reads_paths_lazily():
+    """Paths are pulled a few at a time, loose fonts are read directly, and release_after closes archives."""
+    with tempfile.TemporaryDirectory() as work:
+        paths = [make_zip(os.path.join(work, f'pack{i}.zip'), {f'Font{i}.ttf': b'x' * 10}) for i in range(20)]
+        loose = os.path.join(work, 'Loose.otf')
+        with open(loose, 'wb') as f:
+            f.write(b'loose font')
+        pulled = []
+
+        def lazy_paths():
+            for path in paths + [loose]:
+                pulled.append(path)
+                yield path
+
+        with ArchiveScanner(lazy_paths(), workers=2, release_after=3) as scanner:
+            sources = iter(scanner)
+            names = [next(sources).filename]
+            assert len(pulled) <= 4  # Only twice the worker count ahead
+            names += [source.filename for source in sources]
+            assert len(scanner.archives) <= 4  # The rest were closed once consumed
+        assert sorted(names) == sorted([f'Font{i}.ttf' for i in range(20)] + ['Loose.otf'])
+        assert scanner.opened == 21 and scanner.archives == []
+
+
+def test_tarballs_are_streamed():
+    """Every tar compression yields the same fonts as the ZIP, read one member at a time."""
+    members = {'Family/Regular.ttf': b'regular' * 100, 'Family/Bold.OTF': b'bold' * 2000,
+               'readme.txt': b'not a font', 'Family/Italic.ttf': b'italic'}
+    with tempfile.TemporaryDirectory() as work:
+        with ZipFontArchive(make_zip(os.path.join(work, 'pack.zip'), members)) as archive:
+            expected = [(source.filename, source.size, source.open().read()) for source in archive.fonts]
+        for compression, suffix in [('', '.tar'), ('gz', '.tar.gz'), ('bz2', '.tbz2'), ('xz', '.tar.xz')]:
+            path = make_tar(os.path.join(work, 'pack' + suffix), members, compression)
+            with TarFontArchive(path, spool_threshold=1000) as archive:
+                assert archive.streaming and archive.font_count == 0
+                fonts = iter(archive.fonts)
+                first = next(fonts)
+                assert archive.members == 1 and archive.font_count == 1  # Nothing read ahead
+                sources = [first] + list(fonts)
+                assert [(source.filename, source.size, source.open().read()) for source in sources] == expected
+                assert archive.error is None and archive.total_bytes == sum(size for _, size, _ in expected)
+                temp_dir = archive._temp_dir
+                assert os.listdir(temp_dir) == ['1.font']  # Only the font over spool_threshold went to disk
+            assert not os.path.exists(temp_dir)
+        found = sorted(os.path.basename(path) for path in walk_fonts([work]))
+        assert found == ['pack.tar', 'pack.tar.gz', 'pack.tar.xz', 'pack.tbz2', 'pack.zip']
+
+
+def test_tar_spools_are_released():
+    """A tarball's spooled fonts are deleted once the consumer is done with them, not at close."""
+    fonts = {f'Big{i}.ttf': build_test_font(f'Spooled{i}') for i in range(6)}
+    with tempfile.TemporaryDirectory() as work:
+        path = make_tar(os.path.join(work, 'big.tar.gz'), fonts, 'gz')
+        with TarFontArchive(path, spool_threshold=100, release_after=2) as archive:
+            on_disk = []
+            for source in archive.fonts:
+                on_disk.append(len(os.listdir(archive._temp_dir)))
+                assert source.open().read() == fonts[source.filename]
+            assert on_disk == [1, 2, 3, 3, 3, 3]
+
+        # Through the scanner, on the engine's window, while the fonts are installed
+        fonts.update({f'More{i}.ttf': build_test_font(f'More{i}') for i in range(20)})
+        path = make_tar(os.path.join(work, 'more.tar.gz'), fonts, 'gz')
+        fonts_dir = os.path.join(work, 'Fonts')
+        os.mkdir(fonts_dir)
+        engine = InstallEngine(DirectoryFontBackend(fonts_dir), workers=1,
+                               stage_workers={'extract': 1, 'validate': 1, 'name': 1})
+        on_disk = []
+
+        class SpoolingScanner(ArchiveScanner):
+            def _open(self, path):
+                return TarFontArchive(path, spool_threshold=100, release_after=self.release_after)
+
+        with SpoolingScanner([path], release_after=engine.window) as scanner:
+            def watched():
+                for source in scanner:
+                    on_disk.append(len(os.listdir(scanner.archives[0]._temp_dir)))
+                    yield source
+            summary = engine.run(watched())
+        assert summary.installed_count == len(fonts)
+        assert max(on_disk) <= engine.window + 1 < len(fonts)
+
+
+def test_scanner_streams_tarballs():
+    """Tarball fonts are counted as they are found; a damaged or oversized tarball fails after its good fonts."""
+    fonts = {f'Font{i}.ttf': build_test_font(f'Tar{i}') for i in range(4)}
+    with tempfile.TemporaryDirectory() as work:
+        good = make_tar(os.path.join(work, 'good.tar.gz'), fonts, 'gz')
+        with open(good, 'rb') as f:
+            data = f.read()
+        damaged = os.path.join(work, 'damaged.tgz')
+        with open(damaged, 'wb') as f:
+            f.write(data[:len(data) * 2 // 3])
+        fonts_dir = os.path.join(work, 'Fonts')
+        os.mkdir(fonts_dir)
+        events = []
+        with ArchiveScanner([good], on_event=events.append) as scanner:
+            summary = InstallEngine(DirectoryFontBackend(fonts_dir)).run(scanner)
+        assert summary.installed_count == 4
+        assert [(event.kind, event.font_count) for event in events] == (
+            [(ArchiveEvent.OPENED, 0)] + [(ArchiveEvent.FOUND, 1)] * 4 + [(ArchiveEvent.DONE, 4)])
+
+        events.clear()
+        with ArchiveScanner([damaged], on_event=events.append) as scanner:
+            names = [source.filename for source in scanner]
+        assert names == list(fonts)[:len(names)] and len(names) < 4
+        assert [event.kind for event in events][-2:] == [ArchiveEvent.FAILED, ArchiveEvent.DONE]
+
+        with TarFontArchive(good, limits=ArchiveLimits(max_members=2)) as archive:
+            assert len(list(archive.fonts)) == 2
+            assert isinstance(archive.error, LimitExceeded) and archive.error.limit == 'max_members'
+
+        not_tar = os.path.join(work, 'plain.tar')
+        with open(not_tar, 'wb') as f:
+            f.write(b'this is not a tarball' * 100)
+        with ArchiveScanner([not_tar], on_event=events.append) as scanner:
+            assert list(scanner) == []
+        assert isinstance(scanner.failed[0][1], tarfile.ReadError)
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow archive handling")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for the FontFlow icon cache.
+The PhotoImage tests need a display and are skipped without one:
+    python test_font_assets.py   (or: python -m pytest test_font_assets.py)
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import tkinter as tk
+
+import font_assets
+from font_assets import icon_cache_path, load_icon
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_root():
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None  # No display
+    root.withdraw()
+    return root
+
+
+def test_cache_key_follows_content():
+    """The cache file name changes when the icon's content changes, not its mtime."""
+    with tempfile.TemporaryDirectory() as work:
+        source = os.path.join(work, 'icon.png')
+        shutil.copy(os.path.join(HERE, 'icon.png'), source)
+        first = icon_cache_path(source, 32, work)
+        os.utime(source, (0, 0))
+        assert icon_cache_path(source, 32, work) == first
+        assert icon_cache_path(source, 16, work) != first
+        with open(source, 'ab') as f:
+            f.write(b'changed')
+        assert icon_cache_path(source, 32, work) != first
+
+
+def test_warm_load_skips_pil():
+    """The second load reads the cached 32x32 PNG without touching PIL."""
+    root = make_root()
+    if root is None:
+        return
+    original = font_assets.load_pil
+    try:
+        with tempfile.TemporaryDirectory() as work:
+            sources = [os.path.join(HERE, 'icon.ico'), os.path.join(HERE, 'icon.png')]
+            cold = load_icon(root, sources, 32, work)
+            assert cold is not None and (cold.width(), cold.height()) == (32, 32)
+            assert len(os.listdir(work)) == 1
+
+            def no_pil():
+                raise AssertionError("PIL was needed on a warm load")
+            font_assets.load_pil = no_pil
+            warm = load_icon(root, sources, 32, work)
+            assert (warm.width(), warm.height()) == (32, 32)
+    finally:
+        font_assets.load_pil = original
+        root.destroy()
+
+
+def test_missing_sources():
+    """No readable source gives None so the caller can fall back to the emoji."""
+    with tempfile.TemporaryDirectory() as work:
+        assert load_icon(None, [os.path.join(work, 'missing.ico')], 32, work) is None
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow icon cache")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test script for the FontFlow headless batch mode.
+Installs into a temporary directory with --fonts-dir, so it runs on any platform:
+    python test_font_cli.py   (or: python -m pytest test_font_cli.py)
+"""
+
+import io
+import os
+import sys
+import json
+import zipfile
+import tempfile
+import subprocess
+
+from create_test_fonts import write_test_font
+from font_cli import EXIT_FAILURES, EXIT_NO_FONTS, EXIT_OK, build_parser, run_install
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_font_zip(work, name, fonts):
+    path = os.path.join(work, name)
+    with zipfile.ZipFile(path, 'w') as zf:
+        for font_name in fonts:
+            font_path = write_test_font(os.path.join(work, font_name), os.path.splitext(font_name)[0])
+            zf.write(font_path, font_name)
+    return path
+
+
+def run_cli(work, *archives):
+    args = build_parser().parse_args(['install', *archives, '--json',
+                                      '--fonts-dir', os.path.join(work, 'Fonts'), '--state-dir', work])
+    out = io.StringIO()
+    exit_code = run_install(args, out=out, err=io.StringIO())
+    return exit_code, json.loads(out.getvalue())
+
+
+def test_json_report_per_font():
+    """The JSON report lists every font, and a second run reports them as already installed."""
+    with tempfile.TemporaryDirectory() as work:
+        archive = make_font_zip(work, 'pack.zip', ['Alpha.ttf', 'Beta.ttf'])
+        exit_code, report = run_cli(work, archive)
+        assert exit_code == EXIT_OK and report['exit_code'] == EXIT_OK
+        assert [(font['file'], font['status']) for font in report['fonts']] == \
+            [('Alpha.ttf', 'installed'), ('Beta.ttf', 'installed')]
+        assert report['summary']['installed'] == 2
+        assert [stage for stage in report['stages']] == ['extract', 'validate', 'name', 'install']
+        assert report['stages']['install']['items'] == 2
+
+        exit_code, report = run_cli(work, archive)
+        assert exit_code == EXIT_OK
+        assert {font['status'] for font in report['fonts']} == {'skipped'}
+
+
+def test_exit_codes():
+    """A missing archive gives a failure exit code; archives without fonts give their own."""
+    with tempfile.TemporaryDirectory() as work:
+        archive = make_font_zip(work, 'pack.zip', ['Alpha.ttf'])
+        exit_code, report = run_cli(work, archive, os.path.join(work, 'missing.zip'))
+        assert exit_code == EXIT_FAILURES
+        assert [a['path'] for a in report['archives'] if a['error']] == [os.path.join(work, 'missing.zip')]
+
+        empty = os.path.join(work, 'empty.zip')
+        with zipfile.ZipFile(empty, 'w') as zf:
+            zf.writestr('readme.txt', 'no fonts here')
+        exit_code, _ = run_cli(work, empty)
+        assert exit_code == EXIT_NO_FONTS
+
+
+def test_invalid_fonts_rejected():
+    """Files that aren't valid fonts are reported as failed and nothing is installed for them."""
+    with tempfile.TemporaryDirectory() as work:
+        archive = make_font_zip(work, 'pack.zip', ['Alpha.ttf'])
+        with zipfile.ZipFile(archive, 'a') as zf:
+            zf.writestr('Fake.otf', b'OTTO but not really a font')
+        exit_code, report = run_cli(work, archive)
+        assert exit_code == EXIT_FAILURES
+        assert [(font['file'], font['status']) for font in report['fonts']] == \
+            [('Alpha.ttf', 'installed'), ('Fake.otf', 'failed')]
+        assert os.listdir(os.path.join(work, 'Fonts')) == ['Alpha.ttf']
+
+
+def test_folder_install():
+    """A folder argument installs the archives and loose fonts in all its subfolders."""
+    with tempfile.TemporaryDirectory() as work:
+        library = os.path.join(work, 'library')
+        os.makedirs(os.path.join(library, 'sans', 'zips'))
+        os.makedirs(os.path.join(library, 'serif'))
+        os.replace(make_font_zip(work, 'pack.zip', ['Alpha.ttf', 'Beta.ttf']),
+                   os.path.join(library, 'sans', 'zips', 'pack.zip'))
+        write_test_font(os.path.join(library, 'serif', 'Gamma.ttf'), 'Gamma')
+        exit_code, report = run_cli(work, library)
+        assert exit_code == EXIT_OK
+        assert sorted((font['file'], font['status']) for font in report['fonts']) == \
+            [('Alpha.ttf', 'installed'), ('Beta.ttf', 'installed'), ('Gamma.ttf', 'installed')]
+
+
+def test_progress_events():
+    """--progress writes JSON progress lines to stderr, ending with a complete one."""
+    with tempfile.TemporaryDirectory() as work:
+        archive = make_font_zip(work, 'pack.zip', ['Alpha.ttf', 'Beta.ttf'])
+        args = build_parser().parse_args(['install', archive, '--progress', '--progress-interval', '0.01',
+                                          '--fonts-dir', os.path.join(work, 'Fonts'), '--state-dir', work])
+        err = io.StringIO()
+        assert run_install(args, out=io.StringIO(), err=err) == EXIT_OK
+        events = [json.loads(line) for line in err.getvalue().splitlines()]
+        assert events and all(event['event'] == 'progress' for event in events)
+        final = events[-1]
+        assert final['done'] and final['fonts_done'] == final['fonts_total'] == 2
+        assert final['bytes_done'] == final['bytes_total'] > 0
+
+
+def test_batch_mode_never_imports_gui():
+    """`font_installer.py install` runs without importing tkinter or PIL."""
+    with tempfile.TemporaryDirectory() as work:
+        archive = make_font_zip(work, 'pack.zip', ['Alpha.ttf'])
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', os.path.join(HERE, 'font_installer.py'), 'install', archive,
+             '--json', '--fonts-dir', os.path.join(work, 'Fonts'), '--state-dir', work],
+            capture_output=True, text=True)
+        assert completed.returncode == EXIT_OK, completed.stderr[-500:]
+        imported = [line.split('|')[-1].strip() for line in completed.stderr.splitlines()
+                    if line.startswith('import time:')]
+        assert 'font_cli' in imported
+        assert not [name for name in imported if name.startswith(('tkinter', '_tkinter', 'PIL'))]
+        assert json.loads(completed.stdout)['summary']['installed'] == 1
+
+
+def test_commands_import_what_they_use():
+    """Importing font_cli and parsing a command line loads none of the install machinery."""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         "import font_cli; font_cli.build_parser().parse_args(['install', 'a.zip', '--workers', '2'])"],
+        cwd=HERE, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr[-500:]
+    imported = {line.split('|')[-1].strip() for line in completed.stderr.splitlines()
+                if line.startswith('import time:')}
+    assert 'font_cli' in imported
+    assert not imported & {'font_engine', 'font_archives', 'font_journal', 'font_uninstall', 'zipfile', 'json'}
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow headless batch mode")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
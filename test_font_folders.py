@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for FontFlow folder ingestion.
+Builds small folder trees in a temporary directory, so it runs on any platform:
+    python test_font_folders.py   (or: python -m pytest test_font_folders.py)
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from font_folders import FolderFeed, walk_fonts
+
+
+def touch(path, data=b'x'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def test_walk_finds_archives_and_fonts():
+    """Archives and fonts are found in every subfolder; other files and symlinked folders are not."""
+    with tempfile.TemporaryDirectory() as work:
+        expected = {
+            touch(os.path.join(work, 'lib', 'Top.TTF')),
+            touch(os.path.join(work, 'lib', 'a', 'pack.zip')),
+            touch(os.path.join(work, 'lib', 'a', 'b', 'c', 'Deep.otc')),
+        }
+        touch(os.path.join(work, 'lib', 'a', 'readme.txt'))
+        try:
+            os.symlink(os.path.join(work, 'lib'), os.path.join(work, 'lib', 'a', 'loop'))
+        except (OSError, NotImplementedError):
+            pass  # Symlinks need extra rights on Windows
+        extra = touch(os.path.join(work, 'Named.txt'))
+        found = list(walk_fonts([os.path.join(work, 'lib'), extra]))
+        assert len(found) == len(set(found))
+        assert set(found) == expected | {extra}  # Files given by name are kept whatever their suffix
+        assert found[-1] == extra
+
+
+def test_walk_reports_unreadable_folders():
+    """Folders that can't be listed are reported and the walk goes on."""
+    with tempfile.TemporaryDirectory() as work:
+        first = touch(os.path.join(work, 'First.ttf'))
+        touch(os.path.join(work, 'gone', 'Lost.ttf'))
+        kept = touch(os.path.join(work, 'kept', 'Kept.ttf'))
+        errors = []
+        walk = walk_fonts([work], on_error=lambda path, e: errors.append((path, type(e))))
+        assert next(walk) == first
+        shutil.rmtree(os.path.join(work, 'gone'))  # Removed before the walk gets to it
+        assert list(walk) == [kept]
+        assert errors == [(os.path.join(work, 'gone'), FileNotFoundError)]
+
+
+def test_feed_is_bounded_and_stoppable():
+    """The walk waits while the queue is full and stops when the consumer stops."""
+    with tempfile.TemporaryDirectory() as work:
+        for i in range(50):
+            touch(os.path.join(work, f'dir{i % 5}', f'Font{i}.ttf'))
+        feed = FolderFeed([work], queue_size=4)
+        paths = iter(feed)
+        first = next(paths)
+        time.sleep(0.2)
+        assert sum(len(batch) for batch in list(feed._queue.queue)) <= 4
+        paths.close()
+        assert not feed._thread.is_alive()
+        assert feed.found == 1 and first.endswith('.ttf')
+
+        feed = FolderFeed([work, os.path.join(work, 'missing')], queue_size=4)
+        assert len(list(feed)) == 51  # The missing path is passed on for the scanner to report
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow folder ingestion")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script for the FontFlow installed-font index.
+Works on a temporary fonts directory, so it runs on any platform:
+    python test_font_index.py   (or: python -m pytest test_font_index.py)
+"""
+
+import io
+import os
+import sys
+import json
+import tempfile
+
+from create_test_fonts import build_test_font
+from font_archives import FontSource
+from font_backend import DirectoryFontBackend
+from font_engine import InstallEngine
+from font_index import InstalledFontIndex
+
+
+def memory_source(filename, data):
+    return FontSource(filename, len(data), 'memory', lambda: io.BytesIO(data))
+
+
+def write_file(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def test_skips_installed_font():
+    """A font identical to one already installed is skipped, even under another name."""
+    with tempfile.TemporaryDirectory() as work:
+        fonts_dir = os.path.join(work, 'Fonts')
+        os.makedirs(fonts_dir)
+        existing = build_test_font('Index Test', outlines=b'A' * 1000)
+        write_file(os.path.join(fonts_dir, 'Existing.ttf'), existing)
+        index = InstalledFontIndex(fonts_dir, os.path.join(work, 'index.json')).load()
+        engine = InstallEngine(DirectoryFontBackend(fonts_dir), workers=2, font_index=index)
+        summary = engine.run([memory_source('Renamed.ttf', existing),
+                              memory_source('SameSize.ttf', build_test_font('Index Test', outlines=b'B' * 1000)),
+                              memory_source('New.ttf', build_test_font('Index Test', outlines=b'C' * 10))])
+        assert summary.skipped_count == 1
+        assert summary.bytes_saved == len(existing)
+        assert summary.installed_count == 2
+        assert sorted(os.listdir(fonts_dir)) == ['Existing.ttf', 'New.ttf', 'SameSize.ttf']
+
+
+def test_skips_duplicates_within_run():
+    """The same font in two archives of one run is only installed once."""
+    with tempfile.TemporaryDirectory() as work:
+        fonts_dir = os.path.join(work, 'Fonts')
+        os.makedirs(fonts_dir)
+        index = InstalledFontIndex(fonts_dir, os.path.join(work, 'index.json')).load()
+        engine = InstallEngine(DirectoryFontBackend(fonts_dir), workers=1, font_index=index)
+        data = build_test_font('Font', outlines=b'x' * 500)
+        summary = engine.run([memory_source('Font.ttf', data), memory_source('Font.ttf', data)])
+        assert summary.installed_count == 1
+        assert summary.skipped_count == 1
+
+
+def test_index_persists_digests():
+    """Digests survive a reload and are only dropped for files that changed."""
+    with tempfile.TemporaryDirectory() as work:
+        fonts_dir = os.path.join(work, 'Fonts')
+        os.makedirs(fonts_dir)
+        index_path = os.path.join(work, 'index.json')
+        write_file(os.path.join(fonts_dir, 'A.ttf'), b'a' * 100)
+        write_file(os.path.join(fonts_dir, 'B.ttf'), b'b' * 100)
+        index = InstalledFontIndex(fonts_dir, index_path).load()
+        assert index.find_duplicate(memory_source('X.ttf', b'a' * 100)) == 'A.ttf'
+        index.save()
+
+        with open(index_path) as f:
+            saved = {name: digest for name, _, _, digest in json.load(f)['files']}
+        assert saved['A.ttf'] is not None and saved['B.ttf'] is not None
+
+        # B changes size and C appears; A keeps its digest
+        write_file(os.path.join(fonts_dir, 'B.ttf'), b'b' * 200)
+        write_file(os.path.join(fonts_dir, 'C.ttf'), b'c' * 100)
+        os.utime(fonts_dir, ns=(0, os.stat(fonts_dir).st_mtime_ns + 10 ** 9))
+        reloaded = InstalledFontIndex(fonts_dir, index_path).load()
+        entries = {entry[0]: entry for entry in reloaded._files.values()}
+        assert entries['A.ttf'][3] == saved['A.ttf']
+        assert entries['B.ttf'][3] is None and entries['C.ttf'][3] is None
+        assert len(reloaded) == 3
+
+
+def test_unchanged_directory_is_not_listed():
+    """When the directory mtime is unchanged the saved listing is trusted."""
+    with tempfile.TemporaryDirectory() as work:
+        fonts_dir = os.path.join(work, 'Fonts')
+        os.makedirs(fonts_dir)
+        index_path = os.path.join(work, 'index.json')
+        write_file(os.path.join(fonts_dir, 'A.ttf'), b'a')
+        InstalledFontIndex(fonts_dir, index_path).load().save()
+        reloaded = InstalledFontIndex(fonts_dir, index_path).load()
+        assert not reloaded.dirty
+        assert len(reloaded) == 1
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow installed-font index")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
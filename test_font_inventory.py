@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test script for the FontFlow installed-font inventory.
+Uses the in-memory registry and file system, so it runs on any platform:
+    python test_font_inventory.py   (or: python -m pytest test_font_inventory.py)
+"""
+
+import io
+import os
+import sys
+import tempfile
+
+from create_test_fonts import build_test_font
+from font_archives import FontSource
+from font_backend import DirectoryFontBackend
+from font_engine import InstallEngine
+from font_inventory import FontInventory, LocalFileSystem, MemoryFileSystem
+from font_registry import FONTS_REGISTRY_KEY, HKCU, HKLM, MemoryRegistry
+
+SYSTEM_DIR = 'C:\\Windows\\Fonts'
+USER_DIR = 'C:\\Users\\test\\AppData\\Local\\Microsoft\\Windows\\Fonts'
+SCOPES = [(HKLM, SYSTEM_DIR), (HKCU, USER_DIR)]
+
+
+def make_installed_fonts():
+    """Registry and file system with one system font, one user font and an orphan."""
+    fs = MemoryFileSystem()
+    registry = MemoryRegistry()
+    system_key = registry.open_key(HKLM, FONTS_REGISTRY_KEY, write=True)
+    user_key = registry.open_key(HKCU, FONTS_REGISTRY_KEY, write=True)
+    fs.add_file(SYSTEM_DIR, 'Arial.ttf')
+    registry.set_value(system_key, 'Arial (TrueType)', 'arial.ttf')
+    fs.add_file(USER_DIR, 'Inter.otf')
+    registry.set_value(user_key, 'Inter (OpenType)', USER_DIR + '\\Inter.otf')
+    fs.add_file(SYSTEM_DIR, 'Leftover.ttf')
+    return fs, registry
+
+
+def test_queries():
+    """Installed, registered, conflicting and orphaned fonts are reported across both scopes."""
+    with tempfile.TemporaryDirectory() as work:
+        fs, registry = make_installed_fonts()
+        inventory = FontInventory(registry, fs, SCOPES, os.path.join(work, 'inventory.json')).load()
+        assert inventory.is_installed('ARIAL.TTF') and inventory.is_installed('Inter.otf')
+        assert not inventory.is_installed('Leftover.ttf')  # No registry value
+        assert inventory.is_registered('arial (truetype)')
+        assert inventory.conflicting_name('Arial (TrueType)', 'arial.ttf') is None
+        assert inventory.conflicting_name('Arial (TrueType)', 'Arial-New.ttf') == 'arial.ttf'
+        assert inventory.conflicting_name('Inter (OpenType)', 'Other.otf', HKCU) == USER_DIR + '\\Inter.otf'
+        assert inventory.orphaned_files() == {os.path.join(SYSTEM_DIR, 'Leftover.ttf')}
+
+
+def test_refresh_rereads_only_changes():
+    """A reload from the snapshot re-reads nothing; a change re-reads only its directory and key."""
+    with tempfile.TemporaryDirectory() as work:
+        index_path = os.path.join(work, 'inventory.json')
+        fs, registry = make_installed_fonts()
+        inventory = FontInventory(registry, fs, SCOPES, index_path).load()
+        assert inventory.last_refresh == {'dirs': 2, 'keys': 2}
+        inventory.save()
+
+        listings = fs.listings
+        reloaded = FontInventory(registry, fs, SCOPES, index_path).load()
+        assert reloaded.last_refresh == {'dirs': 0, 'keys': 0}
+        assert fs.listings == listings and not reloaded.dirty
+        assert reloaded.is_installed('Inter.otf')
+
+        fs.add_file(USER_DIR, 'New.ttf')
+        user_key = registry.open_key(HKCU, FONTS_REGISTRY_KEY, write=True)
+        registry.set_value(user_key, 'New (TrueType)', USER_DIR + '\\New.ttf')
+        reloaded.refresh()
+        assert reloaded.last_refresh == {'dirs': 1, 'keys': 1}
+        assert reloaded.is_installed('New.ttf') and reloaded.is_installed('Arial.ttf')
+
+
+def test_local_file_system_lists_fonts():
+    """The local file system lists only font files and reports missing directories."""
+    with tempfile.TemporaryDirectory() as work:
+        for name in ('A.ttf', 'B.OTF', 'readme.txt'):
+            open(os.path.join(work, name), 'wb').close()
+        fs = LocalFileSystem()
+        assert sorted(fs.list_fonts(work)) == ['A.ttf', 'B.OTF']
+        assert fs.dir_mtime_ns(os.path.join(work, 'missing')) is None
+
+
+def test_engine_reports_name_conflicts():
+    """Installing a font whose registry name belongs to another file is reported in the summary."""
+    with tempfile.TemporaryDirectory() as work:
+        fonts_dir = os.path.join(work, 'Fonts')
+        os.makedirs(fonts_dir)
+        backend = DirectoryFontBackend(fonts_dir)
+        key = backend.registry.open_key(HKLM, FONTS_REGISTRY_KEY, write=True)
+        backend.registry.set_value(key, 'Sample (TrueType)', 'sample-old.ttf')
+        inventory = FontInventory(backend.registry, MemoryFileSystem(), [(HKLM, fonts_dir)],
+                                  os.path.join(work, 'inventory.json')).load()
+        engine = InstallEngine(backend, workers=2, name_resolver=lambda path: 'Sample (TrueType)',
+                               inventory=inventory)
+        data = build_test_font('Sample')
+        summary = engine.run([FontSource('sample.ttf', len(data), 'memory', lambda: io.BytesIO(data))])
+        assert summary.installed_count == 1
+        assert summary.name_conflicts == [('sample.ttf', 'sample-old.ttf')]
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow installed-font inventory")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
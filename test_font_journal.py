@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Test script for the FontFlow install journal.
+Installs into a temporary directory with an in-memory registry and kills the
+run at every phase, so it runs on any platform:
+    python test_font_journal.py   (or: python -m pytest test_font_journal.py)
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+
+import font_cli
+from create_test_fonts import build_test_font
+from font_archives import FontSource
+from font_backend import DirectoryFontBackend, FontChangeNotifier
+from font_engine import InstallEngine
+from font_index import InstalledFontIndex
+from font_journal import (COMPACT_MIN_BYTES, COPIED, REGISTERED, RESOURCE_ADDED, InstallJournal, read_journal,
+                          resume_runs)
+from font_registry import FONTS_REGISTRY_KEY, HKLM, MemoryRegistry
+
+FONTS = {f'Font{i}.ttf': build_test_font(f'Journaled{i}') for i in range(4)}
+CRASH_FONT = 'Font2.ttf'
+
+
+class SimulatedCrash(BaseException):
+    """The process died here; nothing after it runs, nothing is cleaned up."""
+
+
+class CrashRegistry(MemoryRegistry):
+    """MemoryRegistry that dies while writing one value."""
+
+    def __init__(self, crash_value=None):
+        super().__init__()
+        self.crash_value = crash_value
+
+    def set_value(self, key, name, value):
+        if value == self.crash_value:
+            raise SimulatedCrash('registry')
+        super().set_value(key, name, value)
+
+
+class CrashBackend(DirectoryFontBackend):
+    """Directory backend that counts its steps and dies at one of them."""
+
+    def __init__(self, fonts_dir, registry, crash=None):
+        super().__init__(fonts_dir, registry)
+        self.crash = crash
+        self.copies = []
+        self.resources = []
+        self.broadcasts = 0
+
+    def write_font(self, source, hasher=None):
+        if self.crash == 'copy' and source.filename == CRASH_FONT:
+            # Power lost half way through the copy: the truncated file stays
+            with open(self.destination_for(source.filename), 'wb') as f:
+                f.write(FONTS[source.filename][:100])
+            raise SimulatedCrash('copy')
+        self.copies.append(source.filename)
+        return super().write_font(source, hasher)
+
+    def add_font_resource(self, font_path):
+        if self.crash == 'resource' and os.path.basename(font_path) == CRASH_FONT:
+            raise SimulatedCrash('resource')
+        self.resources.append(os.path.basename(font_path))
+        return True
+
+    def notify_font_change(self):
+        if self.crash == 'notify':
+            raise SimulatedCrash('notify')
+        self.broadcasts += 1
+
+
+def sources():
+    return [FontSource(name, len(data), 'memory', lambda data=data: io.BytesIO(data)) for name, data in FONTS.items()]
+
+
+def crashed_run(backend, journal):
+    """An install run driven step by step on this thread, until the backend kills it."""
+    engine = InstallEngine(backend, journal=journal)
+    journal.begin(backend.fonts_dir, backend.registry_hive)
+    try:
+        notifier = FontChangeNotifier(backend.notify_font_change)
+        writer = backend.open_registry_writer()
+        for source in sources():
+            engine.install(source, notifier=notifier, registry_writer=writer)
+        writer.close()
+        notifier.flush()
+        journal.end()
+    except SimulatedCrash:
+        pass  # Records still waiting for a sync die with the process
+    else:
+        raise AssertionError("the run wasn't interrupted")
+
+
+def assert_installed(fonts_dir, registry):
+    values = registry.values(HKLM, FONTS_REGISTRY_KEY)
+    assert sorted(values.values()) == sorted(FONTS), values
+    for name, data in FONTS.items():
+        with open(os.path.join(fonts_dir, name), 'rb') as f:
+            assert f.read() == data, name
+
+
+def crash_and_resume(work, crash, sync_every, after_crash=None):
+    fonts_dir = os.path.join(work, 'Fonts')
+    os.mkdir(fonts_dir)
+    journal_path = os.path.join(work, 'journal.jsonl')
+    registry = CrashRegistry(CRASH_FONT if crash == 'registry' else None)
+    crashed_run(CrashBackend(fonts_dir, registry, crash), InstallJournal(journal_path, sync_every=sync_every))
+    if after_crash is not None:
+        after_crash(fonts_dir)
+
+    registry.crash_value = None
+    backend = CrashBackend(fonts_dir, registry)
+    with InstallJournal(journal_path) as journal:
+        results = resume_runs(journal, backend)
+        assert journal.incomplete_runs() == []
+    assert backend.copies == []
+    return fonts_dir, registry, backend, {result.filename: result for result in results}
+
+
+def test_resume_does_only_missing_steps():
+    """A run killed at each phase is finished by resume with only the steps the journal lacks."""
+    # Fonts before the crash were copied and added; their registry batch is written at the end of the run
+    expected = {
+        # The truncated copy is found in the Fonts folder, fails validation and is left to a reinstall
+        'copy': {'Font0.ttf': [REGISTERED], 'Font1.ttf': [REGISTERED], 'Font2.ttf': []},
+        'resource': {'Font0.ttf': [REGISTERED], 'Font1.ttf': [REGISTERED], 'Font2.ttf': [RESOURCE_ADDED, REGISTERED]},
+        'registry': {'Font2.ttf': [REGISTERED], 'Font3.ttf': [REGISTERED]},
+        'notify': {},
+    }
+    for crash, steps in expected.items():
+        with tempfile.TemporaryDirectory() as work:
+            fonts_dir, registry, backend, results = crash_and_resume(work, crash, sync_every=1)
+            assert {name: result.steps for name, result in results.items()} == steps, (crash, results)
+            assert all(bool(result.error) == (crash == 'copy' and name == CRASH_FONT)
+                       for name, result in results.items()), (crash, results)
+            assert backend.resources == [name for name, done in steps.items() if RESOURCE_ADDED in done]
+            assert backend.broadcasts == (1 if steps else 0)
+            if crash in ('registry', 'notify'):  # Every font was copied before these
+                assert_installed(fonts_dir, registry)
+
+
+def test_rerun_after_resume_converges():
+    """After resuming, installing everything again leaves every font copied and registered."""
+    for crash in ('copy', 'resource', 'registry', 'notify'):
+        for sync_every in (1, 1000):
+            with tempfile.TemporaryDirectory() as work:
+                fonts_dir, registry, _, results = crash_and_resume(work, crash, sync_every)
+                if crash == 'copy':
+                    assert results[CRASH_FONT].error
+                backend = CrashBackend(fonts_dir, registry)
+                with InstallJournal(os.path.join(work, 'journal.jsonl')) as journal:
+                    engine = InstallEngine(backend, font_index=InstalledFontIndex(
+                        fonts_dir, os.path.join(work, 'index.json')).load(), journal=journal)
+                    summary = engine.run(sources())
+                    assert not summary.failed_installs, (crash, sync_every, summary.failed_installs)
+                    assert journal.incomplete_runs() == []
+                assert_installed(fonts_dir, registry)
+
+
+def test_lost_records_are_recovered_from_the_fonts_folder():
+    """Copies whose records never reached the disk are found in the Fonts folder and finished."""
+    def added_later(fonts_dir):
+        # Another program's font, put into the folder a day after the crash
+        path = os.path.join(fonts_dir, 'Later.ttf')
+        with open(path, 'wb') as f:
+            f.write(build_test_font('Later'))
+        later = time.time() + 86400
+        os.utime(path, (later, later))
+
+    with tempfile.TemporaryDirectory() as work:
+        _, registry, backend, results = crash_and_resume(work, 'registry', sync_every=1000, after_crash=added_later)
+        # Only the run's start was synced; Font0-3 were all copied before the registry batch died.
+        # Later.ttf is outside the run's window and isn't taken for one of its copies
+        assert sorted(results) == sorted(FONTS)
+        assert all(result.steps == [RESOURCE_ADDED, REGISTERED] for result in results.values())
+        assert sorted(registry.values(HKLM, FONTS_REGISTRY_KEY).values()) == sorted(FONTS)
+
+    with tempfile.TemporaryDirectory() as work:
+        _, _, _, results = crash_and_resume(work, 'copy', sync_every=1000)
+        assert results[CRASH_FONT].error and results[CRASH_FONT].steps == []
+        assert sorted(results) == ['Font0.ttf', 'Font1.ttf', 'Font2.ttf']
+
+
+def test_journal_records_are_batched():
+    """Records are fsync'd in batches, and a torn last line is ignored when read back."""
+    with tempfile.TemporaryDirectory() as work:
+        path = os.path.join(work, 'journal.jsonl')
+        journal = InstallJournal(path, sync_every=100, sync_interval=3600)
+        journal.begin(work, HKLM)
+        for i in range(250):
+            journal.copied(f'F{i}.ttf', i)
+        assert journal.syncs == 3  # begin, then two full batches
+        journal.end()
+        journal.close()
+        assert journal.syncs == 4 and journal.error is None
+
+        with open(path, 'ab') as f:
+            f.write(json.dumps({'v': 1, 'run': 'x', 'event': 'begin'}).encode()[:20])
+        (run,) = read_journal(path)
+        assert run.ended and len(run.fonts) == 250
+        assert run.fonts['f7.ttf'].phases == {COPIED} and run.fonts['f7.ttf'].size == 7
+
+        # Outside a run nothing is recorded
+        journal = InstallJournal(path)
+        journal.registered('Name', 'F1.ttf')
+        journal.close()
+        assert len(read_journal(path)[0].fonts) == 250
+
+
+def journal_state(runs):
+    """What every run read back from a journal shows, record times aside."""
+    return {run.run_id: (run.fonts_dir, run.ended, {key: (font.filename, font.size, font.digest, font.origin,
+                                                          font.name, font.existed, font.replaced,
+                                                          sorted(font.phases))
+                                                    for key, font in run.fonts.items()})
+            for run in runs}
+
+
+def test_journal_is_compacted_when_opened():
+    """A journal of mostly finished runs is rewritten as their final state, and read back the same."""
+    with tempfile.TemporaryDirectory() as work:
+        path = os.path.join(work, 'journal.jsonl')
+        journal = InstallJournal(path, sync_every=1000)
+        run_ids = []
+        for i in range(40):
+            run_ids.append(journal.begin(work, HKLM))
+            for j in range(20):
+                filename = f'Run{i}Font{j}.ttf'
+                journal.copied(filename, j, digest=f'{i}-{j}', origin='fonts.zip', existed=j == 0)
+                if j == 1:
+                    journal.copied(filename, j + 1)  # Copied again by the same run
+                    journal.replaced(filename, f'Font {i} {j}', 'Old.ttf')
+                if j != 2 or i % 2:
+                    journal.resource_added(filename)
+                    journal.registered(f'Font {i} {j}', filename)
+            if i != 35:  # Interrupted
+                journal.end()
+        for run_id in run_ids[:30]:  # Rolled back, with the interrupted run's later neighbour
+            for j in range(20):
+                journal.removed(f'Run{run_ids.index(run_id)}Font{j}.ttf', run_id)
+        for j in range(20):
+            journal.removed(f'Run36Font{j}.ttf', run_ids[36])
+        journal.close()
+        size = os.path.getsize(path)
+        assert size >= COMPACT_MIN_BYTES
+        before = journal_state(read_journal(path))
+
+        with InstallJournal(path) as journal:
+            runs = journal.runs()
+        assert os.path.getsize(path) * 2 <= size
+        # Only the empty runs nothing interrupted started before are gone
+        kept = run_ids[30:]
+        assert [run.run_id for run in runs] == kept
+        assert journal_state(runs) == journal_state(read_journal(path)) == {
+            run_id: state for run_id, state in before.items() if run_id in kept}
+        assert [run.run_id for run in InstallJournal(path).incomplete_runs()] == [run_ids[35]]
+
+        # Already compact: left as it is
+        with open(path, 'rb') as f:
+            compacted = f.read()
+        InstallJournal(path).runs()
+        with open(path, 'rb') as f:
+            assert f.read() == compacted
+
+
+def test_cli_resume():
+    """`resume` finishes an interrupted run and a complete run leaves nothing to resume."""
+    with tempfile.TemporaryDirectory() as work:
+        fonts_dir = os.path.join(work, 'Fonts')
+        state_dir = os.path.join(work, 'state')
+        os.mkdir(state_dir)
+        os.mkdir(fonts_dir)
+        journal_path = os.path.join(state_dir, 'fontflow_journal.jsonl')
+        # The CLI's backend keeps its registry in memory, so stop before the first registry write
+        crashed_run(CrashBackend(fonts_dir, MemoryRegistry(), 'resource'), InstallJournal(journal_path, sync_every=1))
+
+        out = io.StringIO()
+        args = font_cli.build_parser().parse_args(['resume', '--json', '--fonts-dir', fonts_dir,
+                                                   '--state-dir', state_dir])
+        assert font_cli.run_resume(args, out=out) == font_cli.EXIT_OK
+        report = json.loads(out.getvalue())
+        assert [font['file'] for font in report['fonts']] == ['Font0.ttf', 'Font1.ttf', 'Font2.ttf']
+        assert report['fonts'][2]['steps'] == [RESOURCE_ADDED, REGISTERED]
+
+        out = io.StringIO()
+        assert font_cli.run_resume(args, out=out) == font_cli.EXIT_OK
+        assert json.loads(out.getvalue())['fonts'] == []
+
+        archive_dir = os.path.join(work, 'fonts_in')
+        os.mkdir(archive_dir)
+        with open(os.path.join(archive_dir, 'Extra.ttf'), 'wb') as f:
+            f.write(build_test_font('Extra'))
+        args = font_cli.build_parser().parse_args(['install', archive_dir, '--json', '--fonts-dir', fonts_dir,
+                                                   '--state-dir', state_dir])
+        assert font_cli.run_install(args, out=io.StringIO()) == font_cli.EXIT_OK
+        runs = read_journal(journal_path)
+        assert len(runs) == 2 and all(run.ended for run in runs)
+        assert runs[1].fonts['extra.ttf'].complete
+
+
+def test_cli_install_registers_unregistered_copies():
+    """An install after a crash registers the fonts the crashed run copied, and skips them once registered."""
+    with tempfile.TemporaryDirectory() as work:
+        fonts_dir = os.path.join(work, 'Fonts')
+        state_dir = os.path.join(work, 'state')
+        library = os.path.join(work, 'library')
+        for path in (fonts_dir, state_dir, library):
+            os.mkdir(path)
+        for name, data in FONTS.items():
+            with open(os.path.join(library, name), 'wb') as f:
+                f.write(data)
+        # Font0-2 are copied, none registered: the registry batch is written at the end of the run
+        crashed_run(CrashBackend(fonts_dir, MemoryRegistry(), 'resource'),
+                    InstallJournal(os.path.join(state_dir, 'fontflow_journal.jsonl'), sync_every=1))
+
+        def install():
+            out = io.StringIO()
+            args = font_cli.build_parser().parse_args(['install', library, '--json', '--fonts-dir', fonts_dir,
+                                                       '--state-dir', state_dir])
+            assert font_cli.run_install(args, out=out, err=io.StringIO()) == font_cli.EXIT_OK
+            return {font['file']: font['status'] for font in json.loads(out.getvalue())['fonts']}
+
+        assert install() == {name: 'installed' for name in FONTS}
+        assert install() == {name: 'skipped' for name in FONTS}
+
+
+def test_cli_state_dir_problems():
+    """A missing state directory is created for installs, refused for resume, and a journal error fails the run."""
+    with tempfile.TemporaryDirectory() as work:
+        fonts_dir = os.path.join(work, 'Fonts')
+        library = os.path.join(work, 'library')
+        os.mkdir(library)
+        with open(os.path.join(library, 'Font0.ttf'), 'wb') as f:
+            f.write(FONTS['Font0.ttf'])
+
+        def cli(command, *argv):
+            out, err = io.StringIO(), io.StringIO()
+            args = font_cli.build_parser().parse_args([command, *argv, '--json', '--fonts-dir', fonts_dir])
+            code = (font_cli.run_install if command == 'install' else font_cli.run_resume)(args, out=out, err=err)
+            return code, json.loads(out.getvalue()) if out.getvalue() else err.getvalue()
+
+        new_state = os.path.join(work, 'new', 'state')
+        code, report = cli('install', library, '--state-dir', new_state)
+        assert code == font_cli.EXIT_OK and report['journal_error'] is None
+        assert os.path.exists(os.path.join(new_state, 'fontflow_journal.jsonl'))
+
+        code, message = cli('resume', '--state-dir', os.path.join(work, 'typo'))
+        assert code == font_cli.EXIT_USAGE and 'typo' in message
+
+        # The journal path can't be opened for appending
+        broken_state = os.path.join(work, 'broken')
+        os.makedirs(os.path.join(broken_state, 'fontflow_journal.jsonl'))
+        code, report = cli('install', library, '--state-dir', broken_state)
+        assert code == font_cli.EXIT_FAILURES and 'not written' in report['journal_error']
+        # Neither the unreadable journal nor the in-memory registry shows Font0 registered
+        assert report['summary']['installed'] == 1 and report['summary']['skipped'] == 0
+
+
+def test_cli_closes_journal_on_error():
+    """A CLI install that raises still writes out the journal records it had pending."""
+    with tempfile.TemporaryDirectory() as work:
+        fonts_dir = os.path.join(work, 'Fonts')
+        state_dir = os.path.join(work, 'state')
+        library = os.path.join(work, 'library')
+        os.mkdir(library)
+        with open(os.path.join(library, 'Font0.ttf'), 'wb') as f:
+            f.write(FONTS['Font0.ttf'])
+
+        def failing_run(engine, sources, on_result=None, progress=None):
+            engine.journal.begin(fonts_dir, HKLM)
+            engine.journal.copied('Font0.ttf', len(FONTS['Font0.ttf']))
+            raise RuntimeError("disk went away")
+
+        original = InstallEngine.run
+        InstallEngine.run = failing_run
+        try:
+            args = font_cli.build_parser().parse_args(['install', library, '--json', '--fonts-dir', fonts_dir,
+                                                       '--state-dir', state_dir])
+            try:
+                font_cli.run_install(args, out=io.StringIO(), err=io.StringIO())
+                raise AssertionError("the install didn't raise")
+            except RuntimeError:
+                pass
+        finally:
+            InstallEngine.run = original
+        (run,) = read_journal(os.path.join(state_dir, 'fontflow_journal.jsonl'))
+        assert list(run.fonts) == ['font0.ttf'] and not run.ended
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow install journal")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
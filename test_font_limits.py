@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test script for FontFlow archive resource limits.
+Builds small archives in a temporary directory, so it runs on any platform:
+    python test_font_limits.py   (or: python -m pytest test_font_limits.py)
+"""
+
+import io
+import os
+import sys
+import zipfile
+import tempfile
+
+from create_test_fonts import build_test_font, build_test_font_header
+from font_archives import ArchiveEvent, ArchiveScanner, FontSource, ZipFontArchive
+from font_backend import DirectoryFontBackend
+from font_engine import EXTRACT_IN_MEMORY_LIMIT, InstallEngine
+from font_limits import ArchiveLimits, LimitExceeded
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return path
+
+
+def limit_hit(path, limits):
+    try:
+        ZipFontArchive(path, limits=limits).close()
+    except LimitExceeded as e:
+        return e.limit
+    raise AssertionError("archive over its limits was opened")
+
+
+def test_central_directory_limits():
+    """Each limit is checked from the central directory and named when it is hit."""
+    font = build_test_font('Limited')
+    with tempfile.TemporaryDirectory() as work:
+        many = make_zip(os.path.join(work, 'many.zip'), {f'Font{i}.ttf': font for i in range(6)})
+        deep = make_zip(os.path.join(work, 'deep.zip'), {'/'.join(['d'] * 9) + '/Deep.ttf': font})
+        bomb = make_zip(os.path.join(work, 'bomb.zip'), {'Font.ttf': font, 'zeros.bin': bytes(4 * 1024 ** 2)})
+        assert limit_hit(many, ArchiveLimits(max_members=5)) == 'max_members'
+        assert limit_hit(many, ArchiveLimits(max_total_size=5 * len(font))) == 'max_total_size'
+        assert limit_hit(many, ArchiveLimits(max_member_size=len(font) - 1)) == 'max_member_size'
+        assert limit_hit(deep, ArchiveLimits(max_path_depth=8)) == 'max_path_depth'
+        assert limit_hit(bomb, ArchiveLimits()) == 'max_ratio'
+        with ZipFontArchive(bomb, limits=ArchiveLimits(max_ratio=None)) as archive:
+            assert len(archive.fonts) == 1
+
+        events = []
+        with ArchiveScanner([many, bomb], limits=ArchiveLimits(max_members=5),
+                            on_event=events.append) as scanner:
+            assert len(list(scanner)) == 0
+        failed = {event.path: str(event.error) for event in events if event.kind == ArchiveEvent.FAILED}
+        assert failed[many].endswith('many.zip: max members limit exceeded (6 > 5)')
+        assert failed[bomb].startswith('zeros.bin: max ratio limit exceeded')
+
+
+def test_inner_archive_over_limits_is_skipped():
+    """An inner ZIP that breaks the limits is skipped and reported; the outer archive's fonts remain."""
+    font = build_test_font('Outer')
+    inner = io.BytesIO()
+    with zipfile.ZipFile(inner, 'w') as zf:
+        for i in range(4):
+            zf.writestr(f'Inner{i}.ttf', font)
+    with tempfile.TemporaryDirectory() as work:
+        path = make_zip(os.path.join(work, 'outer.zip'), {'Outer.ttf': font, 'inner.zip': inner.getvalue()})
+        with ZipFontArchive(path, limits=ArchiveLimits(max_members=3)) as archive:
+            assert [source.filename for source in archive.fonts] == ['Outer.ttf']
+            assert archive.skipped[0][0].endswith('inner.zip')
+            assert 'max members' in archive.skipped[0][1]
+
+
+def test_reader_stops_member_early():
+    """A stream is cut off as soon as it passes its declared size or the ratio limit."""
+    limits = ArchiveLimits(max_ratio=10, ratio_min_size=100)
+    reader = limits.reader(io.BytesIO(b'x' * 100000), 'liar.ttf', 1000)
+    read = 0
+    try:
+        while reader.read(256):
+            read += 256
+        raise AssertionError("oversized member read to the end")
+    except LimitExceeded as e:
+        assert e.limit == 'declared_size' and read < 1000 + 256
+    reader = limits.reader(io.BytesIO(b'x' * 100000), 'bomb.ttf', 100000, compressed_size=20)
+    try:
+        reader.read()
+        raise AssertionError("ratio not enforced")
+    except LimitExceeded as e:
+        assert e.limit == 'max_ratio'
+    reader = limits.reader(io.BytesIO(b'x' * 1000), 'ok.ttf', 1000, compressed_size=500)
+    assert len(reader.read()) == 1000
+    reader.seek(0)
+    assert len(reader.read()) == 1000  # Read again after a seek, not counted twice
+
+
+def test_engine_reports_limit():
+    """Fonts that break the limits while being read fail with the limit and leave nothing behind."""
+    limits = ArchiveLimits()
+    small = build_test_font('Small')
+    large_size = EXTRACT_IN_MEMORY_LIMIT + 4096
+    large = build_test_font_header('Large', large_size)
+    large += bytes(large_size - len(large))
+
+    def lying(filename, data, declared):
+        return FontSource(filename, declared, 'memory',
+                          lambda: limits.reader(io.BytesIO(data + bytes(4096)), filename, declared))
+
+    with tempfile.TemporaryDirectory() as fonts_dir:
+        summary = InstallEngine(DirectoryFontBackend(fonts_dir), workers=2).run(
+            [lying('Small.ttf', small, len(small)), lying('Large.ttf', large, len(large))])
+        assert summary.installed_count == 0
+        assert summary.failed_installs == [('Small.ttf', 'archive limit exceeded'),
+                                           ('Large.ttf', 'archive limit exceeded')]
+        assert os.listdir(fonts_dir) == []
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow archive limits")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test script for FontFlow font metadata parsing.
+Uses synthetic fonts from create_test_fonts.py, so it runs on any platform:
+    python test_font_metadata.py   (or: python -m pytest test_font_metadata.py)
+"""
+
+import os
+import sys
+import struct
+import tempfile
+
+from create_test_fonts import build_sfnt, write_test_collection, write_test_font
+from font_metadata import (FontFormatError, get_font_name_from_file, iter_font_faces, parse_name_table,
+                           read_font_faces_from_file, read_font_names, read_font_names_from_file)
+
+
+class CountingFile:
+    """Wraps a file and counts the bytes read through it."""
+
+    def __init__(self, f):
+        self.f = f
+        self.bytes_read = 0
+
+    def seek(self, offset):
+        self.f.seek(offset)
+
+    def read(self, n):
+        data = self.f.read(n)
+        self.bytes_read += len(data)
+        return data
+
+
+def test_reads_names():
+    """Family, subfamily, full name and PostScript name are read from the name table."""
+    with tempfile.TemporaryDirectory() as work:
+        path = write_test_font(os.path.join(work, 'odd_file-name.ttf'), 'Noto Sans', 'Bold Italic')
+        names = read_font_names_from_file(path)
+        assert names.family == 'Noto Sans'
+        assert names.subfamily == 'Bold Italic'
+        assert names.full_name == 'Noto Sans Bold Italic'
+        assert names.postscript_name == 'NotoSans-BoldItalic'
+        assert get_font_name_from_file(path) == 'Noto Sans Bold Italic (TrueType)'
+
+
+def test_cff_font_is_opentype():
+    """CFF-flavoured fonts are registered as OpenType."""
+    with tempfile.TemporaryDirectory() as work:
+        path = write_test_font(os.path.join(work, 'a.otf'), 'Source Serif', sfnt_version=b'OTTO')
+        assert get_font_name_from_file(path) == 'Source Serif (OpenType)'
+
+
+def test_prefers_windows_unicode_records():
+    """Platform 3/encoding 1 records win over Macintosh ones."""
+    mac = 'Mac Name'.encode('mac_roman')
+    win = 'Windows Name'.encode('utf-16-be')
+    records = struct.pack('>HHHHHH', 1, 0, 0, 4, len(mac), 0)
+    records += struct.pack('>HHHHHH', 3, 1, 0x409, 4, len(win), len(mac))
+    table = struct.pack('>HHH', 0, 2, 6 + len(records)) + records + mac + win
+    assert parse_name_table(table) == {4: 'Windows Name'}
+
+
+def test_large_font_reads_few_bytes():
+    """Only the directory and name table are read, however large the font is."""
+    with tempfile.TemporaryDirectory() as work:
+        path = write_test_font(os.path.join(work, 'Huge.ttf'), 'Huge', padding=2 * 1024 ** 3)
+        with open(path, 'rb') as f:
+            counting = CountingFile(f)
+            assert read_font_names(counting).family == 'Huge'
+        assert counting.bytes_read < 4096
+
+
+def test_collection_faces():
+    """Every face of a collection is read and combined into one registry name."""
+    with tempfile.TemporaryDirectory() as work:
+        path = write_test_collection(os.path.join(work, 'cambria.ttc'),
+                                     [('Cambria', 'Regular'), ('Cambria Math', 'Regular')])
+        faces = read_font_faces_from_file(path)
+        assert [face.full_name for face in faces] == ['Cambria', 'Cambria Math']
+        assert [face.face_index for face in faces] == [0, 1]
+        assert faces[1].offset > faces[0].offset
+        assert get_font_name_from_file(path) == 'Cambria & Cambria Math (TrueType)'
+
+
+def test_opentype_collection():
+    """CFF collections (.otc) are registered as OpenType."""
+    with tempfile.TemporaryDirectory() as work:
+        path = write_test_collection(os.path.join(work, 'a.otc'), [('Serif A', 'Regular'), ('Serif B', 'Bold')],
+                                     sfnt_version=b'OTTO')
+        assert get_font_name_from_file(path) == 'Serif A & Serif B Bold (OpenType)'
+
+
+def test_large_collection_reads_lazily():
+    """Faces of a large collection are read one at a time without loading the file."""
+    with tempfile.TemporaryDirectory() as work:
+        faces = [('Noto Sans CJK JP', 'Regular'), ('Noto Sans CJK KR', 'Regular'),
+                 ('Noto Sans CJK SC', 'Regular'), ('Noto Sans CJK TC', 'Regular')]
+        path = write_test_collection(os.path.join(work, 'NotoSansCJK.ttc'), faces, padding=200 * 1024 ** 2)
+        with open(path, 'rb') as f:
+            counting = CountingFile(f)
+            first = next(iter_font_faces(counting))
+            assert first.family == 'Noto Sans CJK JP'
+            first_face_bytes = counting.bytes_read
+            assert len(list(iter_font_faces(counting))) == 4
+        assert first_face_bytes < 2048
+        assert counting.bytes_read < 16384
+
+
+def test_not_a_font_falls_back_to_file_name():
+    """Files that aren't fonts are rejected by the parser and named after the file."""
+    with tempfile.TemporaryDirectory() as work:
+        path = os.path.join(work, 'TestFont-Regular.ttf')
+        with open(path, 'wb') as f:
+            f.write(b"TTF dummy content for testing - not a real font")
+        try:
+            read_font_names_from_file(path)
+            assert False, "expected FontFormatError"
+        except FontFormatError:
+            pass
+        assert get_font_name_from_file(path) == 'TestFont Regular (TrueType)'
+
+
+def test_truncated_directory():
+    """A table directory that runs past the end of the file is rejected."""
+    with tempfile.TemporaryDirectory() as work:
+        data, _ = build_sfnt({b'name': b''})
+        path = os.path.join(work, 'Truncated.ttf')
+        with open(path, 'wb') as f:
+            f.write(data[:20])
+        try:
+            read_font_names_from_file(path)
+            assert False, "expected FontFormatError"
+        except FontFormatError:
+            pass
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow font metadata")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
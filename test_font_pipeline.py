@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test script for the FontFlow staged pipeline.
+Runs on any platform:
+    python test_font_pipeline.py   (or: python -m pytest test_font_pipeline.py)
+"""
+
+import sys
+import time
+import random
+import threading
+
+from font_pipeline import Pipeline, Stage
+
+
+def test_results_in_input_order():
+    """Results come out in input order even when workers finish out of order."""
+    def jitter(item):
+        time.sleep(random.random() / 500)
+        return item * 2
+
+    pipeline = Pipeline([Stage('double', jitter, workers=4), Stage('add', lambda item: item + 1, workers=3)])
+    assert list(pipeline.run(range(200))) == [item * 2 + 1 for item in range(200)]
+    report = pipeline.report()
+    assert list(report) == ['double', 'add']
+    assert report['double']['items'] == report['add']['items'] == 200
+
+
+def test_back_pressure():
+    """A slow stage fills its queue and holds back the input; no more than window items are in flight."""
+    lock = threading.Lock()
+    state = {'in_flight': 0, 'most': 0}
+
+    def enter(item):
+        with lock:
+            state['in_flight'] += 1
+            state['most'] = max(state['most'], state['in_flight'])
+        return item
+
+    def slow_exit(item):
+        time.sleep(0.002)
+        with lock:
+            state['in_flight'] -= 1
+        return item
+
+    pipeline = Pipeline([Stage('fast', enter, workers=2, queue_size=2),
+                         Stage('slow', slow_exit, workers=1, queue_size=3)], window=6)
+    assert list(pipeline.run(range(100))) == list(range(100))
+    assert state['most'] <= 6
+    assert pipeline.metrics['slow'].queue_max <= 3
+    assert pipeline.report()['slow']['utilization'] > pipeline.report()['fast']['utilization']
+
+
+def test_stage_error_is_raised_in_place():
+    """An exception in a stage is raised when its item is reached, after the items before it."""
+    def check(item):
+        if item == 5:
+            raise ValueError("bad item")
+        return item
+
+    seen = []
+    try:
+        for item in Pipeline([Stage('check', check, workers=3)]).run(range(20)):
+            seen.append(item)
+        raise AssertionError("no error raised")
+    except ValueError:
+        pass
+    assert seen == [0, 1, 2, 3, 4]
+
+
+def test_early_stop_ends_workers():
+    """Closing the output early stops every worker thread."""
+    before = threading.active_count()
+    results = Pipeline([Stage('a', lambda item: item, workers=3), Stage('b', lambda item: item, workers=2)]).run(
+        iter(range(10 ** 6)))
+    assert next(results) == 0
+    results.close()
+    assert threading.active_count() == before
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow pipeline")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test script for FontFlow archive previews.
+Builds small archives in a temporary directory, so it runs on any platform:
+    python test_font_preview.py   (or: python -m pytest test_font_preview.py)
+"""
+
+import os
+import io
+import sys
+import tarfile
+import zipfile
+import tempfile
+import threading
+
+from font_archives import FONT_EXTENSIONS, SuffixFilter
+from font_preview import PreviewScan, preview_archive, read_central_directory
+from font_selection import ArchiveSelection
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, 'w') as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return path
+
+
+def test_preview_from_central_directory():
+    """Fonts are counted by format with their unpacked size; inner archives and other files are listed."""
+    with tempfile.TemporaryDirectory() as work:
+        archive = make_zip(os.path.join(work, 'Inter.zip'), {
+            'Inter/static/Inter-Regular.ttf': b'x' * 3000, 'Inter/static/Inter-Bold.TTF': b'x' * 3000,
+            'Inter/Inter.otf': b'x' * 2000, 'Inter/': b'', 'Inter/extras.zip': b'PK',
+            'OFL.txt': b'licence', 'specimen.pdf': b'%PDF',
+        })
+        preview = preview_archive(archive)
+        assert preview.fonts == {'.ttf': 2, '.otf': 1}
+        assert preview.font_count == 3 and preview.font_bytes == 8000
+        assert (preview.archives, preview.other_files, preview.other_bytes) == (1, 2, 11)
+        assert preview.formats() == '2 TTF, 1 OTF'
+
+        item = ArchiveSelection().add(archive)
+        item.preview, item.font_count = preview, preview.font_count
+        assert item.describe() == ('Inter.zip  ·  8 KB  ·  3 fonts (2 TTF, 1 OTF; 7 KB)  ·  '
+                                   '1 inner archive  ·  2 other files')
+
+        loose = make_zip(os.path.join(work, 'Loose.otf'), {})
+        assert preview_archive(loose).fonts == {'.otf': 1}
+
+
+def test_tarball_preview():
+    """Tarballs are previewed from their member headers; inner archives count as other files."""
+    with tempfile.TemporaryDirectory() as work:
+        path = os.path.join(work, 'Inter.tar.xz')
+        with tarfile.open(path, 'w:xz') as tar:
+            for name, data in {'Inter/Inter-Regular.ttf': b'x' * 3000, 'Inter/Inter.otf': b'x' * 2000,
+                               'Inter/extras.zip': b'PK', 'OFL.txt': b'licence'}.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        preview = preview_archive(path)
+        assert preview.fonts == {'.ttf': 1, '.otf': 1} and preview.font_bytes == 5000
+        assert (preview.archives, preview.other_files, preview.other_bytes) == (0, 2, 9)
+        assert preview_archive(path, cancelled=lambda: True) is None
+
+
+def test_central_directory_matches_zipfile():
+    """The raw directory reader agrees with zipfile, also for zip64 directories and prepended data."""
+    with tempfile.TemporaryDirectory() as work:
+        path = os.path.join(work, 'many.zip')
+        with zipfile.ZipFile(path, 'w') as zf:
+            for i in range(70000):  # More than a classic end record can count
+                zf.writestr(f'f{i}.ttf', b'x' * (i % 7))
+            zf.writestr(zipfile.ZipInfo('Ünïcode/Font.otf'), b'font')
+            zf.comment = b'comment'
+        with zipfile.ZipFile(path) as zf:
+            expected = [(info.filename, info.file_size, info.compress_size) for info in zf.infolist()]
+        entries = [(name.decode('utf-8'), size, compressed) for name, size, compressed in read_central_directory(path)]
+        assert entries == expected
+
+        prefixed = os.path.join(work, 'setup.exe')
+        with open(prefixed, 'wb') as f:
+            f.write(b'MZ' + bytes(1000))
+            f.write(open(make_zip(os.path.join(work, 'small.zip'), {'A.ttf': b'a'}), 'rb').read())
+        assert list(read_central_directory(prefixed)) == [(b'A.ttf', 1, 1)]
+        junk = os.path.join(work, 'junk.zip')
+        with open(junk, 'wb') as f:
+            f.write(b'PK\x05\x06 but not a zip')
+        try:
+            list(read_central_directory(junk))
+            raise AssertionError("junk read as a ZIP")
+        except zipfile.BadZipFile:
+            pass
+
+
+def test_suffix_filter_matches_splitext():
+    """SuffixFilter agrees with os.path.splitext on font names, folders and names without a suffix."""
+    suffixes = SuffixFilter(FONT_EXTENSIONS | {'.zip'})
+    names = ['a/Font.TTF', 'Font.otc', 'dir.ttf/', 'README', 'x.tar.zip', 'notttf', 'a.b/c', 'Font.ttf.bak']
+    for name in names:
+        ext = os.path.splitext(name)[1].lower()
+        assert suffixes.match(name) == (ext if ext in suffixes.suffixes else None), name
+
+
+def test_scan_is_cancellable():
+    """A scan reports every archive (unreadable ones with an error) and stops when cancelled."""
+    with tempfile.TemporaryDirectory() as work:
+        paths = [make_zip(os.path.join(work, f'pack{i}.zip'), {f'Font{i}.ttf': b'x'}) for i in range(20)]
+        broken = os.path.join(work, 'broken.zip')
+        with open(broken, 'wb') as f:
+            f.write(b'not a zip')
+        done = threading.Event()
+        seen = []
+        scan = PreviewScan([broken] + paths, lambda path, preview, error: seen.append((path, preview, error)),
+                           on_done=done.set).start()
+        assert done.wait(10) and scan.join(10)
+        assert [path for path, _, _ in seen] == [broken] + paths
+        assert seen[0][2] is not None and all(preview.font_count == 1 for _, preview, _ in seen[1:])
+
+        seen.clear()
+        done.clear()
+
+        def cancel_after_first(path, preview, error):
+            seen.append(path)
+            scan.cancel()
+
+        scan = PreviewScan(paths, cancel_after_first, on_done=done.set)
+        scan.start()
+        assert done.wait(10) and scan.join(10)
+        assert seen == paths[:1] and scan.cancelled and not scan.running
+        assert preview_archive(paths[0], cancelled=lambda: True) is None
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow archive previews")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Test script for FontFlow progress reporting.
+Uses a stand-in for the Tk root, so it runs on any platform:
+    python test_font_progress.py   (or: python -m pytest test_font_progress.py)
+"""
+
+import io
+import os
+import sys
+import json
+import zipfile
+import tempfile
+import threading
+
+import font_cli
+from create_test_fonts import build_test_font
+from font_archives import DEFAULT_SCAN_WORKERS, FontSource
+from font_backend import DirectoryFontBackend
+from font_engine import InstallEngine
+from font_progress import TransferProgress, UiUpdateChannel, UiUpdatePump
+
+
+class FakeRoot:
+    """Records after() callbacks; tick() runs the pending ones like one pass of mainloop."""
+
+    def __init__(self):
+        self.pending = []
+        self.scheduled = 0
+
+    def after(self, ms, callback):
+        self.scheduled += 1
+        self.pending.append(callback)
+
+    def tick(self):
+        pending, self.pending = self.pending, []
+        for callback in pending:
+            callback()
+
+
+def test_status_is_coalesced():
+    """Only the latest status is applied per tick and counters are summed."""
+    root = FakeRoot()
+    channel = UiUpdateChannel()
+    applied = []
+    UiUpdatePump(root, channel, lambda status, counters: applied.append((status, counters))).start()
+    for i in range(1000):
+        channel.count('fonts_done')
+        channel.set_status(f"font {i}")
+    root.tick()
+    assert applied == [("font 999", {'fonts_done': 1000})]
+    root.tick()
+    assert len(applied) == 1  # Nothing new: status not re-applied
+
+
+def test_actions_run_in_order_and_pump_stops():
+    """One-off actions all run, in order, and the pump stops after the channel is closed."""
+    root = FakeRoot()
+    channel = UiUpdateChannel()
+    pump = UiUpdatePump(root, channel, lambda status, counters: None)
+    pump.start()
+    calls = []
+    channel.call(lambda: calls.append('progress.stop'))
+    channel.call(lambda: calls.append('showinfo'))
+    channel.close()
+    root.tick()
+    assert calls == ['progress.stop', 'showinfo']
+    assert not pump.running and root.pending == []
+
+
+def test_callbacks_do_not_grow_with_fonts():
+    """Tk callbacks depend on the number of ticks, not on how many fonts a worker posts."""
+    root = FakeRoot()
+    channel = UiUpdateChannel()
+    pump = UiUpdatePump(root, channel, lambda status, counters: None)
+    pump.start()
+
+    def worker():
+        for i in range(20000):
+            channel.set_status(f"font {i}")
+        channel.close()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    ticks = 0
+    while pump.running:
+        root.tick()
+        ticks += 1
+    thread.join()
+    assert channel.posted == 20000
+    assert pump.tk_callbacks == ticks == root.scheduled
+    assert pump.tk_callbacks < channel.posted
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rate_and_eta_use_moving_average():
+    """Throughput is averaged over the recent window, so the ETA follows a slowdown."""
+    clock = FakeClock()
+    progress = TransferProgress(window=5.0, clock=clock)
+    progress.add_total(100 * 1024 * 1024, fonts=100)
+    for _ in range(10):  # 1 MB/s for 10 s
+        clock.now += 1
+        progress.font_done(1024 * 1024)
+    snapshot = progress.snapshot()
+    assert snapshot.fonts_done == 10 and snapshot.fonts_total == 100
+    assert abs(snapshot.rate - 1024 * 1024) < 1
+    for _ in range(10):  # Then 1 MB every 2 s
+        clock.now += 2
+        progress.font_done(1024 * 1024)
+    snapshot = progress.snapshot()
+    assert abs(snapshot.rate - 512 * 1024) < 1  # Only the last 5 s count
+    assert abs(snapshot.eta - (80 * 1024 * 1024) / (512 * 1024)) < 0.01
+    assert abs(snapshot.fraction - 0.2) < 1e-9
+    assert 'MB/s' in snapshot.describe() and 'ETA' in snapshot.describe()
+
+
+def test_fonts_in_flight_count_towards_position():
+    """Bytes of a font still being copied move the bar, and are not counted twice when it finishes."""
+    progress = TransferProgress(clock=FakeClock())
+    progress.add_total(300, fonts=2)
+    progress.extracted(50)
+    assert progress.snapshot().position == 50
+    progress.extracted(50)
+    progress.font_done(100, extracted=100)
+    progress.font_done(200)  # Skipped: nothing extracted
+    snapshot = progress.snapshot()
+    assert (snapshot.position, snapshot.bytes_done, snapshot.bytes_extracted) == (300, 300, 100)
+    assert snapshot.fraction == 1.0
+
+
+def test_engine_reports_bytes():
+    """The install engine counts copied bytes and finished fonts in the run's progress."""
+    data = [build_test_font('Font A', outlines=b'a' * 3000), build_test_font('Font B', outlines=b'b' * 5000)]
+    total = sum(len(d) for d in data)
+    sources = [FontSource(f'Font{i}.ttf', len(d), 'memory', lambda d=d: io.BytesIO(d)) for i, d in enumerate(data)]
+    progress = TransferProgress()
+    progress.add_total(total, fonts=2)
+    with tempfile.TemporaryDirectory() as fonts_dir:
+        summary = InstallEngine(DirectoryFontBackend(fonts_dir), workers=2).run(sources, progress=progress)
+    snapshot = progress.snapshot()
+    assert summary.installed_count == 2
+    assert (snapshot.bytes_done, snapshot.bytes_extracted, snapshot.fonts_done) == (total, total, 2)
+
+
+def test_expected_totals_are_replaced_by_actual():
+    """An archive's estimate counts until it is opened; only fonts beyond it add, and settling drops the rest."""
+    progress = TransferProgress(clock=FakeClock())
+    progress.expect('a.zip', 100, fonts=2)
+    progress.expect('a.zip', 100, fonts=2)
+    progress.expect('b.tar', 50, fonts=1)
+    progress.add_total(30, fonts=1)  # A folder's archive nobody expected
+    assert (progress.snapshot().bytes_total, progress.snapshot().fonts_total) == (180, 4)
+    progress.add_total(120, fonts=3, key='a.zip')  # Holds more than its preview showed (an inner archive)
+    progress.settle('a.zip')
+    progress.add_total(20, fonts=1, key='b.tar')   # Broke off after one font
+    progress.settle('b.tar')
+    assert (progress.snapshot().bytes_total, progress.snapshot().fonts_total) == (170, 5)
+
+
+def test_cli_total_known_up_front():
+    """With more archives than the scanner reads ahead, the CLI's progress total never grows and never falls back."""
+    with tempfile.TemporaryDirectory() as work:
+        archives = []
+        for i in range(3 * DEFAULT_SCAN_WORKERS):
+            archives.append(os.path.join(work, f'pack{i}.zip'))
+            with zipfile.ZipFile(archives[-1], 'w') as zf:
+                for style in ('Regular', 'Bold'):
+                    zf.writestr(f'Pack{i}-{style}.ttf', build_test_font(f'Pack {i}', style, outlines=b'x' * 2000 * i))
+        err = io.StringIO()
+        args = font_cli.build_parser().parse_args(
+            ['install', *archives, '--json', '--progress', '--progress-interval', '0.001',
+             '--fonts-dir', os.path.join(work, 'Fonts'), '--state-dir', os.path.join(work, 'state')])
+        assert font_cli.run_install(args, out=io.StringIO(), err=err) == font_cli.EXIT_OK
+        events = [json.loads(line) for line in err.getvalue().splitlines()]
+        assert len({(event['bytes_total'], event['fonts_total']) for event in events}) == 1
+        fractions = [event['bytes_done'] / event['bytes_total'] for event in events]
+        assert fractions == sorted(fractions) and fractions[-1] == 1.0
+        assert events[-1]['fonts_total'] == 2 * len(archives)
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow progress reporting")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test script for the FontFlow scan cache.
+Builds small archives in a temporary directory, so it runs on any platform:
+    python test_font_scan_cache.py   (or: python -m pytest test_font_scan_cache.py)
+"""
+
+import os
+import sys
+import zipfile
+import tempfile
+
+import font_preview
+from create_test_fonts import build_test_font
+from font_archives import ArchiveScanner
+from font_backend import DirectoryFontBackend
+from font_engine import InstallEngine
+from font_index import InstalledFontIndex
+from font_scan_cache import ScanCache
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return path
+
+
+def test_manifest_follows_archive_version():
+    """A manifest is reused while size and mtime match, and replaced when the archive changes."""
+    with tempfile.TemporaryDirectory() as work:
+        archive = make_zip(os.path.join(work, 'pack.zip'), {'A.ttf': b'a' * 100})
+        cache = ScanCache(os.path.join(work, 'cache.json'))
+        manifest = cache.manifest(archive)
+        manifest.font('A.ttf', 100, 1).digest = 'abc'
+        assert cache.manifest(archive) is manifest
+        assert manifest.font('A.ttf', 100, 1).digest == 'abc'
+        assert manifest.font('A.ttf', 100, 2).digest is None  # Member's CRC changed
+
+        os.utime(archive, ns=(0, 12345))
+        assert cache.get(archive) is None
+        assert cache.manifest(archive) is not manifest
+
+        # With content checks, a rewritten archive whose size and mtime look the same is a miss
+        checked = ScanCache(os.path.join(work, 'checked.json'), verify_content=True)
+        manifest = checked.manifest(archive)
+        assert checked.get(archive) is manifest
+        make_zip(archive, {'B.ttf': b'a' * 100})
+        os.utime(archive, ns=(0, 12345))
+        assert os.path.getsize(archive) == manifest.size
+        assert cache.get(archive) is not None and checked.get(archive) is None
+
+
+def test_saved_cache_is_capped():
+    """The cache survives a reload, least recently used manifests are dropped over the cap."""
+    with tempfile.TemporaryDirectory() as work:
+        paths = [make_zip(os.path.join(work, f'pack{i}.zip'), {f'F{i}.ttf': b'x'}) for i in range(10)]
+        cache_path = os.path.join(work, 'cache.json')
+        cache = ScanCache(cache_path)
+        for path in paths:
+            font_preview.preview_archive(path, cache=cache)
+        cache.get(paths[0])  # Now the most recently used
+        weight = cache.get(paths[1]).weight()
+        cache.max_bytes = 4 * weight
+        cache.save()
+
+        reloaded = ScanCache(cache_path)
+        assert len(reloaded) == 4
+        assert reloaded.get(paths[0]) is not None and reloaded.get(paths[1]) is not None
+        assert reloaded.get(paths[2]) is None
+        assert reloaded.get(paths[9]).preview['fonts'] == {'.ttf': 1}
+
+        with open(cache_path, 'w') as f:
+            f.write('{not json')
+        assert len(ScanCache(cache_path)) == 0
+
+
+def test_warm_preview_reads_nothing():
+    """An unchanged archive is previewed from the cache without reading its directory."""
+    with tempfile.TemporaryDirectory() as work:
+        archive = make_zip(os.path.join(work, 'pack.zip'), {'A.ttf': b'a' * 10, 'B.otf': b'b', 'OFL.txt': b'l'})
+        cache_path = os.path.join(work, 'cache.json')
+        cache = ScanCache(cache_path)
+        cold = font_preview.preview_archive(archive, cache=cache)
+        cache.save()
+
+        reads = []
+        original = font_preview.read_central_directory
+        font_preview.read_central_directory = lambda path: reads.append(path) or original(path)
+        try:
+            warm = font_preview.preview_archive(archive, cache=ScanCache(cache_path))
+            assert reads == []
+            assert (warm.fonts, warm.font_bytes, warm.other_files) == (cold.fonts, cold.font_bytes, cold.other_files)
+            # A different extension set is a different preview
+            assert font_preview.preview_archive(archive, {'.ttf'}, cache=ScanCache(cache_path)).fonts == {'.ttf': 1}
+            assert reads == [archive]
+        finally:
+            font_preview.read_central_directory = original
+
+
+def test_reinstall_skips_without_extracting():
+    """Reinstalling an unchanged archive skips its installed fonts without decompressing them."""
+    fonts = {f'Pack/Font{i}.ttf': build_test_font(f'Cached{i}') for i in range(3)}
+    with tempfile.TemporaryDirectory() as work:
+        archive = make_zip(os.path.join(work, 'pack.zip'), fonts)
+        fonts_dir = os.path.join(work, 'Fonts')
+        os.mkdir(fonts_dir)
+        cache_path = os.path.join(work, 'cache.json')
+        index_path = os.path.join(work, 'index.json')
+
+        def install():
+            cache = ScanCache(cache_path)
+            engine = InstallEngine(DirectoryFontBackend(fonts_dir),
+                                   font_index=InstalledFontIndex(fonts_dir, index_path).load())
+            with ArchiveScanner([archive], cache=cache) as scanner:
+                sources = [source.counted(read.append) for source in scanner]
+                summary = engine.run(sources)
+            cache.save()
+            return summary
+
+        read = []
+        first = install()
+        assert first.installed_count == 3 and sum(read) > 0
+        manifest = ScanCache(cache_path).get(archive)
+        assert all(metadata.digest and metadata.font_name.startswith('Cached')
+                   for metadata in manifest.fonts.values())
+
+        read.clear()
+        second = install()
+        assert second.skipped_count == 3 and read == []
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow scan cache")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
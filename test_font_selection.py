@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script for the FontFlow archive selection and the virtual file list.
+Runs on any platform without a display:
+    python test_font_selection.py   (or: python -m pytest test_font_selection.py)
+"""
+
+import os
+import sys
+import zipfile
+import tempfile
+
+from font_preview import preview_archive
+from font_selection import ArchiveSelection, SelectedArchive
+from font_widgets import ListViewport
+
+
+def write_file(path, data=b'PK'):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def test_same_file_added_once():
+    """An archive picked again through a relative path, a symlink or a hard link is added once."""
+    with tempfile.TemporaryDirectory() as work:
+        archive = write_file(os.path.join(work, 'pack.zip'))
+        selection = ArchiveSelection()
+        assert selection.add(archive) is not None
+        assert selection.add(os.path.join(work, '.', 'pack.zip')) is None
+        if hasattr(os, 'symlink'):
+            try:
+                os.symlink(archive, os.path.join(work, 'link.zip'))
+                assert selection.add(os.path.join(work, 'link.zip')) is None
+            except OSError:
+                pass  # Symlinks need extra rights on Windows
+        os.link(archive, os.path.join(work, 'hard.zip'))
+        assert selection.add(os.path.join(work, 'hard.zip')) is None
+        assert selection.add(os.path.join(work, 'missing.zip')) is None
+        assert len(selection) == 1
+
+
+def test_selection_keeps_order():
+    """Archives keep the order they were picked in, and clear() empties the selection."""
+    with tempfile.TemporaryDirectory() as work:
+        paths = [write_file(os.path.join(work, name)) for name in ('c.zip', 'a.zip', 'b.zip')]
+        selection = ArchiveSelection()
+        added = selection.add_many(paths[:2])
+        assert len(added) == 2
+        assert [item.name for item in selection.add_many(paths)] == ['b.zip']
+        assert [os.path.basename(path) for path in selection.paths()] == ['c.zip', 'a.zip', 'b.zip']
+        assert selection[1].name == 'a.zip'
+        selection.clear()
+        assert len(selection) == 0 and selection.add(paths[0]) is not None
+
+
+def test_row_text_and_font_count():
+    """Rows show the size and the font count once the archive has been scanned."""
+    with tempfile.TemporaryDirectory() as work:
+        archive = os.path.join(work, 'Inter.zip')
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('Inter-Regular.ttf', b'x' * 10)
+            zf.writestr('Inter-Bold.OTF', b'x' * 10)
+            zf.writestr('fonts/', b'')
+            zf.writestr('OFL.txt', b'license')
+        item = ArchiveSelection().add(archive)
+        assert item.describe().endswith('·  … fonts')
+        # Set the way the GUI's background preview scan sets it
+        item.font_count = preview_archive(archive).font_count
+        assert item.font_count == 2
+        assert item.describe() == 'Inter.zip  ·  1 KB  ·  2 fonts'
+
+    item = SelectedArchive('Big.zip', 5 * 1024 * 1024, ('path', 'Big.zip'))
+    item.error = 'File is not a zip file'
+    assert item.describe() == 'Big.zip  ·  5.0 MB  ·  unreadable'
+
+
+def test_viewport_scrolling():
+    """The viewport stays within the list and reports scrollbar fractions."""
+    viewport = ListViewport(visible_rows=5)
+    viewport.set_count(3)
+    assert viewport.visible_range() == range(0, 3) and viewport.fractions() == (0.0, 1.0)
+    viewport.set_count(100)
+    viewport.scroll(2, 'pages')
+    assert viewport.visible_range() == range(10, 15)
+    assert viewport.fractions() == (0.1, 0.15)
+    viewport.moveto(1.0)
+    assert viewport.visible_range() == range(95, 100)
+    viewport.scroll(-1, 'units')
+    assert viewport.first == 94
+    viewport.set_count(10)
+    assert viewport.visible_range() == range(5, 10)
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow archive selection")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script for FontFlow startup timing and lazy imports.
+Doesn't open a window, so it runs on any platform:
+    python test_font_startup.py   (or: python -m pytest test_font_startup.py)
+"""
+
+import os
+import sys
+import json
+import tempfile
+import subprocess
+
+from font_startup import StartupTimer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 10.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_marks_are_relative_to_start():
+    """Milestones are milliseconds since start, and only the first mark of a name counts."""
+    clock = FakeClock()
+    timer = StartupTimer(clock=clock)
+    clock.now += 0.25
+    assert timer.mark('tk_root') == 250
+    clock.now += 0.5
+    assert timer.mark('tk_root') == 250
+    assert timer.mark('first_paint') == 750
+    assert list(timer.marks) == ['tk_root', 'first_paint']
+
+
+def test_dump_json():
+    """Timings can be written as JSON for launch-time tracking."""
+    clock = FakeClock()
+    timer = StartupTimer(clock=clock)
+    clock.now += 0.1
+    timer.mark('interactive')
+    with tempfile.TemporaryDirectory() as work:
+        path = os.path.join(work, 'startup.json')
+        timer.dump(path)
+        with open(path, encoding='utf-8') as f:
+            assert json.load(f) == {'milestones_ms': {'interactive': 100.0}}
+
+
+def test_gui_module_defers_heavy_imports():
+    """Importing the GUI module loads neither PIL, zipfile, the registry nor the install engine."""
+    deferred = ['PIL', 'zipfile', 'tempfile', 'winreg', 'font_backend', 'font_registry',
+                'font_engine', 'font_archives', 'tkinter.messagebox', 'tkinter.filedialog']
+    completed = subprocess.run(
+        [sys.executable, '-c', f"import sys, font_installer; print([m for m in {deferred!r} if m in sys.modules])"],
+        cwd=HERE, capture_output=True, text=True)
+    if 'No module named' in completed.stderr and 'tkinter' in completed.stderr:
+        return  # Python built without Tk: nothing to check
+    assert completed.returncode == 0, completed.stderr[-500:]
+    assert completed.stdout.strip() == '[]'
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow startup")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Test script for FontFlow uninstall and rollback.
+Uses stand-ins for the Windows DLLs and an in-memory registry, so it runs on any platform:
+    python test_font_uninstall.py   (or: python -m pytest test_font_uninstall.py)
+"""
+
+import io
+import os
+import sys
+import json
+import zipfile
+import tempfile
+
+import font_cli
+from create_test_fonts import build_test_font, write_test_font
+from font_archives import FontSource
+from font_backend import WindowsFontBackend, WM_FONTCHANGE
+from font_engine import InstallEngine
+from font_inventory import FontInventory
+from font_journal import InstallJournal, read_journal
+from font_progress import TransferProgress
+from font_registry import FONTS_REGISTRY_KEY, HKLM, MemoryRegistry, RegistryWriter
+from font_uninstall import RollbackEngine, installed_fonts
+
+
+class FakeGdi32:
+    """Stand-in for gdi32 that keeps the set of loaded font resources."""
+
+    def __init__(self):
+        self.loaded = set()
+        self.removals = 0
+
+    def AddFontResourceW(self, path):
+        self.loaded.add(path)
+        return 1
+
+    def RemoveFontResourceW(self, path):
+        self.removals += 1
+        if path not in self.loaded:
+            return 0
+        self.loaded.discard(path)
+        return 1
+
+
+class FakeUser32:
+    """Stand-in for user32 that records broadcasts instead of sending them."""
+
+    def __init__(self):
+        self.messages = []
+
+    def SendMessageTimeoutW(self, hwnd, msg, wparam, lparam, flags, timeout, result):
+        self.messages.append(msg)
+        return 1
+
+
+class LockedRegistry(MemoryRegistry):
+    """In-memory registry that refuses to delete values with 'Locked' in their name."""
+
+    def delete_value(self, key, name):
+        if 'Locked' in name:
+            raise PermissionError(f"cannot delete {name}")
+        super().delete_value(key, name)
+
+
+def make_backend(fonts_dir, registry=None):
+    return WindowsFontBackend(fonts_dir, gdi32=FakeGdi32(), user32=FakeUser32(),
+                              registry=registry if registry is not None else MemoryRegistry())
+
+
+def install(backend, journal, fonts, inventory=None):
+    """One journaled run installing {filename: (family, style)}."""
+    sources = []
+    for filename, (family, style) in fonts.items():
+        data = build_test_font(family, style)
+        sources.append(FontSource(filename, len(data), 'pack.zip', lambda data=data: io.BytesIO(data)))
+    summary = InstallEngine(backend, journal=journal, inventory=inventory).run(sources)
+    assert summary.installed_count == len(fonts)
+    return journal.runs()[-1].run_id
+
+
+def registered(backend):
+    return sorted(backend.registry.values(HKLM, FONTS_REGISTRY_KEY).values())
+
+
+def test_run_rolled_back_in_one_batch():
+    """Rolling back a run opens the Fonts key once, unloads and deletes its fonts and broadcasts once."""
+    with tempfile.TemporaryDirectory() as work:
+        fonts_dir = os.path.join(work, 'Fonts')
+        os.mkdir(fonts_dir)
+        backend = make_backend(fonts_dir)
+        journal = InstallJournal(os.path.join(work, 'journal.jsonl'))
+        alpha = install(backend, journal, {f'Alpha{i}.ttf': ('Alpha', style)
+                                           for i, style in enumerate(['Regular', 'Bold', 'Italic'])})
+        install(backend, journal, {'Beta.ttf': ('Beta', 'Regular')})
+        backend.registry.opens = 0
+        backend.user32.messages.clear()
+
+        fonts = installed_fonts(journal, fonts_dir, [alpha])
+        assert sorted(font.filename for font in fonts) == ['Alpha0.ttf', 'Alpha1.ttf', 'Alpha2.ttf']
+        progress = TransferProgress()
+        results = []
+        summary = RollbackEngine(backend, journal).uninstall(fonts, results.append, progress)
+
+        assert summary.removed_count == 3 and summary.failed_removals == []
+        assert [result.font.filename for result in results] == [font.filename for font in fonts]
+        assert backend.registry.opens == 1
+        assert backend.user32.messages == [WM_FONTCHANGE]
+        assert backend.gdi32.loaded == {os.path.join(fonts_dir, 'Beta.ttf')}
+        assert os.listdir(fonts_dir) == ['Beta.ttf'] and registered(backend) == ['Beta.ttf']
+        snapshot = progress.snapshot()
+        assert snapshot.fonts_done == snapshot.fonts_total == 3
+        assert snapshot.bytes_done == snapshot.bytes_total == summary.bytes_freed > 0
+
+        journal.close()
+        assert installed_fonts(InstallJournal(journal.journal_path), fonts_dir, [alpha]) == []
+        # Rolling back again finds nothing to do
+        assert RollbackEngine(backend).uninstall([]).total_fonts == 0
+
+
+def test_families_across_runs():
+    """Fonts are chosen by family across runs, and a file reinstalled later belongs to the later run."""
+    with tempfile.TemporaryDirectory() as work:
+        fonts_dir = os.path.join(work, 'Fonts')
+        os.mkdir(fonts_dir)
+        backend = make_backend(fonts_dir)
+        journal = InstallJournal(os.path.join(work, 'journal.jsonl'))
+        first = install(backend, journal, {'Alpha.ttf': ('Alpha', 'Regular'), 'Beta.ttf': ('Beta', 'Regular')})
+        second = install(backend, journal, {'Beta-Bold.ttf': ('Beta', 'Bold'), 'Gamma.ttf': ('Gamma', 'Regular')})
+        third = install(backend, journal, {'Alpha.ttf': ('Alpha', 'Bold')})
+
+        assert sorted(font.filename for font in installed_fonts(journal, fonts_dir, families=['beta'])) == \
+            ['Beta-Bold.ttf', 'Beta.ttf']
+        assert [font.filename for font in installed_fonts(journal, fonts_dir, [first])] == ['Beta.ttf']
+        (alpha,) = installed_fonts(journal, fonts_dir, families=['Alpha'])
+        assert alpha.run_id == third and alpha.run_ids == [first, third]
+        assert alpha.names == ['Alpha (TrueType)', 'Alpha Bold (TrueType)']
+
+        summary = RollbackEngine(backend, journal).uninstall(
+            installed_fonts(journal, fonts_dir, [first, second], families=['Beta', 'Alpha']))
+        assert summary.removed_count == 2
+        assert sorted(os.listdir(fonts_dir)) == ['Alpha.ttf', 'Gamma.ttf']
+        assert registered(backend) == ['Alpha.ttf', 'Alpha.ttf', 'Gamma.ttf']
+
+        # Both names the reinstalled file was registered under are deleted with it
+        RollbackEngine(backend, journal).uninstall(installed_fonts(journal, fonts_dir, families=['alpha']))
+        assert registered(backend) == ['Gamma.ttf']
+
+
+def test_failed_registry_delete_keeps_font():
+    """A font whose registry value can't be deleted stays installed and is reported; the rest are removed."""
+    with tempfile.TemporaryDirectory() as work:
+        fonts_dir = os.path.join(work, 'Fonts')
+        os.mkdir(fonts_dir)
+        backend = make_backend(fonts_dir, LockedRegistry())
+        journal = InstallJournal(os.path.join(work, 'journal.jsonl'))
+        run_id = install(backend, journal, {'Locked.ttf': ('Locked', 'Regular'), 'Free.ttf': ('Free', 'Regular')})
+        # A file deleted by hand counts as removed
+        write_test_font(os.path.join(fonts_dir, 'Stray.ttf'), 'Stray')
+        os.remove(os.path.join(fonts_dir, 'Free.ttf'))
+
+        summary = RollbackEngine(backend, journal).uninstall(installed_fonts(journal, fonts_dir, [run_id]))
+        assert summary.removed_count == 1
+        assert [filename for filename, _ in summary.failed_removals] == ['Locked.ttf']
+        assert [name for name, _ in summary.registry_failures] == ['Locked (TrueType)']
+        assert sorted(os.listdir(fonts_dir)) == ['Locked.ttf', 'Stray.ttf']
+        assert registered(backend) == ['Locked.ttf']
+        assert [font.filename for font in installed_fonts(journal, fonts_dir)] == ['Locked.ttf']
+
+
+def test_preexisting_fonts_survive_rollback():
+    """A file that was there before is left in place, and the registry gets back the values it had before the run."""
+    with tempfile.TemporaryDirectory() as work:
+        fonts_dir = os.path.join(work, 'Fonts')
+        os.mkdir(fonts_dir)
+        backend = make_backend(fonts_dir)
+        write_test_font(os.path.join(fonts_dir, 'Old.ttf'), 'Old')
+        write_test_font(os.path.join(fonts_dir, 'AlphaOld.ttf'), 'Alpha')
+        # Left in the folder but not registered; the run registers it under a new name
+        write_test_font(os.path.join(fonts_dir, 'Orphan.ttf'), 'Orphan')
+        key = backend.registry.open_key(HKLM, FONTS_REGISTRY_KEY, write=True)
+        backend.registry.set_value(key, 'Old (TrueType)', 'Old.ttf')
+        backend.registry.set_value(key, 'Alpha (TrueType)', 'AlphaOld.ttf')
+        inventory = FontInventory(backend.registry, scopes=[(HKLM, fonts_dir)],
+                                  index_path=os.path.join(work, 'inventory.json')).load()
+        journal = InstallJournal(os.path.join(work, 'journal.jsonl'))
+        first = install(backend, journal, {'Old.ttf': ('Old', 'Regular'), 'Alpha.ttf': ('Alpha', 'Regular'),
+                                           'Beta.ttf': ('Beta', 'Regular'), 'Orphan.ttf': ('Orphan', 'Regular')},
+                        inventory)
+        # Reinstalling a file an earlier run copied doesn't make it pre-existing, nor its name a replaced one
+        inventory.refresh()
+        install(backend, journal, {'Beta.ttf': ('Beta', 'Regular')}, inventory)
+        assert backend.registry.values(HKLM, FONTS_REGISTRY_KEY)['Alpha (TrueType)'] == 'Alpha.ttf'
+
+        fonts = installed_fonts(journal, fonts_dir)
+        assert sorted(font.filename for font in fonts if font.preexisting) == ['Old.ttf', 'Orphan.ttf']
+        results = []
+        summary = RollbackEngine(backend, journal).uninstall(fonts, results.append)
+        assert summary.removed_count == 2 and summary.skipped_count == 2 and summary.failed_removals == []
+        skipped = [result for result in results if result.skipped]
+        assert sorted(result.font.filename for result in skipped) == ['Old.ttf', 'Orphan.ttf']
+        assert all('pre-existing' in result.error for result in skipped)
+        assert sorted(os.listdir(fonts_dir)) == ['AlphaOld.ttf', 'Old.ttf', 'Orphan.ttf']
+        assert backend.registry.values(HKLM, FONTS_REGISTRY_KEY) == {'Old (TrueType)': 'Old.ttf',
+                                                                       'Alpha (TrueType)': 'AlphaOld.ttf'}
+        # The skipped font is no longer FontFlow's to remove
+        assert installed_fonts(journal, fonts_dir, [first]) == []
+
+
+def test_same_filename_twice_in_a_run():
+    """Two archives shipping the same file name in one run: the run's own copy isn't taken for a pre-existing one."""
+    with tempfile.TemporaryDirectory() as work:
+        fonts_dir = os.path.join(work, 'Fonts')
+        state_dir = os.path.join(work, 'state')
+        os.mkdir(state_dir)
+        archives = []
+        for name, family in (('a.zip', 'Foo'), ('b.zip', 'Foo Two')):
+            archives.append(os.path.join(work, name))
+            with zipfile.ZipFile(archives[-1], 'w') as zf:
+                zf.writestr('Foo.ttf', build_test_font(family))
+
+        def cli(command, *argv):
+            out = io.StringIO()
+            args = font_cli.build_parser().parse_args([command, *argv, '--json', '--fonts-dir', fonts_dir,
+                                                       '--state-dir', state_dir])
+            (font_cli.run_install if command == 'install' else font_cli.run_uninstall)(args, out=out,
+                                                                                       err=io.StringIO())
+            return json.loads(out.getvalue())
+
+        assert cli('install', *archives, '--workers', '1')['summary']['installed'] == 2
+        report = cli('uninstall', '--run', 'last')
+        assert [font['status'] for font in report['fonts']] == ['removed']
+        assert report['summary']['removed'] == 1 and report['summary']['skipped'] == 0
+        assert os.listdir(fonts_dir) == []
+
+
+def test_registry_writer_deletes_in_batches():
+    """Deletions are queued with writes, and values that are already gone count as deleted."""
+    registry = MemoryRegistry()
+    with RegistryWriter(registry, HKLM, FONTS_REGISTRY_KEY, flush_size=100) as writer:
+        for i in range(150):
+            writer.queue(f'Font {i}', f'Font{i}.ttf')
+    with RegistryWriter(registry, HKLM, FONTS_REGISTRY_KEY, flush_size=100) as writer:
+        for i in range(0, 200, 2):
+            writer.queue_delete(f'Font {i}')
+    assert writer.deleted == 100 and writer.failures == []
+    assert len(registry.values(HKLM, FONTS_REGISTRY_KEY)) == 75
+    assert registry.opens == 2
+
+
+def test_cli_uninstall():
+    """`uninstall --list` shows the runs, `--run last` removes what the latest one installed."""
+    with tempfile.TemporaryDirectory() as work:
+        fonts_dir = os.path.join(work, 'Fonts')
+        state_dir = os.path.join(work, 'state')
+        library = os.path.join(work, 'library')
+        for path in (state_dir, library):
+            os.mkdir(path)
+        for family in ('Alpha', 'Beta'):
+            write_test_font(os.path.join(library, f'{family}.ttf'), family)
+
+        def cli(*argv):
+            out = io.StringIO()
+            args = font_cli.build_parser().parse_args(list(argv) + ['--fonts-dir', fonts_dir, '--state-dir', state_dir])
+            command = font_cli.run_install if argv[0] == 'install' else font_cli.run_uninstall
+            code = command(args, out=out, err=io.StringIO())
+            return code, json.loads(out.getvalue()) if '--json' in argv and out.getvalue() else out.getvalue()
+
+        assert cli('install', library, '--json')[0] == font_cli.EXIT_OK
+        assert cli('uninstall', '--json')[0] == font_cli.EXIT_USAGE
+        code, listing = cli('uninstall', '--list', '--json')
+        assert code == font_cli.EXIT_OK and sorted(listing['runs'][0]['fonts']) == ['Alpha.ttf', 'Beta.ttf']
+
+        code, report = cli('uninstall', '--run', 'last', '--family', 'beta', '--json')
+        assert code == font_cli.EXIT_OK and [font['file'] for font in report['fonts']] == ['Beta.ttf']
+        assert report['summary']['removed'] == 1 and report['progress']['fonts_done'] == 1
+        code, text = cli('uninstall', '--run', 'last')
+        assert code == font_cli.EXIT_OK and 'REMOVED   Alpha.ttf' in text
+        assert os.listdir(fonts_dir) == []
+        # A run that has nothing left selects no fonts; a mistyped one, or `last` with no fonts left, is rejected
+        assert cli('uninstall', '--run', listing['runs'][0]['run'], '--json')[0] == font_cli.EXIT_NO_FONTS
+        assert cli('uninstall', '--run', 'last', '--json')[0] == font_cli.EXIT_USAGE
+        assert cli('uninstall', '--run', 'no-such-run', '--json')[0] == font_cli.EXIT_USAGE
+        assert read_journal(os.path.join(state_dir, 'fontflow_journal.jsonl'))[0].fonts == {}
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow uninstall")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test script for FontFlow font validation.
+Builds test fonts in memory and in a temporary directory, so it runs on any platform:
+    python test_font_validation.py   (or: python -m pytest test_font_validation.py)
+"""
+
+import io
+import os
+import sys
+import struct
+import zipfile
+import tempfile
+
+from create_test_fonts import build_sfnt, build_test_font, table_checksum, write_test_collection, write_test_font
+from font_archives import FontSource
+from font_backend import DirectoryFontBackend
+from font_engine import EXTRACT_IN_MEMORY_LIMIT, InstallEngine
+from font_metadata import FontFormatError
+from font_validation import checksum, validate_font, validate_font_file, validate_font_header
+
+
+def rejected(data, checksums=False):
+    try:
+        validate_font(data, checksums)
+    except FontFormatError as e:
+        return str(e)
+    raise AssertionError("broken font accepted")
+
+
+def table_offset(data, tag):
+    num_tables, = struct.unpack_from('>H', data, 4)
+    for i in range(num_tables):
+        entry_tag, _, offset, length = struct.unpack_from('>4sLLL', data, 12 + 16 * i)
+        if entry_tag == tag:
+            return offset, length
+    raise KeyError(tag)
+
+
+def test_accepts_test_fonts():
+    """TrueType, CFF and collection fonts pass, checksums included, from memory and through mmap."""
+    assert validate_font(build_test_font('Plain'), checksums=True) == 1
+    assert validate_font(build_test_font('Cff', 'Bold', b'OTTO', os.urandom(1001)), checksums=True) == 1
+    with tempfile.TemporaryDirectory() as work:
+        big = write_test_font(os.path.join(work, 'Big.otf'), 'Big', sfnt_version=b'OTTO', padding=20 * 1024 ** 2)
+        collection = write_test_collection(os.path.join(work, 'Pair.ttc'), [('Pair', 'Regular'), ('Pair', 'Bold')],
+                                           padding=1024 ** 2)
+        assert validate_font_file(big, checksums=True) == 1
+        assert validate_font_file(collection, checksums=True) == 2
+
+
+def test_rejects_broken_fonts():
+    """Junk, truncated directories, tables out of bounds, missing tables and a bad head are rejected."""
+    font = build_test_font('Broken')
+    assert 'version tag' in rejected(b'PK\3\4' + bytes(100))
+    assert 'end of file' in rejected(font[:40])
+    glyf_offset, _ = table_offset(font, b'glyf')
+    assert 'past the end' in rejected(font[:glyf_offset + 2])
+    assert 'missing required tables: OS/2, cmap, head' in rejected(build_sfnt({b'name': b''})[0])
+    no_cff = build_test_font('NoCff').replace(b'\0\1\0\0', b'OTTO', 1)
+    assert 'CFF' in rejected(no_cff)
+    head_offset, _ = table_offset(font, b'head')
+    bad_magic = bytearray(font)
+    bad_magic[head_offset + 12] ^= 0xFF
+    assert 'magic' in rejected(bytes(bad_magic))
+    assert validate_font(font + os.urandom(100)) == 1  # Trailing bytes are harmless
+
+
+def test_checksums():
+    """Corruption inside a table only fails when checksums are verified; sums match the reference."""
+    font = build_test_font('Sum', outlines=os.urandom(4099))
+    glyf_offset, glyf_length = table_offset(font, b'glyf')
+    corrupt = bytearray(font)
+    corrupt[glyf_offset + 100] ^= 0x01
+    assert validate_font(bytes(corrupt)) == 1
+    assert "checksum mismatch in table 'glyf'" in rejected(bytes(corrupt), checksums=True)
+    buffer = memoryview(font)
+    for length in (0, 1, 3, 4, glyf_length):
+        assert checksum(buffer, glyf_offset, length) == table_checksum(font[glyf_offset:glyf_offset + length])
+
+
+def test_header_check_reads_forward():
+    """A streamed font's table directory is checked from a non-seekable archive stream."""
+    with tempfile.TemporaryDirectory() as work:
+        path = write_test_collection(os.path.join(work, 'Stream.ttc'), [('A', 'Regular'), ('B', 'Regular')],
+                                     padding=2 * 1024 ** 2)
+        zip_path = os.path.join(work, 'fonts.zip')
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.write(path, 'Stream.ttc')
+        with zipfile.ZipFile(zip_path) as zf, zf.open('Stream.ttc') as member:
+            member.seek = None  # Any backward seek would fail
+            assert validate_font_header(member, os.path.getsize(path)) == 2
+        try:
+            validate_font_header(io.BytesIO(b'\0\1\0\0' + bytes(8)), 12)
+            raise AssertionError("font without tables accepted")
+        except FontFormatError:
+            pass
+
+
+def test_engine_rejects_before_writing():
+    """The engine turns broken fonts away before anything is copied into the Fonts directory."""
+    with tempfile.TemporaryDirectory() as fonts_dir, tempfile.TemporaryDirectory() as work:
+        good = build_test_font('Good', outlines=os.urandom(4096))
+        corrupt = bytearray(good)
+        corrupt[-1] ^= 0xFF
+        junk_path = os.path.join(work, 'Junk.ttf')
+        with open(junk_path, 'wb') as f:
+            f.write(b'<html>not a font</html>')
+            f.truncate(EXTRACT_IN_MEMORY_LIMIT + 1)  # Streamed, so only its header is checked
+        sources = [FontSource('Good.ttf', len(good), 'memory', lambda: io.BytesIO(good)),
+                   FontSource('Corrupt.ttf', len(corrupt), 'memory', lambda: io.BytesIO(bytes(corrupt))),
+                   FontSource.from_path(junk_path)]
+        summary = InstallEngine(DirectoryFontBackend(fonts_dir), workers=2, verify_checksums=True).run(sources)
+        assert summary.installed_count == 1
+        assert [name for name, _ in summary.failed_installs] == ['Corrupt.ttf', 'Junk.ttf']
+        assert os.listdir(fonts_dir) == ['Good.ttf']
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow font validation")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Test script for the FontFlow install backend.
+Uses stand-ins for the Windows DLLs so it runs on any platform:
+    python test_install_backend.py   (or: python -m pytest test_install_backend.py)
+"""
+
+import io
+import os
+import sys
+import time
+import tempfile
+
+from create_test_fonts import build_test_font, write_test_font
+from font_archives import FontSource
+from font_backend import FontChangeNotifier, WindowsFontBackend, WM_FONTCHANGE
+from font_engine import InstallEngine
+from font_registry import FONTS_REGISTRY_KEY, HKLM, MemoryRegistry, RegistryWriter
+
+
+class FakeGdi32:
+    """Stand-in for gdi32 that accepts every font except those with 'Broken' in the name."""
+
+    def __init__(self, delay=0.0):
+        self.added = []
+        self.delay = delay
+
+    def AddFontResourceW(self, path):
+        if self.delay:
+            time.sleep(self.delay)
+        if 'Broken' in os.path.basename(path):
+            return 0
+        self.added.append(path)
+        return 1
+
+
+class FakeUser32:
+    """Stand-in for user32 that records broadcasts instead of sending them."""
+
+    def __init__(self):
+        self.messages = []
+
+    def SendMessageTimeoutW(self, hwnd, msg, wparam, lparam, flags, timeout, result):
+        self.messages.append(msg)
+        return 1
+
+
+class FlakyRegistry(MemoryRegistry):
+    """In-memory registry that refuses to store values with 'Bad' in their name."""
+
+    def set_value(self, key, name, value):
+        if 'Bad' in name:
+            raise PermissionError(f"cannot write {name}")
+        super().set_value(key, name, value)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_backend(fonts_dir, gdi_delay=0.0):
+    return WindowsFontBackend(fonts_dir, gdi32=FakeGdi32(gdi_delay), user32=FakeUser32(),
+                              registry=MemoryRegistry())
+
+
+def memory_source(filename, data=None):
+    if data is None:
+        data = build_test_font(os.path.splitext(filename)[0])
+    return FontSource(filename, len(data), 'memory', lambda: io.BytesIO(data))
+
+
+def test_run_broadcasts_once():
+    """A run without batch settings broadcasts WM_FONTCHANGE exactly once."""
+    with tempfile.TemporaryDirectory() as fonts_dir:
+        backend = make_backend(fonts_dir)
+        with FontChangeNotifier(backend.notify_font_change) as notifier:
+            for _ in range(2000):
+                notifier.font_changed()
+            assert backend.user32.messages == []
+        assert backend.user32.messages == [WM_FONTCHANGE]
+        assert notifier.broadcasts == 1
+
+
+def test_batch_size():
+    """A broadcast is sent every batch_size fonts plus one for the remainder."""
+    user32 = FakeUser32()
+    backend = WindowsFontBackend('.', user32=user32)
+    with FontChangeNotifier(backend.notify_font_change, batch_size=100) as notifier:
+        for _ in range(250):
+            notifier.font_changed()
+        assert len(user32.messages) == 2
+    assert len(user32.messages) == 3
+
+
+def test_time_window():
+    """A broadcast is sent once the interval has elapsed since the last one."""
+    user32 = FakeUser32()
+    clock = FakeClock()
+    backend = WindowsFontBackend('.', user32=user32)
+    with FontChangeNotifier(backend.notify_font_change, interval=5.0, clock=clock) as notifier:
+        notifier.font_changed()
+        clock.now = 4.9
+        notifier.font_changed()
+        assert len(user32.messages) == 0
+        clock.now = 5.0
+        notifier.font_changed()
+        assert len(user32.messages) == 1
+    # Nothing pending after the last batch, so exiting doesn't broadcast again
+    assert len(user32.messages) == 1
+
+
+def test_no_changes_no_broadcast():
+    """A run that installs nothing doesn't broadcast."""
+    user32 = FakeUser32()
+    backend = WindowsFontBackend('.', user32=user32)
+    with FontChangeNotifier(backend.notify_font_change):
+        pass
+    assert user32.messages == []
+
+
+def test_write_font_streams_to_destination():
+    """write_font copies the source into the fonts directory and adds the resource."""
+    with tempfile.TemporaryDirectory() as work:
+        src_path = os.path.join(work, 'Sample.ttf')
+        with open(src_path, 'wb') as f:
+            f.write(b'\0\1\0\0' + os.urandom(5000))
+        fonts_dir = os.path.join(work, 'Fonts')
+        os.makedirs(fonts_dir)
+        backend = make_backend(fonts_dir)
+        dest_path, written = backend.write_font(FontSource.from_path(src_path))
+        assert written == 5004
+        assert backend.add_font_resource(dest_path)
+        with open(src_path, 'rb') as a, open(dest_path, 'rb') as b:
+            assert a.read() == b.read()
+        assert backend.gdi32.added == [dest_path]
+
+
+def test_registry_writer_opens_key_once():
+    """The registry writer opens the Fonts key once for a whole run."""
+    registry = MemoryRegistry()
+    backend = WindowsFontBackend('.', registry=registry)
+    with backend.open_registry_writer() as writer:
+        for i in range(1000):
+            writer.queue(f"Font {i} (TrueType)", f"Font{i}.ttf")
+    assert registry.opens == 1
+    assert writer.written == 1000
+    assert registry.values(HKLM, FONTS_REGISTRY_KEY)["Font 999 (TrueType)"] == "Font999.ttf"
+
+
+def test_registry_writer_reports_failures():
+    """A failing registry value is reported without aborting the rest of the batch."""
+    registry = FlakyRegistry()
+    with RegistryWriter(registry, HKLM, FONTS_REGISTRY_KEY) as writer:
+        writer.queue("Good A (TrueType)", "GoodA.ttf")
+        writer.queue("Bad B (TrueType)", "BadB.ttf")
+        writer.queue("Good C (TrueType)", "GoodC.ttf")
+    assert [name for name, _ in writer.failures] == ["Bad B (TrueType)"]
+    assert isinstance(writer.failures[0][1], PermissionError)
+    assert sorted(registry.values(HKLM, FONTS_REGISTRY_KEY)) == ["Good A (TrueType)", "Good C (TrueType)"]
+
+
+def test_engine_results_in_order():
+    """The engine reports results in source order even when workers finish out of order."""
+    with tempfile.TemporaryDirectory() as fonts_dir:
+        backend = make_backend(fonts_dir, gdi_delay=0.001)
+        names = [f"Font{i:03d}.ttf" for i in range(60)]
+        seen = []
+        summary = InstallEngine(backend, workers=8).run(
+            (memory_source(name) for name in names), lambda result: seen.append(result.source.filename))
+        assert seen == names
+        assert summary.installed_count == summary.system_installs == 60
+        assert sorted(os.listdir(fonts_dir)) == names
+
+
+def test_engine_tallies_failures():
+    """Failed fonts are tallied, cleaned up and don't stop the run."""
+    with tempfile.TemporaryDirectory() as fonts_dir:
+        backend = make_backend(fonts_dir)
+        sources = [memory_source(f"Font{i}.ttf") for i in range(10)]
+        sources += [memory_source(f"Broken{i}.ttf") for i in range(3)]
+        summary = InstallEngine(backend, workers=4).run(sources)
+        assert summary.total_fonts == 13
+        assert summary.installed_count == 10
+        assert [name for name, _ in summary.failed_installs] == ["Broken0.ttf", "Broken1.ttf", "Broken2.ttf"]
+        assert not any(name.startswith('Broken') for name in os.listdir(fonts_dir))
+        assert len(backend.registry.values(HKLM, FONTS_REGISTRY_KEY)) == 10
+        assert backend.user32.messages == [WM_FONTCHANGE]
+
+
+def test_engine_cancel():
+    """Cancelling stops new fonts from being started."""
+    with tempfile.TemporaryDirectory() as fonts_dir:
+        backend = make_backend(fonts_dir)
+        engine = InstallEngine(backend, workers=2)
+
+        def on_result(result):
+            if result.source.filename == "Font4.ttf":
+                engine.cancel()
+
+        summary = engine.run((memory_source(f"Font{i}.ttf") for i in range(100)), on_result)
+        assert summary.cancelled
+        assert 5 <= summary.installed_count < 100
+        assert len(os.listdir(fonts_dir)) == summary.installed_count
+
+
+def test_engine_same_file_name():
+    """Fonts sharing a file name are installed one after the other, not interleaved."""
+    with tempfile.TemporaryDirectory() as fonts_dir:
+        backend = make_backend(fonts_dir)
+        big = build_test_font('Shared', outlines=os.urandom(3 * 1024 * 1024))
+        sources = [memory_source("Shared.ttf", big) for _ in range(8)]
+        summary = InstallEngine(backend, workers=8).run(sources)
+        assert summary.installed_count == 8
+        with open(os.path.join(fonts_dir, "Shared.ttf"), 'rb') as f:
+            assert f.read() == big
+
+
+def test_engine_pipeline_stages():
+    """Unreadable fonts are rejected before anything is written, names are read before installing,
+    and every stage reports its metrics."""
+    with tempfile.TemporaryDirectory() as fonts_dir, tempfile.TemporaryDirectory() as work:
+        backend = make_backend(fonts_dir)
+        with open(write_test_font(os.path.join(work, 'Named.ttf'), 'Pipeline Sans', 'Bold'), 'rb') as f:
+            font_data = f.read()
+        truncated = FontSource("Truncated.ttf", 100, 'memory', lambda: io.BytesIO(b'\0\1\0\0' * 5))
+        engine = InstallEngine(backend, workers=2, stage_workers={'extract': 3, 'name': 2})
+        assert engine.stage_workers == {'extract': 3, 'validate': 1, 'name': 2, 'install': 2}
+        summary = engine.run([memory_source("Empty.ttf", b''), truncated, memory_source("Named.ttf", font_data)])
+        assert [name for name, _ in summary.failed_installs] == ["Empty.ttf", "Truncated.ttf"]
+        assert os.listdir(fonts_dir) == ["Named.ttf"]
+        assert backend.registry.values(HKLM, FONTS_REGISTRY_KEY) == {"Pipeline Sans Bold (TrueType)": "Named.ttf"}
+        assert list(summary.stage_metrics) == ['extract', 'validate', 'name', 'install']
+        assert all(stage['items'] == 3 for stage in summary.stage_metrics.values())
+        try:
+            InstallEngine(backend, stage_workers={'unpack': 2})
+            raise AssertionError("unknown stage accepted")
+        except ValueError:
+            pass
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Testing FontFlow install backend")
+    print("=" * 50)
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__doc__} ({type(e).__name__}: {e})")
+    print("=" * 50)
+    print(f"{len(tests) - failed}/{len(tests)} tests passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())